@@ -4,6 +4,9 @@ APP_DEBUG=False
 SQL_DEBUG=False
 API_DOCS=True
 FRONTEND_ENABLED=True
+# fingerprinted (+ .gz/.br) static files are written here on startup
+# and served with Cache-Control: immutable
+FRONTEND_BUILD_DIR=src/frontend/build
 
 # LOGGING
 LOGGING_LEVEL=INFO
@@ -12,6 +15,19 @@ LOGGING_LEVEL=INFO
 SERVER_HOST=0.0.0.0
 SERVER_PORT=8085
 SERVER_WORKERS=4
+# production mode (on in the Docker image): uvloop + httptools, listening socket with
+# SO_REUSEPORT (a new instance can start on the port while the old one drains),
+# workers restarted after MAX_REQUESTS (+ random 0..JITTER) requests, 0 -> never,
+# open requests finished within GRACEFUL_TIMEOUT seconds on SIGTERM.
+# Migrations are not run on start: python -m src.cli migrate
+# SERVER_PRODUCTION=True
+SERVER_BACKLOG=2048
+# keep above the proxy's upstream keep-alive timeout
+SERVER_KEEP_ALIVE=75
+SERVER_REUSE_PORT=True
+SERVER_MAX_REQUESTS=10000
+SERVER_MAX_REQUESTS_JITTER=1000
+SERVER_GRACEFUL_TIMEOUT=30
 
 # DATABASE
 # IF with docker -> :////var/lib/telegraphy/
@@ -19,9 +35,117 @@ SERVER_WORKERS=4
 DB_URL=sqlite+aiosqlite:////var/lib/telegraphy/db.sqlite3
 
 # IF SERVER DATABASE
+# connections of all workers together (split by SERVER_WORKERS and engines),
+# keep below the server's max_connections. 0 -> DB_POOL_SIZE + DB_POOL_OVERFLOW per engine
+# of a worker (primary, every replica and shard)
+DB_MAX_CONNECTIONS=0
 DB_POOL_SIZE=100
 DB_POOL_OVERFLOW=20
 DB_TIMEOUT=5
+# True if DB_URL points to PgBouncer (transaction pooling)
+DB_PGBOUNCER=False
+
+# READ REPLICAS (comma separated, same driver as DB_URL), empty -> primary only
+# (ignored with SQLITE_TUNED: reads use its reader pool)
+DB_REPLICA_URLS=
+# round_robin | least_busy
+DB_REPLICA_MODE=round_robin
+# reads by a token / of a page written in the last N seconds go to primary,
+# and reads of the writing client in any worker (cookie read_primary_until)
+DB_READ_YOUR_WRITES=10
+
+# SHARDS (comma separated): pages, views and revisions are placed by
+# consistent hash of the page URI, accounts stay in DB_URL (may be one of them).
+# Migrate each: alembic -x shard=<url> upgrade head
+# After changing the list: python -m src.cli rebalance-shards
+DB_SHARD_URLS=
+# names of the shards above, in the same order: pages are placed by names,
+# so URLs (passwords, hosts) can change. Empty -> shard0, shard1, ...
+# (keep names when reordering/removing URLs)
+DB_SHARD_NAMES=
+
+# IF SQLITE DATABASE
+# WAL + synchronous=NORMAL, pool of read-only connections,
+# one writer connection: all writes (pages, revisions, jobs, ...) queue
+# in order for one writer task, views are written in group commits
+SQLITE_TUNED=True
+SQLITE_READERS=8
+SQLITE_MMAP_SIZE=268435456
+# seconds to wait for a lock held by another process
+SQLITE_BUSY_TIMEOUT=5
+SQLITE_WRITE_BATCH=500
+
+# CONTENT
+CONTENT_MAX_DEPTH=64
+CONTENT_MAX_NODES=100000
+# max size (bytes) of JSON body for createPage/editPage
+CONTENT_MAX_BODY_SIZE=1114112
+# bodies larger than N bytes are kept as files (0 -> all in DB), shared by workers and shards
+# after changing: python -m src.cli move-blobs
+# unreferenced files: python -m src.cli gc-blobs
+CONTENT_BLOB_THRESHOLD=65536
+CONTENT_BLOB_DIR=/var/lib/telegraphy/blobs
+
+# REVISIONS
+# every N-th revision is stored as full snapshot, others as delta
+# (a full snapshot too when more than DELTA_MAX_NODES top-level nodes changed)
+REVISIONS_ENABLED=True
+REVISION_SNAPSHOT_INTERVAL=32
+REVISION_DELTA_MAX_NODES=1000
+
+# VIEWS
+# exact -> one row per unique visitor (page_view)
+# hll -> approximate unique views, HyperLogLog sketch per page
+#   (error ~ 1.04 / sqrt(2^PRECISION): 12 -> 1.6%, 14 -> 0.8%)
+VIEWS_MODE=exact
+VIEWS_HLL_PRECISION=12
+VIEWS_FLUSH_INTERVAL=5
+# page_view rows older than N days are folded into per-page counts
+# (repeat views after that are counted again), 0 -> keep forever
+VIEWS_RETENTION_DAYS=0
+VIEWS_COMPACT_INTERVAL=3600
+VIEWS_COMPACT_BATCH=1000
+
+# PAGES
+# soft-deleted pages (and their views) are purged after N days, 0 -> keep forever
+PAGES_PURGE_DAYS=0
+PAGES_PURGE_INTERVAL=3600
+PAGES_PURGE_BATCH=10
+# max offset of getPages: with shards every shard reads offset + limit pages
+PAGES_MAX_OFFSET=1000
+# Bloom filter of page URIs: misses -> 404 without a lookup by URI
+# (a miss is checked by a sync of new page IDs, shared by concurrent misses)
+PAGES_FILTER_ENABLED=False
+PAGES_FILTER_ERROR_RATE=0.01
+# cache of page reads/renders per worker, 0 -> disabled (default).
+# Invalidation is per worker: with SERVER_WORKERS > 1 edits/views from
+# other workers are seen after at most TTL seconds (the writing client
+# reads past the cache for TTL seconds, cookie read_primary_until)
+PAGES_CACHE_TTL=0
+PAGES_CACHE_SIZE=1000
+# top requested pages are saved every N seconds and
+# (with the most viewed ones) loaded into the cache on startup
+PAGES_HOT_TOP=100
+PAGES_HOT_INTERVAL=60
+# static snapshots: create/edit/delete write <dir>/<page_uri>.html (+ .html.gz),
+# the web server serves them and passes misses to the app (empty -> disabled), e.g. nginx:
+#   location / { root /var/lib/telegraphy/pages; gzip_static on; try_files $uri.html @app; }
+# full regeneration: python -m src.cli publish-pages --workers 8
+PAGES_SNAPSHOT_DIR=
+
+# JOBS
+# rendering of new contents and snapshot writes run after the response:
+# queued in the job table of the page's database in the transaction of the
+# write, N concurrent jobs per worker, 0 -> in the request.
+# Same kind + argument queued twice -> one job
+JOBS_WORKERS=4
+JOBS_POLL_INTERVAL=1
+# a claimed job is run again after N seconds (its worker died)
+JOBS_LEASE=300
+# failed job is retried after RETRY_DELAY * 2^(attempt - 1) seconds,
+# after MAX_ATTEMPTS it's kept in the table with the error
+JOBS_MAX_ATTEMPTS=5
+JOBS_RETRY_DELAY=10
 
 # LIMITS (From IP)
 # count/time
@@ -38,3 +162,5 @@ LIMIT_RESET_TOKEN=500/second
 LIMIT_GET_ACCOUNT=1000/second
 LIMIT_GET_PAGE=2500/second
 LIMIT_GET_PAGES=500/second
+LIMIT_GET_VIEWS=1000/second
+LIMIT_GET_REVISIONS=100/second
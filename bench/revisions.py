@@ -0,0 +1,101 @@
+"""
+Page revisions: storage of deltas vs full copies, edit and rebuild time,
+worst cases of `make_delta`.
+A 2000 paragraph page (~340 KB) gets 1000 single-paragraph edits.
+
+    DB_URL=sqlite+aiosqlite:////tmp/bench.db python -m src.cli migrate
+    DB_URL=sqlite+aiosqlite:////tmp/bench.db python bench/revisions.py
+"""
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("JOBS_WORKERS", "0")
+
+from sqlalchemy import func, select
+
+from src.config import app_config
+from src.models.entities import PageRevision
+from src.repository import crud
+from src.repository.database import async_db
+from src.utils import coders
+from src.utils.delta import make_delta
+
+PARAGRAPHS = 2000
+EDITS = 1000
+
+
+def paragraph(text: str, words: int) -> dict:
+    return {"tag": "p", "children": [text + " " + " ".join(coders.generate_random_str(8) for _ in range(words))]}
+
+
+async def bench_revisions() -> None:
+    random.seed(1)
+    nodes = [paragraph(f"paragraph {i}", 16) for i in range(PARAGRAPHS)]
+    
+    async with async_db.async_session() as db:
+        account = await crud.create_account(db, "bench", "Bench", "")
+        token = account.token
+        page = await crud.create_page(
+            db, account, coders.json_dumps(nodes),
+            "Revisions bench", f"revisions-bench-{coders.generate_random_str(6)}", None, None
+        )
+        page_id, page_uri = page.id, page.page_uri
+    
+    full_copies = 0
+    elapsed = 0.0
+    for edit in range(EDITS):
+        nodes[random.randrange(PARAGRAPHS)] = paragraph(f"edit {edit}", 12)
+        content = coders.json_dumps(nodes)
+        full_copies += len(content)
+        
+        started = time.perf_counter()
+        async with async_db.async_session() as db:
+            await crud.edit_page(db, token, page_uri, content, None, None, None)
+        elapsed += time.perf_counter() - started
+    
+    async with async_db.async_session() as db:
+        result = await db.execute(
+            select(func.sum(func.length(PageRevision.data)), func.max(PageRevision.revision))
+            .where(PageRevision.page_id == page_id)
+        )
+        stored, last = result.one()
+        
+        rebuilds = []
+        for revision in (2, app_config.REVISION_SNAPSHOT_INTERVAL - 1, last // 2, last):
+            started = time.perf_counter()
+            _, rebuilt = await crud.get_page_revision(db, page_id, revision)
+            rebuilds.append((revision, (time.perf_counter() - started) * 1000))
+        assert rebuilt == content
+    
+    print(f"page {len(content) / 1024:.0f} KB, {last} revisions")
+    print(f"storage {stored / 1e6:.1f} MB vs {full_copies / 1e6:.1f} MB of full copies ({full_copies / stored:.0f}x)")
+    print(f"edit with revision {elapsed / EDITS * 1000:.1f} ms")
+    print("rebuild " + ", ".join(f"#{revision} {ms:.1f} ms" for revision, ms in rebuilds))
+
+
+def bench_delta_worst_case() -> None:
+    limit = app_config.REVISION_DELTA_MAX_NODES
+    for count in (limit, limit * 2, limit * 8):
+        cases = {
+            # every other node changed: quadratic matching, bounded by REVISION_DELTA_MAX_NODES
+            "distinct": ([f"old {i}" for i in range(count)], [f"new {i}" if i % 2 else f"old {i}" for i in range(count)]),
+            # repeated nodes, junked by SequenceMatcher
+            "repeated": (["a", "b"] * (count // 2), ["a", "c"] * (count // 2)),
+        }
+        for name, (old, new) in cases.items():
+            started = time.perf_counter()
+            delta = make_delta(coders.json_dumps(old), coders.json_dumps(new), limit)
+            print(
+                f"make_delta {count} {name} nodes: {(time.perf_counter() - started) * 1000:.0f} ms"
+                f"{'' if delta is not None else ' (snapshot)'}"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(bench_revisions())
+    bench_delta_worst_case()
@@ -0,0 +1,94 @@
+"""
+Write burst on one SQLite file: PROCESSES app instances (ASGI, no network),
+CONCURRENCY requests in flight each. Mix: 30% createPage, 20% editPage,
+35% addView, 15% getPage.
+
+    DB_URL=sqlite+aiosqlite:////tmp/bench.db python -m src.cli migrate
+    DB_URL=sqlite+aiosqlite:////tmp/bench.db SQLITE_TUNED=True python bench/sqlite_writes.py
+    DB_URL=sqlite+aiosqlite:////tmp/bench.db SQLITE_TUNED=False python bench/sqlite_writes.py
+
+BENCH_PROCESSES, BENCH_REQUESTS (per process), BENCH_CONCURRENCY change the load,
+e.g. BENCH_CONCURRENCY=200 DB_TIMEOUT=5 for bursts longer than the pool timeout
+"""
+import asyncio
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PROCESSES = int(os.environ.get("BENCH_PROCESSES", 4))
+REQUESTS = int(os.environ.get("BENCH_REQUESTS", 1500))
+CONCURRENCY = int(os.environ.get("BENCH_CONCURRENCY", 50))
+
+
+def worker(index: int, results: multiprocessing.Queue) -> None:
+    os.environ.setdefault("JOBS_WORKERS", "0")
+    os.environ.setdefault("PAGES_HOT_TOP", "0")
+    for limit in ("LIMIT_DEFAULT", "LIMIT_CREATE_PAGE", "LIMIT_EDIT_PAGE", "LIMIT_ADD_VIEW", "LIMIT_GET_PAGE", "LIMIT_CREATE_ACCOUNT"):
+        os.environ[limit] = "1000000/second"
+    
+    import httpx
+    import main
+    
+    app = main.telegraphy_app
+    
+    async def run() -> None:
+        transport = httpx.ASGITransport(app=app, client=(f"10.0.{index}.1", 1))
+        async with app.router.lifespan_context(app), httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            token = (await client.get("/api/createAccount", params={"short_name": f"bench{index}"})).json()["access_token"]
+            page = (await client.post("/api/createPage", data={"token": token, "content": '["x"]', "title": f"Bench {index}"})).json()["path"]
+            semaphore = asyncio.Semaphore(CONCURRENCY)
+            errors, latencies = {}, []
+            
+            async def request(i: int) -> None:
+                async with semaphore:
+                    started = time.perf_counter()
+                    kind = random.random()
+                    try:
+                        if kind < .3:
+                            response = await client.post("/api/createPage", data={"token": token, "content": f'["{i}"]', "title": f"Page {index}"})
+                        elif kind < .5:
+                            response = await client.post(f"/api/editPage/{page}", data={"token": token, "content": f'["{i}"]'})
+                        elif kind < .85:
+                            response = await client.get(f"/api/addView/{page}", headers={"User-Agent": f"bench-{index}-{i}"})
+                        else:
+                            response = await client.get(f"/api/getPage/{page}")
+                        status = response.status_code
+                    except Exception as e:
+                        status = type(e).__name__
+                    if status != 200:
+                        errors[status] = errors.get(status, 0) + 1
+                    latencies.append(time.perf_counter() - started)
+            
+            started = time.perf_counter()
+            await asyncio.gather(*map(request, range(REQUESTS)))
+            latencies.sort()
+            results.put((time.perf_counter() - started, errors, latencies[int(len(latencies) * .99)]))
+    
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    multiprocessing.set_start_method("spawn")
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=worker, args=(i, results)) for i in range(PROCESSES)]
+    for process in processes:
+        process.start()
+    done = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    
+    elapsed = max(result[0] for result in done)
+    errors = {}
+    for _, process_errors, _ in done:
+        for status, count in process_errors.items():
+            errors[status] = errors.get(status, 0) + count
+    print(
+        f"SQLITE_TUNED={os.environ.get('SQLITE_TUNED', 'default')} "
+        f"req/s={PROCESSES * REQUESTS / elapsed:.0f} "
+        f"p99={max(result[2] for result in done) * 1000:.0f}ms "
+        f"errors={errors or 0}"
+    )
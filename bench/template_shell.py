@@ -0,0 +1,82 @@
+"""
+view_page.html through the precompiled shell (`TemplateShell`) vs Jinja:
+equal output on random contexts, cost per request, cold template load
+with and without the bytecode cache.
+
+    DB_URL=sqlite+aiosqlite:////tmp/bench.db python bench/template_shell.py
+"""
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.responses import HTMLResponse
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+from starlette.requests import Request
+
+from src.frontend_shell import assets, front_path, page_shell, templates
+from src.models.schemas import PageResponse
+
+CONTEXTS = 300
+TEMPLATES = ("view_page.html", "account_page.html", "auth_page.html", "error_page.html")
+
+
+def page_context(rnd: random.Random, paragraphs: int) -> dict:
+    # same shape as `reader._render_page`: escape-heavy values, empty and missing fields
+    return PageResponse(
+        path=f"page-{rnd.randint(0, 999)}",
+        author_name=rnd.choice(["Anonymous", "<b>x</b> & 'q\"", ""]),
+        author_url=rnd.choice(["", "https://example.com/?a=1&b=<2>"]),
+        title=rnd.choice(["Title <i>", "Title & co", "x"]),
+        image_url=rnd.choice(["", "/image.png?a&b"]),
+        can_edit=False,
+        created=datetime.datetime(2024, 1, rnd.randint(1, 28), tzinfo=datetime.UTC),
+        html_content="<p>Lorem &amp; <b>ipsum</b></p>" * paragraphs
+    ).model_dump(mode="python", exclude_defaults=True)
+
+
+def per_call(func, count: int) -> float:
+    started = time.perf_counter()
+    for _ in range(count):
+        func()
+    return (time.perf_counter() - started) / count * 1e6
+
+
+def cold_load(cache_dir: str | None) -> float:
+    environment = Environment(
+        loader=FileSystemLoader(os.path.join(front_path, "templates")),
+        bytecode_cache=FileSystemBytecodeCache(cache_dir) if cache_dir else None
+    )
+    started = time.perf_counter()
+    for name in TEMPLATES:
+        environment.get_template(name)
+    return (time.perf_counter() - started) * 1000
+
+
+if __name__ == "__main__":
+    assets.build()
+    template = templates.get_template("view_page.html")
+    rnd = random.Random(1)
+    
+    contexts = [page_context(rnd, 20) for _ in range(CONTEXTS)]
+    mismatches = sum(page_shell.render(context) != template.render(context) for context in contexts)
+    fallbacks = sum(shell is None for shell in page_shell.shells.values())
+    print(f"{CONTEXTS} contexts: {mismatches} mismatches, {len(page_shell.shells)} shapes, {fallbacks} fallbacks")
+    
+    request = Request({"type": "http", "method": "GET", "path": "/page", "headers": [], "query_string": b""})
+    for paragraphs, count in ((20, 20000), (2000, 3000)):
+        context = page_context(rnd, paragraphs)
+        jinja = per_call(
+            lambda: templates.TemplateResponse(request=request, name="view_page.html", context=dict(context)),
+            count
+        )
+        shell = per_call(lambda: HTMLResponse(page_shell.render(context)), count)
+        print(f"{len(page_shell.render(context)) / 1024:.1f} KB body: TemplateResponse {jinja:.1f} us, shell {shell:.1f} us")
+    
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cold_load(cache_dir)
+        print(f"cold load of {len(TEMPLATES)} templates: {cold_load(None):.2f} ms, bytecode cache {cold_load(cache_dir):.2f} ms")
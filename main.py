@@ -1,4 +1,7 @@
+import asyncio
 import logging
+from contextlib import suppress
+from datetime import timedelta
 from typing import AsyncGenerator
 
 import uvicorn
@@ -9,10 +12,21 @@ from starlette.responses import JSONResponse
 from sqlalchemy import select
 
 from src.api.routes import api, frontend
+from src.frontend_shell import assets
 from src.config import app_config
+from src.server import run_production
 from src.repository.database import async_db
 from src.models.entities import Base, Account
 from src.repository import crud
+from src.repository.views import view_sketches, run_compaction
+from src.repository.writes import writes
+from src.repository.purge import run_purge
+from src.repository.jobs import job_worker
+from src.repository.page_filter import page_filter
+from src.repository.sharding import shards
+from src.repository.hot_pages import (
+    run_hot_pages, persist_hot_pages, prewarm_pages
+)
 
 
 logging.basicConfig(level=app_config.LOGGING_LEVEL)
@@ -40,8 +54,56 @@ async def lifespan(app: FastAPI) -> AsyncGenerator:
         logger.info("=-=-=-=-=-=-=")
         logger.info(f"ADMIN TOKEN: {acc.token}")
         logger.info("=-=-=-=-=-=-=\n")
+    
+    if app_config.FRONTEND_ENABLED:
+        count = await asyncio.to_thread(assets.build)
+        logger.info(f"Built {count} static assets")
+    if app_config.PAGES_FILTER_ENABLED:
+        await page_filter.build()
+    if app_config.PAGES_CACHE_TTL > 0 and app_config.PAGES_HOT_TOP > 0:
+        await prewarm_pages(min(app_config.PAGES_HOT_TOP, app_config.PAGES_CACHE_SIZE))
+    
+    tasks = []
+    if app_config.VIEWS_MODE == "hll":
+        tasks.append(asyncio.create_task(view_sketches.run(app_config.VIEWS_FLUSH_INTERVAL)))
+    if app_config.VIEWS_RETENTION_DAYS > 0:
+        tasks.append(asyncio.create_task(run_compaction(
+            app_config.VIEWS_COMPACT_INTERVAL,
+            timedelta(days=app_config.VIEWS_RETENTION_DAYS),
+            app_config.VIEWS_COMPACT_BATCH
+        )))
+    if app_config.PAGES_PURGE_DAYS > 0:
+        tasks.append(asyncio.create_task(run_purge(
+            app_config.PAGES_PURGE_INTERVAL,
+            timedelta(days=app_config.PAGES_PURGE_DAYS),
+            app_config.PAGES_PURGE_BATCH
+        )))
+    if app_config.JOBS_WORKERS > 0:
+        tasks.append(asyncio.create_task(job_worker.run(app_config.JOBS_POLL_INTERVAL)))
+    if app_config.PAGES_HOT_TOP > 0:
+        tasks.append(asyncio.create_task(run_hot_pages(
+            app_config.PAGES_HOT_INTERVAL,
+            app_config.PAGES_HOT_TOP
+        )))
+    if app_config.SQLITE_TUNED and any(database.is_sqlite for database in shards):
+        # last: stopped after the tasks that write through it
+        tasks.append(asyncio.create_task(writes.run()))
+    
     yield
     logger.info("Stopping...")
+    
+    for task in tasks:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    
+    if app_config.VIEWS_MODE == "hll":
+        await view_sketches.flush()
+    if app_config.PAGES_HOT_TOP > 0:
+        await persist_hot_pages(
+            app_config.PAGES_HOT_TOP,
+            timedelta(seconds=max(app_config.PAGES_HOT_INTERVAL * 10, 86400))
+        )
 
 
 def init_application() -> FastAPI:
@@ -85,11 +147,14 @@ telegraphy_app: FastAPI = init_application()
 
 
 if __name__ == "__main__": 
-    uvicorn.run(
-        "main:telegraphy_app",
-        host=app_config.SERVER_HOST,
-        port=app_config.SERVER_PORT,
-        reload=app_config.APP_DEBUG,
-        workers=app_config.SERVER_WORKERS,
-        log_level=app_config.LOGGING_LEVEL
-    )
+    if app_config.SERVER_PRODUCTION:
+        run_production("main:telegraphy_app")
+    else:
+        uvicorn.run(
+            "main:telegraphy_app",
+            host=app_config.SERVER_HOST,
+            port=app_config.SERVER_PORT,
+            reload=app_config.APP_DEBUG,
+            workers=app_config.SERVER_WORKERS,
+            log_level=app_config.LOGGING_LEVEL
+        )
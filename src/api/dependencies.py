@@ -1,13 +1,201 @@
+import json
+import math
+import time
 from typing import (
-    AsyncGenerator
+    Any, AsyncGenerator,
+    Callable, Coroutine,
+    Type, TypeVar
 )
+
+from fastapi import Depends, Request, Response, HTTPException
+from fastapi.exceptions import RequestValidationError
+from pydantic import BaseModel, ValidationError
 from sqlalchemy.ext.asyncio import (
     AsyncSession
 )
 
+from src.config import app_config
 from src.repository.database import async_db
+from src.repository.sharding import shards
+
+
+BodyModel = TypeVar("BodyModel", bound=BaseModel)
+
+# time (unix) until the client's reads go to primary, see `mark_write`
+READ_PRIMARY_COOKIE = "read_primary_until"
+
+
+async def get_primary_session() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Read session on primary (SQLITE_TUNED: the reader pool), routes write
+    through `src.repository.writes`. Lazy: routes that don't query
+    (e.g. cached reads) never check out a pool connection
+    """
+    async with async_db.read_session(primary=True) as session:
+        yield session
+
+
+def _read_primary_ttl() -> float:
+    """ Seconds a client reads past replicas and the page cache after its write (0 - not needed) """
+    ttl = app_config.DB_READ_YOUR_WRITES if async_db.replica_engines else 0
+    if app_config.PAGES_CACHE_TTL > 0 and app_config.PAGES_CACHE_SIZE > 0:
+        # another worker's cache may hold the page for up to TTL seconds
+        ttl = max(ttl, app_config.PAGES_CACHE_TTL)
+    return ttl
+
+
+def mark_write(response: Response, *keys: str | None) -> None:
+    """
+    After a write: reads by `keys` in this worker go to primary for
+    DB_READ_YOUR_WRITES seconds, the client's reads in any worker
+    (short-lived cookie) go to primary bypassing the page cache
+    """
+    async_db.mark_write(*keys)
+    ttl = _read_primary_ttl()
+    if ttl <= 0:
+        return
+    
+    response.set_cookie(
+        READ_PRIMARY_COOKIE,
+        f"{time.time() + ttl:.3f}",
+        max_age=math.ceil(ttl),
+        httponly=True,
+        samesite="lax"
+    )
+
+
+def is_recent_write(request: Request) -> bool:
+    """ The client has written recently (`mark_write`) """
+    try:
+        until = float(request.cookies.get(READ_PRIMARY_COOKIE, ""))
+    except ValueError:
+        return False
+    
+    now = time.time()
+    return now < until <= now + _read_primary_ttl()
+
+
+async def get_read_session(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Session for read-only routes: on a replica, unless the request's token
+    or the client has just written (then on primary)
+    """
+    async with async_db.read_session(
+        request.query_params.get("token"),
+        primary=is_recent_write(request)
+    ) as session:
+        yield session
 
 
-async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
-    async with async_db.async_session() as session:
+async def get_page_primary_session(
+    page_uri: str,
+    db: AsyncSession = Depends(get_primary_session)
+) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Read session on primary of the shard of `page_uri` (the route's session
+    without shards or if the shard is the primary)
+    """
+    database = shards.get(page_uri)
+    if database is async_db:
+        yield db
+        return
+    
+    async with database.read_session(primary=True) as session:
         yield session
+
+
+async def get_page_read_session(
+    request: Request,
+    page_uri: str,
+    db: AsyncSession = Depends(get_read_session)
+) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Read session on the shard of `page_uri` (the route's read session without
+    shards or if the shard is the primary)
+    """
+    database = shards.get(page_uri)
+    if database is async_db:
+        yield db
+        return
+    
+    async with database.read_session(
+        request.query_params.get("token"),
+        primary=is_recent_write(request)
+    ) as session:
+        yield session
+
+
+async def read_json_body(
+    request: Request,
+    max_size: int | None = None
+) -> Any:
+    """
+    Read and decode JSON body, enforcing `max_size` while streaming
+
+    :param request:
+    :param max_size: max body size in bytes
+    :return:
+    """
+    max_size = max_size or app_config.CONTENT_MAX_BODY_SIZE
+    
+    content_length = request.headers.get("Content-Length")
+    if content_length and content_length.isdigit() and int(content_length) > max_size:
+        raise HTTPException(413, "Request Entity Too Large")
+    
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > max_size:
+            raise HTTPException(413, "Request Entity Too Large")
+    
+    try:
+        return json.loads(body)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        raise HTTPException(400, "Body is bad JSON format")
+
+
+def get_body(model: Type[BodyModel]) -> Callable[[Request], Coroutine[Any, Any, BodyModel]]:
+    """
+    Dependency: body of `model` from `application/json`
+    or from form (`application/x-www-form-urlencoded`, `multipart/form-data`)
+
+    :param model:
+    :return:
+    """
+    async def dependency(request: Request) -> BodyModel:
+        content_type = request.headers.get("Content-Type", "")
+        
+        if content_type.startswith("application/json"):
+            data = await read_json_body(request)
+            if not isinstance(data, dict):
+                raise HTTPException(400, "Body must be a JSON object")
+        else:
+            data = dict(await request.form())
+        
+        try:
+            return model.model_validate(data)
+        except ValidationError as e:
+            raise RequestValidationError(
+                [{**error, "loc": ("body", *error["loc"])} for error in e.errors(include_url=False)]
+            )
+    
+    return dependency
+
+
+def body_openapi(model: Type[BaseModel]) -> dict:
+    """
+    `openapi_extra` with request body of `model` for JSON and form content types
+
+    :param model:
+    :return:
+    """
+    schema = model.model_json_schema()
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": schema},
+                "application/x-www-form-urlencoded": {"schema": schema}
+            }
+        }
+    }
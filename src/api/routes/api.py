@@ -1,32 +1,51 @@
+import json
+import datetime
 from typing import List
 
 from fastapi import (
     APIRouter, Request,
-    Depends, Query, Form
+    Depends, Query
 )
 from fastapi.exceptions import HTTPException
+from fastapi.responses import JSONResponse, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
 from src.config import app_config
-from src.api.dependencies import get_async_session
-from src.repository import crud
+from src.api.dependencies import (
+    get_primary_session, get_read_session,
+    get_page_primary_session, get_page_read_session,
+    get_body, body_openapi,
+    is_recent_write, mark_write
+)
+from src.repository import crud, jobs, reader, sharded, snapshots
+from src.repository.database import async_db
+from src.repository.views import view_sketches
+from src.repository.writes import writes
+from src.repository.page_filter import page_filter
+from src.repository.sharding import shards
+from src.models import Page
 from src.models.schemas import (
     AccountResponse, NodeElement,
     AccountEditedResponse, PageResponse,
-    PageOrderBy, OrderMode
+    PageOrderBy, OrderMode,
+    PageCreateRequest, PageEditRequest,
+    PageRevisionResponse, PageViewsResponse
 )
 from src.utils.html import (
     node_to_html, parse_nodes_from_str,
-    formatting_nodes, get_preview_from_nodes
+    get_preview_from_nodes
 )
 from src.utils import coders
-from src.utils.validation import is_can_edit
+from src.utils.validation import dump_content, is_can_edit, parse_content
+from src.utils.patch import apply_patch
 from src.exceptions import (
     AccountNotFoundException,
+    PageEditConflictException,
     PageEditForbiddenException,
-    PageNotFoundException
+    PageNotFoundException,
+    PageRevisionNotFoundException
 )
 
 
@@ -38,13 +57,18 @@ router = APIRouter(prefix="/api", tags=["api"])
 @limiter.limit(app_config.LIMIT_CREATE_ACCOUNT)
 async def create_account(
     request: Request,
+    response: Response,
     short_name: str = Query(max_length=32),
     author_name: str = Query(max_length=128, default="Anonymous"),
-    author_url: str = Query(max_length=512, default=""),
-    db: AsyncSession = Depends(get_async_session)
+    author_url: str = Query(max_length=512, default="")
 ):
     """ Create Account """
-    account = await crud.create_account(db, coders.text_to_translit(short_name), author_name, author_url)
+    short_name = coders.text_to_translit(short_name)
+    account = await writes.call(
+        async_db,
+        lambda db: crud.create_account(db, short_name, author_name, author_url)
+    )
+    mark_write(response, account.token)
     return AccountResponse(
         short_name=account.short_name,
         author_name=account.author_name,
@@ -57,16 +81,14 @@ async def create_account(
 @limiter.limit(app_config.LIMIT_RESET_TOKEN)
 async def reset_token(
     request: Request,
-    token: str,
-    db: AsyncSession = Depends(get_async_session)
+    response: Response,
+    token: str
 ):
     """ Reset Token """
     try:
-        account = await crud.get_account(db, token)
-        pages = await crud.get_account_page_count(db, token)
-        account.token = coders.generate_token()
-        await db.commit()
-        await db.refresh(account)
+        account = await writes.call(async_db, lambda db: crud.reset_account_token(db, token))
+        pages = await sharded.get_account_page_count(account)
+        mark_write(response, account.token)
         
     except AccountNotFoundException:
         raise HTTPException(401, "Unauthorized")
@@ -77,7 +99,7 @@ async def reset_token(
         author_url=account.author_url,
         access_token=account.token,
         page_count=pages,
-        views=(await crud.get_account_pages_views(db, account.id))
+        views=(await sharded.get_account_pages_views(account))
     )
 
 
@@ -85,20 +107,20 @@ async def reset_token(
 @limiter.limit(app_config.LIMIT_EDIT_ACCOUNT)
 async def edit_account_info(
     request: Request,
+    response: Response,
     token: str,
     short_name: str | None = Query(None, max_length=32),
     author_name: str | None = Query(None, max_length=128),
-    author_url: str | None = Query(None, max_length=512),
-    db: AsyncSession = Depends(get_async_session)
+    author_url: str | None = Query(None, max_length=512)
 ):
     """ Edit Account Info """
+    short_name = coders.text_to_translit(short_name) if short_name else None
     try:
-        account = await crud.edit_account_info(
-            db, token,
-            coders.text_to_translit(short_name) if short_name else None,
-            author_name, author_url
+        account = await writes.call(
+            async_db,
+            lambda db: crud.edit_account_info(db, token, short_name, author_name, author_url)
         )
-        await db.refresh(account)
+        mark_write(response, token)
     except AccountNotFoundException:
         raise HTTPException(401, "Unauthorized")
     
@@ -114,12 +136,12 @@ async def edit_account_info(
 async def get_account_info(
     request: Request,
     token: str,
-    db: AsyncSession = Depends(get_async_session)
+    db: AsyncSession = Depends(get_read_session)
 ):
     """ Get Account Info """
     try:
         account = await crud.get_account(db, token)
-        pages = await crud.get_account_page_count(db, token)
+        pages = await sharded.get_account_page_count(account)
     except AccountNotFoundException:
         raise HTTPException(401, "Unauthorized")
     
@@ -129,103 +151,114 @@ async def get_account_info(
         author_url=account.author_url,
         access_token=account.token,
         page_count=pages,
-        views=(await crud.get_account_pages_views(db, account.id))
+        views=(await sharded.get_account_pages_views(account))
     )
     
 
-@router.post("/createPage", response_model=PageResponse)
+@router.post(
+    "/createPage",
+    response_model=PageResponse,
+    openapi_extra=body_openapi(PageCreateRequest)
+)
 @limiter.limit(app_config.LIMIT_CREATE_PAGE)
 async def create_page(
     request: Request,
-    token: str = Form(),
-    content: str = Form(
-        description="""This abstract object represents a DOM Node.
-                    It can be a String which represents a DOM text node or a NodeElement object""",
-        example='["Hello ", {"tag": "b", "children": ["World", {"tag": "i", "children": ["!"]} ]} ]',
-        max_length=1048576
-    ),
-    title: str = Form(min_length=1, max_length=256),
-    author_name: str | None = Form(None, max_length=128),
-    author_url: str | None = Form(None, max_length=512),
-    return_content: bool = Form(True),
-    db: AsyncSession = Depends(get_async_session)
+    response: Response,
+    body: PageCreateRequest = Depends(get_body(PageCreateRequest))
 ):
     """ Create Page """
-    nodes = parse_nodes_from_str(content)
-    content_list = formatting_nodes(nodes)
-    uri = coders.text_to_translit(title).lower()
+    content_list = parse_content(body.content)
+    nodes = dump_content(content_list)
+    uri = coders.text_to_translit(body.title).lower()
     
-    try:
-        account = await crud.get_account(db, token)
-        page = await crud.create_page(
-            db, token,
-            nodes=coders.json_dumps(content_list),
-            title=title,
+    async def create(db: AsyncSession) -> tuple[int, Page]:
+        account = await crud.get_account(db, body.token)
+        # a URI collision rolls back `db` and expires `account`
+        acc_id = account.id
+        page = await sharded.create_page(
+            db, account,
+            nodes=nodes,
+            title=body.title,
             uri=uri,
-            author_name=author_name,
-            author_url=author_url
+            author_name=body.author_name,
+            author_url=body.author_url
         )
+        return acc_id, page
+    
+    try:
+        acc_id, page = await writes.call(async_db, create)
+        mark_write(response, body.token, page.page_uri.lower())
     except AccountNotFoundException:
         raise HTTPException(401, "Unauthorized")
     
+    await jobs.page_written(page.page_uri)
+    
     page_response = PageResponse(
         path=page.page_uri,
         author_name=page.author_name,
         author_url=page.author_url,
         title=page.title,
-        image_url=get_preview_from_nodes(nodes),
-        can_edit=(account.id == page.account_id),
-        created=page.created
+        image_url=get_preview_from_nodes(content_list),
+        can_edit=(acc_id == page.account_id),
+        created=page.created,
+        content=content_list if body.return_content else []
     )
-    if return_content:
-        page_response.content = nodes
 
     return page_response
 
 
-@router.post("/editPage/{page_uri}", response_model=PageResponse)
+@router.post(
+    "/editPage/{page_uri}",
+    response_model=PageResponse,
+    openapi_extra=body_openapi(PageEditRequest)
+)
 @limiter.limit(app_config.LIMIT_EDIT_PAGE)
 async def edit_page(
     request: Request,
+    response: Response,
     page_uri: str,
-    token: str = Form(),
-    content: str | None = Form(
-        None,
-        description="""This abstract object represents a DOM Node.
-                    It can be a String which represents a DOM text node or a NodeElement object""",
-        example='["Hello ", {"tag": "b", "children": ["World", {"tag": "i", "children": ["!"]} ]} ]',
-        max_length=1048576
-    ),
-    title: str | None = Form(None, min_length=1, max_length=256),
-    author_name: str | None = Form(None, max_length=128),
-    author_url: str | None = Form(None, max_length=512),
-    return_content: bool = Form(True),
-    db: AsyncSession = Depends(get_async_session)
+    body: PageEditRequest = Depends(get_body(PageEditRequest)),
+    db: AsyncSession = Depends(get_primary_session)
 ):
     """ Edit Page """
-    if content is not None:
-        nodes = parse_nodes_from_str(content)
-        content_list = formatting_nodes(nodes)
-    else:
-        nodes, content_list = None, None
+    if body.content is not None and body.patch is not None:
+        raise HTTPException(400, "Pass either content or patch")
     
-    try:
-        account = await crud.get_account(db, token)
-        views = await crud.get_page_views_count(db, page_uri)
-        page = await crud.get_page(db, page_uri)
+    content_list = parse_content(body.content) if body.content is not None else None
+    
+    async def edit(page_db: AsyncSession) -> tuple[int, Page, List[dict | str] | None]:
+        views = await crud.get_page_views_count(page_db, page_uri)
+        page = await crud.get_page(page_db, page_uri)
 
         if not is_can_edit(account, page):
             raise PageEditForbiddenException()
         
+        content = content_list
+        if body.patch is not None:
+            content = apply_patch(json.loads(page.content), body.patch)
+        
+        nodes = dump_content(content) if content else None
+        
         page = await crud.edit_page(
-            db, token,
+            page_db, body.token,
             page_uri,
-            nodes=coders.json_dumps(content_list) if content_list else None,
-            title=title,
-            author_name=author_name,
-            author_url=author_url
+            nodes=nodes,
+            title=body.title,
+            author_name=body.author_name,
+            author_url=body.author_url
         )
-        await db.refresh(account)
+        return views, page, content
+    
+    try:
+        account = await crud.get_account(db, body.token)
+        # don't hold a read connection while the edit is queued
+        await db.close()
+        views, page, content_list = await writes.call(shards.get(page_uri), edit)
+        reader.invalidate(page_uri)
+        mark_write(response, body.token, page_uri.lower())
+        
+        if not content_list:
+            content_list = json.loads(page.content)
 
     except AccountNotFoundException:
         raise HTTPException(401, "Unauthorized")
@@ -233,19 +266,22 @@ async def edit_page(
         raise HTTPException(404, "Not Found")
     except PageEditForbiddenException:
         raise HTTPException(403, "Forbidden")
+    except PageEditConflictException:
+        raise HTTPException(409, "Conflict")
+    
+    await jobs.page_written(page_uri)
     
     page_response = PageResponse(
         path=page.page_uri,
         author_name=page.author_name,
         author_url=page.author_url,
         title=page.title,
-        image_url=get_preview_from_nodes(nodes),
+        image_url=get_preview_from_nodes(content_list),
         views=views,
         can_edit=is_can_edit(account, page),
-        created=page.created
+        created=page.created,
+        content=content_list if body.return_content else []
     )
-    if return_content:
-        page_response.content = nodes
 
     return page_response
 
@@ -254,24 +290,32 @@ async def edit_page(
 @limiter.limit(app_config.LIMIT_DELETE_PAGE)
 async def delete_page(
     request: Request,
+    response: Response,
     page_uri: str,
     token: str,
-    db: AsyncSession = Depends(get_async_session)
+    db: AsyncSession = Depends(get_primary_session)
 ):
     """ Delete Page """
-    try:
-        account = await crud.get_account(db, token)
-        page = await crud.get_page(db, page_uri)
+    async def delete(page_db: AsyncSession) -> None:
+        page = await crud.get_page(page_db, page_uri, with_content=False)
         
         if not is_can_edit(account, page):
             raise PageEditForbiddenException()
         
         if not account.is_admin:
             page.is_deleted = True
-            await db.commit()
+            page.deleted = datetime.datetime.now(datetime.UTC)
+            await page_db.commit()
         else:
-            await db.delete(page)
-            await db.commit()
+            await crud.delete_pages(page_db, [page.id])
+    
+    try:
+        account = await crud.get_account(db, token)
+        await db.close()
+        await writes.call(shards.get(page_uri), delete)
+        page_filter.remove(page_uri)
+        reader.invalidate(page_uri)
+        mark_write(response, token, page_uri.lower())
         
     except AccountNotFoundException:
         raise HTTPException(401, "Unauthorized")
@@ -280,6 +324,8 @@ async def delete_page(
     except PageEditForbiddenException:
         raise HTTPException(403, "Forbidden")
     
+    await snapshots.unpublish(page_uri)
+    
     return {
         "ok": True
     }
@@ -292,7 +338,7 @@ async def get_page(
     page_uri: str,
     token: str | None = Query(None, max_length=128),
     return_content: bool = Query(True),
-    db: AsyncSession = Depends(get_async_session)
+    db: AsyncSession = Depends(get_read_session)
 ):
     """ Get Page """
     
@@ -300,30 +346,34 @@ async def get_page(
     try:
         if token is not None:
             account = await crud.get_account(db, token)
-        views = await crud.get_page_views_count(db, page_uri)
-        page = await crud.get_page(db, page_uri)
+        page, views = await reader.get_page(page_uri, primary=is_recent_write(request))
         
     except AccountNotFoundException:
         raise HTTPException(401, "Unauthorized")
     except PageNotFoundException:
         raise HTTPException(404, "Not Found")
     
-    nodes = parse_nodes_from_str(page.content)
+    preview = page.body.preview
+    if preview is None:
+        # content is not rendered yet (render-contents)
+        preview = get_preview_from_nodes(parse_nodes_from_str(page.content))
     
     page_response = PageResponse(
         path=page.page_uri,
         author_name=page.author_name,
         author_url=page.author_url,
         title=page.title,
-        image_url=get_preview_from_nodes(nodes),
+        image_url=preview,
         views=views,
         can_edit=is_can_edit(account, page),
         created=page.created
-    )
-    if return_content:
-        page_response.content = nodes
-
-    return page_response
+    ).model_dump(mode="json")
+    
+    # stored content is validated JSON in the response form (validate_nodes):
+    # spliced as is instead of parse + serialize
+    if return_content and page.content != "[]":
+        return Response(coders.json_splice(page_response, "content", page.content), media_type="application/json")
+    return JSONResponse(page_response)
 
 
 @router.get("/getPages", response_model=List[PageResponse])
@@ -333,10 +383,10 @@ async def get_pages(
     token: str = Query(max_length=128),
     query: str = Query("", max_length=256, description="Filer by Title"),
     limit: int = Query(10, ge=1, le=50),
-    offset: int = Query(0, ge=0),
+    offset: int = Query(0, ge=0, le=app_config.PAGES_MAX_OFFSET),
     order_by: PageOrderBy = Query(PageOrderBy.DATE),
     order_mode: OrderMode = Query(OrderMode.DESC),
-    db: AsyncSession = Depends(get_async_session)
+    db: AsyncSession = Depends(get_read_session)
 ):
     """ Get Pages """
     
@@ -347,8 +397,8 @@ async def get_pages(
         raise HTTPException(401, "Unauthorized")
     
     pages_response: List[PageResponse] = []
-    pages = await crud.get_account_pages(
-        db, account.id,
+    pages = await sharded.get_account_pages(
+        account,
         query=query,
         limit=limit,
         offset=offset,
@@ -356,16 +406,13 @@ async def get_pages(
         order_mode=order_mode
     )
     
-    for page in pages:
-        views = await crud.get_page_views_count(db, page.page_uri)
-        nodes = parse_nodes_from_str(page.content)
-        
+    for page, views in pages:
         page_response = PageResponse(
             path=page.page_uri,
             author_name=page.author_name,
             author_url=page.author_url,
             title=page.title,
-            image_url=get_preview_from_nodes(nodes),
+            image_url=page.body.preview or None,
             views=views,
             can_edit=is_can_edit(account, page),
             created=page.created
@@ -375,17 +422,150 @@ async def get_pages(
     return pages_response
 
 
+@router.get("/getViews/{page_uri}", response_model=PageViewsResponse)
+@limiter.limit(app_config.LIMIT_GET_VIEWS)
+async def get_views(
+    request: Request,
+    page_uri: str,
+    year: int | None = Query(None, ge=2000, le=2100),
+    month: int | None = Query(None, ge=1, le=12),
+    day: int | None = Query(None, ge=1, le=31),
+    hour: int | None = Query(None, ge=0, le=23),
+    db: AsyncSession = Depends(get_page_read_session)
+):
+    """ Get Views (total or for the given year/month/day/hour, UTC) """
+    
+    if hour is not None and day is None:
+        raise HTTPException(400, "Day is required")
+    if day is not None and month is None:
+        raise HTTPException(400, "Month is required")
+    if month is not None and year is None:
+        raise HTTPException(400, "Year is required")
+    
+    try:
+        page = await crud.get_page(db, page_uri, with_content=False)
+    except PageNotFoundException:
+        raise HTTPException(404, "Not Found")
+    
+    if year is None:
+        return PageViewsResponse(
+            views=(await crud.get_page_views_count(db, page_uri))
+        )
+    
+    try:
+        bucket = datetime.datetime(
+            year, month or 1, day or 1,
+            hour or 0,
+            tzinfo=datetime.UTC
+        )
+    except ValueError:
+        raise HTTPException(400, "Bad date")
+    
+    period = (
+        "hour" if hour is not None else
+        "day" if day is not None else
+        "month" if month is not None else
+        "year"
+    )
+    
+    return PageViewsResponse(
+        views=(await crud.get_page_views_by_period(db, page.id, period, bucket))
+    )
+
+
+@router.get("/getPageRevisions/{page_uri}", response_model=List[PageRevisionResponse])
+@limiter.limit(app_config.LIMIT_GET_REVISIONS)
+async def get_page_revisions(
+    request: Request,
+    page_uri: str,
+    token: str = Query(max_length=128),
+    limit: int = Query(10, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_read_session),
+    page_db: AsyncSession = Depends(get_page_read_session)
+):
+    """ Get Page Revisions """
+    
+    try:
+        account = await crud.get_account(db, token)
+        page = await crud.get_page(page_db, page_uri, with_content=False)
+        
+        if not is_can_edit(account, page):
+            raise PageEditForbiddenException()
+        
+    except AccountNotFoundException:
+        raise HTTPException(401, "Unauthorized")
+    except PageNotFoundException:
+        raise HTTPException(404, "Not Found")
+    except PageEditForbiddenException:
+        raise HTTPException(403, "Forbidden")
+    
+    revisions = await crud.get_page_revisions(
+        page_db, page.id,
+        limit=limit,
+        offset=offset
+    )
+    
+    return [
+        PageRevisionResponse(
+            revision=page_revision.revision,
+            title=page_revision.title,
+            size=page_revision.size,
+            created=page_revision.created
+        )
+        for page_revision in revisions
+    ]
+
+
+@router.get("/getPageRevision/{page_uri}/{revision}", response_model=PageRevisionResponse)
+@limiter.limit(app_config.LIMIT_GET_REVISIONS)
+async def get_page_revision(
+    request: Request,
+    page_uri: str,
+    revision: int,
+    token: str = Query(max_length=128),
+    return_content: bool = Query(True),
+    db: AsyncSession = Depends(get_read_session),
+    page_db: AsyncSession = Depends(get_page_read_session)
+):
+    """ Get Page Revision """
+    
+    try:
+        account = await crud.get_account(db, token)
+        page = await crud.get_page(page_db, page_uri, with_content=False)
+        
+        if not is_can_edit(account, page):
+            raise PageEditForbiddenException()
+        
+        page_revision, content = await crud.get_page_revision(page_db, page.id, revision)
+        
+    except AccountNotFoundException:
+        raise HTTPException(401, "Unauthorized")
+    except (PageNotFoundException, PageRevisionNotFoundException):
+        raise HTTPException(404, "Not Found")
+    except PageEditForbiddenException:
+        raise HTTPException(403, "Forbidden")
+    
+    return PageRevisionResponse(
+        revision=page_revision.revision,
+        title=page_revision.title,
+        size=page_revision.size,
+        created=page_revision.created,
+        content=json.loads(content) if return_content else []
+    )
+
+
 @router.get("/addView/{page_uri}")
 @limiter.limit(app_config.LIMIT_ADD_VIEW)
 async def add_view(
     request: Request,
     page_uri: str,
-    db: AsyncSession = Depends(get_async_session)
+    db: AsyncSession = Depends(get_page_primary_session)
 ):
     """ Add view """
     
     try:
-        page = await crud.get_page(db, page_uri)
+        page = await crud.get_page(db, page_uri, with_content=False)
     except PageNotFoundException:
         raise HTTPException(404, "Not Found")
     else:
@@ -395,21 +575,64 @@ async def add_view(
         if user_agent is None:
             return HTTPException(403, "Your User-Agent is Forbidden")
         
-        hashed_info = coders.calc_sha256(
-            ip, user_agent,
-            b64=True
-        )
+        visitor = coders.calc_digest(ip, user_agent)
+        
+        if app_config.VIEWS_MODE == "hll":
+            view_sketches.add(shards.index(page_uri), page.id, visitor)
+            return {
+                "ok": True
+            }
         
         try:
-            await crud.add_view(
-                db,
-                ip=ip,
-                hashed_info=hashed_info,
-                page_id=page.id
-            )
+            await db.close()
+            await writes.add_view(shards.index(page_uri), coders.pack_ip(ip), visitor, page.id)
         except Exception:
             ...
 
     return {
         "ok": True
     }
+
+
+@router.get("/getPageFilterStats")
+@limiter.limit(app_config.LIMIT_GET_ACCOUNT)
+async def get_page_filter_stats(
+    request: Request,
+    token: str = Query(max_length=128),
+    rebuild: bool = Query(False),
+    db: AsyncSession = Depends(get_primary_session)
+):
+    """ Page URI filter stats of this worker (Admin only) """
+    
+    try:
+        account = await crud.get_account(db, token)
+    except AccountNotFoundException:
+        raise HTTPException(401, "Unauthorized")
+    
+    if not account.is_admin:
+        raise HTTPException(403, "Forbidden")
+    
+    if rebuild and app_config.PAGES_FILTER_ENABLED:
+        await page_filter.build()
+    
+    return page_filter.stats()
+
+
+@router.get("/getDBStats")
+@limiter.limit(app_config.LIMIT_GET_ACCOUNT)
+async def get_db_stats(
+    request: Request,
+    token: str = Query(max_length=128),
+    db: AsyncSession = Depends(get_primary_session)
+):
+    """ Connection pool stats of this worker (Admin only) """
+    
+    try:
+        account = await crud.get_account(db, token)
+    except AccountNotFoundException:
+        raise HTTPException(401, "Unauthorized")
+    
+    if not account.is_admin:
+        raise HTTPException(403, "Forbidden")
+    
+    return async_db.pool_stats()
@@ -1,33 +1,24 @@
 from datetime import datetime, UTC
 from os import path
 
-from fastapi import APIRouter, Request, Depends
+from fastapi import APIRouter, Request
 from fastapi.responses import HTMLResponse
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
 from starlette.routing import Router
-from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.repository import crud
-from src.api.dependencies import get_async_session
+from src.api.dependencies import is_recent_write
+from src.repository import reader
 from src.exceptions import PageNotFoundException
 from src.models.schemas import (
     PageResponse
 )
-from src.utils.html import (
-    node_to_html,
-    parse_nodes_from_str,
-    get_preview_from_nodes
-)
-
+from src.frontend_shell import assets, front_path, page_shell, templates
+from src.utils.assets import AssetFiles
 
-front_path = path.join("src", "frontend")
 
 router = APIRouter(tags=["frontend"])
 static_router = Router()
 
-static_router.mount("/", StaticFiles(directory=path.join(front_path, "static")), name="static")
-templates = Jinja2Templates(directory=path.join(front_path, "templates"))
+static_router.mount("/", AssetFiles(assets, directory=path.join(front_path, "static")), name="static")
 
 
 @router.get("/")
@@ -65,11 +56,10 @@ async def get_account_page_front(request: Request):
 @router.get("/{page_uri}", response_class=HTMLResponse)
 async def get_page_front(
     request: Request,
-    page_uri: str,
-    db: AsyncSession = Depends(get_async_session)
+    page_uri: str
 ):
     try:
-        page = await crud.get_page(db, page_uri)
+        page_response = await reader.get_page_context(page_uri, primary=is_recent_write(request))
     except PageNotFoundException:
         return templates.TemplateResponse(
             request=request, name="error_page.html", context={
@@ -79,20 +69,6 @@ async def get_page_front(
             },
             status_code=404
         )
-        
-    nodes = parse_nodes_from_str(page.content)
     
-    page_response = PageResponse(
-        path=page.page_uri,
-        author_name=page.author_name,
-        author_url=page.author_url,
-        title=page.title,
-        image_url=get_preview_from_nodes(nodes) or "",
-        can_edit=False,
-        created=page.created,
-        html_content=node_to_html(nodes)
-    ).model_dump(mode="python", exclude_defaults=True)
-    
-    return templates.TemplateResponse(
-        request=request, name="view_page.html", context=page_response
-    )
+    # context is shared between coalesced requests (not modified by the shell)
+    return HTMLResponse(page_shell.render(page_response))
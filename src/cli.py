@@ -0,0 +1,145 @@
+import argparse
+import asyncio
+import logging
+
+from alembic import command as alembic_command
+from alembic.config import Config as AlembicConfig
+
+from src.config import app_config
+from src.repository.database import async_db
+from src.repository import crud, sharded, snapshots
+from src.repository.sharding import shards
+from src.frontend_shell import assets
+
+
+logging.basicConfig(level=app_config.LOGGING_LEVEL)
+logger = logging.getLogger(__name__)
+
+
+def upgrade_database(url: str | None = None) -> None:
+    """ alembic upgrade head of DB_URL (or of the shard `url`) """
+    config = AlembicConfig("alembic.ini")
+    config.cmd_opts = argparse.Namespace(x=[f"shard={url}"] if url else [])
+    alembic_command.upgrade(config, "head")
+
+
+async def migrate(args: argparse.Namespace) -> None:
+    shard_urls = [url for url in dict.fromkeys(app_config.DB_SHARD_URLS) if url != app_config.DATABASE_URL]
+    # alembic runs its own event loop (and its logging config from alembic.ini)
+    await asyncio.to_thread(upgrade_database)
+    for url in shard_urls:
+        await asyncio.to_thread(upgrade_database, url)
+
+
+async def backfill_views(args: argparse.Namespace) -> None:
+    count = 0
+    for database in shards:
+        async with database.async_session() as db:
+            count += await crud.backfill_view_rollups(db, batch_size=args.batch_size)
+    logger.info(f"Rollups rebuilt from {count} views")
+
+
+async def build_view_sketches(args: argparse.Namespace) -> None:
+    count = 0
+    for database in shards:
+        async with database.async_session() as db:
+            count += await crud.build_view_sketches(db, args.precision, batch_size=args.batch_size)
+    logger.info(f"Sketches built from {count} views")
+
+
+async def render_contents(args: argparse.Namespace) -> None:
+    count = 0
+    for database in shards:
+        async with database.async_session() as db:
+            count += await crud.render_page_contents(db, rerender=args.all, batch_size=args.batch_size)
+    logger.info(f"Rendered {count} contents")
+
+
+async def move_blobs(args: argparse.Namespace) -> None:
+    moved_out = moved_back = 0
+    for database in shards:
+        async with database.async_session() as db:
+            out, back = await crud.move_blobs(db, batch_size=args.batch_size)
+        moved_out, moved_back = moved_out + out, moved_back + back
+    logger.info(f"Moved {moved_out} contents to {app_config.CONTENT_BLOB_DIR}, {moved_back} back to DB")
+
+
+async def gc_blobs(args: argparse.Namespace) -> None:
+    count = await sharded.sweep_blobs(args.grace, batch_size=args.batch_size)
+    logger.info(f"Removed {count} unreferenced blobs")
+
+
+async def publish_pages(args: argparse.Namespace) -> None:
+    if not snapshots.snapshot_store.enabled:
+        raise SystemExit("PAGES_SNAPSHOT_DIR is not set")
+    # snapshots refer to fingerprinted assets
+    assets.build()
+    count = await snapshots.publish_all(workers=args.workers, batch_size=args.batch_size)
+    logger.info(f"Published {count} pages to {app_config.PAGES_SNAPSHOT_DIR}")
+
+
+async def build_assets(args: argparse.Namespace) -> None:
+    count = assets.build()
+    logger.info(f"Built {count} static assets in {app_config.FRONTEND_BUILD_DIR}")
+
+
+async def rebalance_shards(args: argparse.Namespace) -> None:
+    count = await sharded.rebalance(batch_size=args.batch_size)
+    logger.info(f"Moved {count} pages")
+
+
+def init_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m src.cli", description=app_config.TITLE)
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    command = commands.add_parser("migrate", help="Upgrade DB_URL and DB_SHARD_URLS to the latest migration (once per deploy)")
+    command.set_defaults(handler=migrate)
+    
+    command = commands.add_parser("backfill-views", help="Backfill view rollups (getViews) from page_view rows (never lowers them)")
+    command.add_argument("--batch-size", type=int, default=10000)
+    command.set_defaults(handler=backfill_views)
+    
+    command = commands.add_parser("build-view-sketches", help="Build HyperLogLog view sketches (VIEWS_MODE=hll) from page_view rows")
+    command.add_argument("--precision", type=int, default=app_config.VIEWS_HLL_PRECISION)
+    command.add_argument("--batch-size", type=int, default=1000)
+    command.set_defaults(handler=build_view_sketches)
+    
+    command = commands.add_parser("render-contents", help="Render HTML and previews of page contents (after migration)")
+    command.add_argument("--all", action="store_true", help="Re-render rendered contents too")
+    command.add_argument("--batch-size", type=int, default=100)
+    command.set_defaults(handler=render_contents)
+    
+    command = commands.add_parser("move-blobs", help="Move bodies to/from the blob store after CONTENT_BLOB_THRESHOLD changed")
+    command.add_argument("--batch-size", type=int, default=100)
+    command.set_defaults(handler=move_blobs)
+    
+    command = commands.add_parser("gc-blobs", help="Remove blob files of deleted or moved back contents")
+    command.add_argument("--grace", type=float, default=3600, help="Keep files modified in the last N seconds")
+    command.add_argument("--batch-size", type=int, default=1000)
+    command.set_defaults(handler=gc_blobs)
+    
+    command = commands.add_parser("publish-pages", help="Regenerate static snapshots of all pages in PAGES_SNAPSHOT_DIR")
+    command.add_argument("--workers", type=int, default=8)
+    command.add_argument("--batch-size", type=int, default=1000)
+    command.set_defaults(handler=publish_pages)
+    
+    command = commands.add_parser("build-assets", help="Write fingerprinted and precompressed static files (done on startup too)")
+    command.set_defaults(handler=build_assets)
+    
+    command = commands.add_parser("rebalance-shards", help="Move pages to their shards after DB_SHARD_URLS or DB_SHARD_NAMES changed")
+    command.add_argument("--batch-size", type=int, default=1000)
+    command.set_defaults(handler=rebalance_shards)
+    
+    return parser
+
+
+async def run(args: argparse.Namespace) -> None:
+    try:
+        await args.handler(args)
+    finally:
+        await shards.dispose()
+        await async_db.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(run(init_parser().parse_args()))
@@ -19,18 +19,106 @@ class AppConfig:
     SQL_DEBUG: bool = decouple.config("SQL_DEBUG", False, cast=bool)
     API_DOCS: bool = decouple.config("API_DOCS", True, cast=bool)
     FRONTEND_ENABLED: bool = decouple.config("FRONTEND_ENABLED", True, cast=bool)
+    # fingerprinted and precompressed copies of static files, written on startup
+    FRONTEND_BUILD_DIR: str = decouple.config("FRONTEND_BUILD_DIR", "src/frontend/build", cast=str)
     ALLOWED_ORIGINS: str = decouple.config("ALLOWED_ORIGINS", "*", cast=str)
     
     # server options
     SERVER_HOST: str = decouple.config("SERVER_HOST", "0.0.0.0", cast=str)
     SERVER_PORT: int = decouple.config("SERVER_PORT", 8085, cast=int)
     SERVER_WORKERS: int = decouple.config("SERVER_WORKERS", 4, cast=int)
+    # production mode: uvloop + httptools, supervised workers (recycled, drained on SIGTERM),
+    # no migrations on start (python -m src.cli migrate)
+    SERVER_PRODUCTION: bool = decouple.config("SERVER_PRODUCTION", False, cast=bool)
+    SERVER_BACKLOG: int = decouple.config("SERVER_BACKLOG", 2048, cast=int)
+    SERVER_KEEP_ALIVE: int = decouple.config("SERVER_KEEP_ALIVE", 75, cast=int)
+    # SO_REUSEPORT: a new instance can bind the port while the old one drains
+    SERVER_REUSE_PORT: bool = decouple.config("SERVER_REUSE_PORT", True, cast=bool)
+    # worker is restarted after N (+ random 0..JITTER) requests (0 - never)
+    SERVER_MAX_REQUESTS: int = decouple.config("SERVER_MAX_REQUESTS", 10000, cast=int)
+    SERVER_MAX_REQUESTS_JITTER: int = decouple.config("SERVER_MAX_REQUESTS_JITTER", 1000, cast=int)
+    # seconds to finish open requests on SIGTERM / recycling
+    SERVER_GRACEFUL_TIMEOUT: int = decouple.config("SERVER_GRACEFUL_TIMEOUT", 30, cast=int)
     
     # database
     DATABASE_URL: str = decouple.config("DB_URL", cast=str)
     DB_POOL_SIZE: int = decouple.config("DB_POOL_SIZE", 100, cast=int)
     DB_POOL_OVERFLOW: int = decouple.config("DB_POOL_OVERFLOW", 20, cast=int)
     DB_TIMEOUT: int = decouple.config("DB_TIMEOUT", 5, cast=int)
+    # connections of all workers to all databases, split between workers and
+    # their engines (0 - DB_POOL_SIZE/DB_POOL_OVERFLOW per engine)
+    DB_MAX_CONNECTIONS: int = decouple.config("DB_MAX_CONNECTIONS", 0, cast=int)
+    # behind PgBouncer in transaction mode: no prepared statement cache
+    DB_PGBOUNCER: bool = decouple.config("DB_PGBOUNCER", False, cast=bool)
+    # read replicas (comma separated URLs) for read-only routes
+    DB_REPLICA_URLS: List[str] = decouple.config("DB_REPLICA_URLS", "", cast=decouple.Csv())
+    DB_REPLICA_MODE: str = decouple.config("DB_REPLICA_MODE", "round_robin", cast=str).lower()
+    # reads by a token (or of a page) written in the last N seconds go to primary
+    DB_READ_YOUR_WRITES: float = decouple.config("DB_READ_YOUR_WRITES", 10, cast=float)
+    # pages (with views, revisions, ...) sharded by URI over these databases,
+    # accounts stay in DB_URL (empty - everything in DB_URL)
+    DB_SHARD_URLS: List[str] = decouple.config("DB_SHARD_URLS", "", cast=decouple.Csv())
+    # stable names of DB_SHARD_URLS (same order) keying the hash ring (empty - shard0, shard1, ...)
+    DB_SHARD_NAMES: List[str] = decouple.config("DB_SHARD_NAMES", "", cast=decouple.Csv())
+    # sqlite: WAL, reader pool, single writer connection fed by a write queue (views are group-committed)
+    SQLITE_TUNED: bool = decouple.config("SQLITE_TUNED", True, cast=bool)
+    SQLITE_READERS: int = decouple.config("SQLITE_READERS", 8, cast=int)
+    SQLITE_MMAP_SIZE: int = decouple.config("SQLITE_MMAP_SIZE", 268435456, cast=int)
+    SQLITE_BUSY_TIMEOUT: float = decouple.config("SQLITE_BUSY_TIMEOUT", 5, cast=float)
+    SQLITE_WRITE_BATCH: int = decouple.config("SQLITE_WRITE_BATCH", 500, cast=int)
+    
+    # content
+    CONTENT_MAX_DEPTH: int = decouple.config("CONTENT_MAX_DEPTH", 64, cast=int)
+    CONTENT_MAX_NODES: int = decouple.config("CONTENT_MAX_NODES", 100000, cast=int)
+    CONTENT_MAX_BODY_SIZE: int = decouple.config("CONTENT_MAX_BODY_SIZE", 1048576 + 65536, cast=int)
+    # bodies larger than N bytes are stored as files in CONTENT_BLOB_DIR (0 - all in DB)
+    CONTENT_BLOB_THRESHOLD: int = decouple.config("CONTENT_BLOB_THRESHOLD", 0, cast=int)
+    CONTENT_BLOB_DIR: str = decouple.config("CONTENT_BLOB_DIR", "/var/lib/telegraphy/blobs", cast=str)
+    
+    # revisions
+    REVISIONS_ENABLED: bool = decouple.config("REVISIONS_ENABLED", True, cast=bool)
+    REVISION_SNAPSHOT_INTERVAL: int = decouple.config("REVISION_SNAPSHOT_INTERVAL", 32, cast=int)
+    REVISION_DELTA_MAX_NODES: int = decouple.config("REVISION_DELTA_MAX_NODES", 1000, cast=int)
+    
+    # views
+    # exact: one page_view row per visitor; hll: HyperLogLog sketch per page (approximate)
+    VIEWS_MODE: str = decouple.config("VIEWS_MODE", "exact", cast=str).lower()
+    VIEWS_HLL_PRECISION: int = decouple.config("VIEWS_HLL_PRECISION", 12, cast=int)
+    VIEWS_FLUSH_INTERVAL: float = decouple.config("VIEWS_FLUSH_INTERVAL", 5, cast=float)
+    # page_view rows older than N days are folded into per-page counts (0 - keep forever)
+    VIEWS_RETENTION_DAYS: float = decouple.config("VIEWS_RETENTION_DAYS", 0, cast=float)
+    VIEWS_COMPACT_INTERVAL: float = decouple.config("VIEWS_COMPACT_INTERVAL", 3600, cast=float)
+    VIEWS_COMPACT_BATCH: int = decouple.config("VIEWS_COMPACT_BATCH", 1000, cast=int)
+    
+    # pages
+    # soft-deleted pages are purged (with views) after N days (0 - keep forever)
+    PAGES_PURGE_DAYS: float = decouple.config("PAGES_PURGE_DAYS", 0, cast=float)
+    PAGES_PURGE_INTERVAL: float = decouple.config("PAGES_PURGE_INTERVAL", 3600, cast=float)
+    PAGES_PURGE_BATCH: int = decouple.config("PAGES_PURGE_BATCH", 10, cast=int)
+    # max offset of getPages (with shards every shard reads offset + limit pages)
+    PAGES_MAX_OFFSET: int = decouple.config("PAGES_MAX_OFFSET", 1000, cast=int)
+    # in-memory filter of existing URIs: unknown URIs get 404 without a DB query
+    PAGES_FILTER_ENABLED: bool = decouple.config("PAGES_FILTER_ENABLED", False, cast=bool)
+    PAGES_FILTER_ERROR_RATE: float = decouple.config("PAGES_FILTER_ERROR_RATE", 0.01, cast=float)
+    # cache of page reads/renders per worker (0 - disabled), not shared between workers
+    PAGES_CACHE_TTL: float = decouple.config("PAGES_CACHE_TTL", 0, cast=float)
+    PAGES_CACHE_SIZE: int = decouple.config("PAGES_CACHE_SIZE", 1000, cast=int)
+    # most requested pages are saved every N seconds and prewarmed on startup
+    PAGES_HOT_TOP: int = decouple.config("PAGES_HOT_TOP", 100, cast=int)
+    PAGES_HOT_INTERVAL: float = decouple.config("PAGES_HOT_INTERVAL", 60, cast=float)
+    # rendered pages are written to PAGES_SNAPSHOT_DIR for the web server ("" - disabled)
+    PAGES_SNAPSHOT_DIR: str = decouple.config("PAGES_SNAPSHOT_DIR", "", cast=str)
+    
+    # jobs
+    # derived work of writes (content rendering, snapshots) queued in the page's database,
+    # run by N concurrent tasks per worker (0 - in the request, no queue)
+    JOBS_WORKERS: int = decouple.config("JOBS_WORKERS", 4, cast=int)
+    JOBS_POLL_INTERVAL: float = decouple.config("JOBS_POLL_INTERVAL", 1, cast=float)
+    # a claimed job runs again if not finished in N seconds (worker died)
+    JOBS_LEASE: float = decouple.config("JOBS_LEASE", 300, cast=float)
+    JOBS_MAX_ATTEMPTS: int = decouple.config("JOBS_MAX_ATTEMPTS", 5, cast=int)
+    # seconds before a retry, doubled after each failure
+    JOBS_RETRY_DELAY: float = decouple.config("JOBS_RETRY_DELAY", 10, cast=float)
     
     # limits
     LIMIT_CREATE_ACCOUNT: str = decouple.config("LIMIT_CREATE_ACCOUNT", "3/second", cast=str)
@@ -43,6 +131,8 @@ class AppConfig:
     LIMIT_GET_ACCOUNT: str = decouple.config("LIMIT_GET_ACCOUNT", "1000/second", cast=str)
     LIMIT_GET_PAGE: str = decouple.config("LIMIT_GET_PAGE", "2500/second", cast=str)
     LIMIT_GET_PAGES: str = decouple.config("LIMIT_GET_PAGES", "500/second", cast=str)
+    LIMIT_GET_VIEWS: str = decouple.config("LIMIT_GET_VIEWS", "1000/second", cast=str)
+    LIMIT_GET_REVISIONS: str = decouple.config("LIMIT_GET_REVISIONS", "100/second", cast=str)
     
     # etc
     LOGGING_LEVEL: int = getattr(
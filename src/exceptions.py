@@ -12,3 +12,11 @@ class PageNotFoundException(TelegraphyException):
 
 class PageEditForbiddenException(TelegraphyException):
     pass
+
+
+class PageEditConflictException(TelegraphyException):
+    pass
+
+
+class PageRevisionNotFoundException(TelegraphyException):
+    pass
@@ -89,6 +89,32 @@ async function sendRequestPost(uri, data) {
     }
 }
 
+async function sendRequestPostJson(uri, data) {
+    const url = `${window.location.origin}${uri}`;
+
+    try {
+        const response = await fetch(url, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify(data),
+        });
+
+        if (!response.ok) {
+            throw new Error(`HTTP error! Status: ${response.status}`);
+        }
+
+        const result = await response.json();
+        console.log('Success:', result);
+        return result;
+
+    } catch (error) {
+        console.error('Error:', error);
+        return null;
+    }
+}
+
 async function getAccount(token) {
     return sendRequestGet(`/api/getAccountInfo?token=${token}`);
 }
@@ -105,11 +131,11 @@ async function getPageWithToken(pageUri, token) {
 }
 
 async function editPage(token, pageUri, data) {
-    return sendRequestPost(`/api/editPage/${pageUri}`, `token=${token}&${data}`);
+    return sendRequestPostJson(`/api/editPage/${pageUri}`, { ...data, token: token, return_content: false });
 }
 
 async function createPage(token, data) {
-    return sendRequestPost(`/api/createPage`, `token=${token}&${data}`);
+    return sendRequestPostJson(`/api/createPage`, { ...data, token: token, return_content: false });
 }
 
 async function deletePage(token, pageUri) {
@@ -142,7 +142,7 @@ document.getElementById('save-html').addEventListener('click', () => {
     pageData.title = document.getElementById("title").textContent.slice(0, 256);
     pageData.author_name = authorEL.textContent.slice(0, 128);
     pageData.author_url = document.getElementById("link-input").innerText.slice(0, 512);
-    pageData.content = JSON.stringify(domToNode(htmlContent).children);
+    pageData.content = domToNode(htmlContent).children;
 
     (async () => {
         const account = await autoCreateAccount();
@@ -153,7 +153,7 @@ document.getElementById('save-html').addEventListener('click', () => {
             r = await editPage(
                 account.access_token,
                 pageUri,
-                new URLSearchParams(pageData).toString()
+                pageData
             )
             saveBtn.disabled = false;
             if (r) {
@@ -164,7 +164,7 @@ document.getElementById('save-html').addEventListener('click', () => {
         } else {
             r = await createPage(
                 account.access_token,
-                new URLSearchParams(pageData).toString()
+                pageData
             )
             saveBtn.disabled = false;
             if (r) {
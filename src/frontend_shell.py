@@ -0,0 +1,20 @@
+from os import path
+
+from fastapi.templating import Jinja2Templates
+from jinja2 import FileSystemBytecodeCache
+
+from src.config import app_config
+from src.utils.assets import AssetManifest
+from src.utils.template_shell import TemplateShell
+
+
+front_path = path.join("src", "frontend")
+
+# fingerprinted copies are built on startup (main.lifespan)
+assets = AssetManifest(path.join(front_path, "static"), app_config.FRONTEND_BUILD_DIR)
+templates = Jinja2Templates(directory=path.join(front_path, "templates"))
+templates.env.globals["static_url"] = assets.url
+# compiled templates survive restarts (per-worker compile on first use otherwise)
+templates.env.bytecode_cache = FileSystemBytecodeCache()
+# view_page.html without Jinja per request (shells are compiled on first use, after assets build)
+page_shell = TemplateShell(templates.get_template("view_page.html"))
@@ -1,4 +1,10 @@
 from .entities import (
     Account,
-    Page
+    Page,
+    PageView,
+    PageRevision,
+    PageViewRollup,
+    PageViewSketch,
+    PageViewCompacted,
+    PageHit
 )
@@ -3,7 +3,8 @@ from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy import (
     String, Integer, DateTime,
     ForeignKey, PrimaryKeyConstraint, 
-    func, Boolean
+    func, false, Boolean, LargeBinary,
+    Index, UniqueConstraint
 )
 
 from src.repository.table import Base
@@ -30,29 +31,159 @@ class Page(Base):
     author_name: Mapped[str] = mapped_column(String(128), nullable=False)
     author_url: Mapped[str] = mapped_column(String(512), default="")
     account_id: Mapped[int] = mapped_column(ForeignKey("account.id"))
-    content: Mapped[str] = mapped_column(String(1048576), default="")
+    content_hash: Mapped[bytes] = mapped_column(ForeignKey("page_content.hash"), nullable=False, index=True)
     is_deleted: Mapped[bool] = mapped_column(Boolean, server_default="f", default=False)
+    deleted: Mapped[datetime.datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
     created: Mapped[datetime.datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
     
     account: Mapped["Account"] = relationship(
         "Account",
         lazy="joined"
     )
+    body: Mapped["PageContent"] = relationship(
+        "PageContent",
+        lazy="joined"
+    )
+    
+    @property
+    def content(self) -> str:
+        return self.body.content
+
+
+class PageContent(Base):
+    """ Page body shared by pages with the same (normalized) content, see crud.acquire_content """
+    __tablename__ = "page_content"
+    
+    hash: Mapped[bytes] = mapped_column(LargeBinary(32), primary_key=True)
+    # NULL - stored in the blob store (crud.load_content)
+    content: Mapped[str | None] = mapped_column(String(1048576), nullable=True)
+    blob: Mapped[bool] = mapped_column(Boolean, server_default=false(), default=False)
+    # derived from content once per body, NULL - not rendered yet (cli render-contents)
+    html: Mapped[str | None] = mapped_column(String(4194304), nullable=True, deferred=True)
+    preview: Mapped[str | None] = mapped_column(String(2048), nullable=True)
+    refs: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    created: Mapped[datetime.datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+
+# partial indexes (full ones on dialects without support)
+Index(
+    "ix_page_account_id_created_active",
+    Page.account_id, Page.created,
+    postgresql_where=(Page.is_deleted == False),
+    sqlite_where=(Page.is_deleted == False)
+)
+Index(
+    "ix_page_deleted",
+    Page.deleted,
+    postgresql_where=(Page.is_deleted == True),
+    sqlite_where=(Page.is_deleted == True)
+)
 
 
 class PageView(Base):
     __tablename__ = "page_view"
 
-    ip: Mapped[str] = mapped_column(String(64), nullable=False)
-    user_agent_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    # packed IP (coders.pack_ip) and truncated hash of IP + User-Agent (coders.calc_digest)
+    ip: Mapped[bytes] = mapped_column(LargeBinary(16), nullable=False)
+    visitor: Mapped[bytes] = mapped_column(LargeBinary(16), nullable=False)
     page_id: Mapped[int] = mapped_column(ForeignKey("page.id", ondelete="CASCADE", onupdate="CASCADE"))
-    time: Mapped[datetime.datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    time: Mapped[datetime.datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), index=True)
     
     __table_args__ = (
-        PrimaryKeyConstraint("ip", "user_agent_hash", "page_id", name="pr__ip__user_agent_hash__page_id"),
+        PrimaryKeyConstraint("ip", "visitor", "page_id", name="pr__ip__visitor__page_id"),
     )
     
     page: Mapped["Page"] = relationship(
         "Page",
         lazy="joined"
     )
+
+
+class PageRevision(Base):
+    __tablename__ = "page_revision"
+
+    page_id: Mapped[int] = mapped_column(ForeignKey("page.id", ondelete="CASCADE", onupdate="CASCADE"))
+    revision: Mapped[int] = mapped_column(Integer, nullable=False)
+    title: Mapped[str] = mapped_column(String(256), nullable=False)
+    is_snapshot: Mapped[bool] = mapped_column(Boolean, server_default="f", default=False)
+    data: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    size: Mapped[int] = mapped_column(Integer, nullable=False)
+    # base of the next delta; NULL (older revisions) - next one is a snapshot
+    content_hash: Mapped[bytes | None] = mapped_column(LargeBinary(32), nullable=True)
+    created: Mapped[datetime.datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        PrimaryKeyConstraint("page_id", "revision", name="pr__page_id__revision"),
+    )
+
+
+class PageViewRollup(Base):
+    __tablename__ = "page_view_rollup"
+
+    page_id: Mapped[int] = mapped_column(ForeignKey("page.id", ondelete="CASCADE", onupdate="CASCADE"))
+    period: Mapped[str] = mapped_column(String(8), nullable=False)
+    bucket: Mapped[datetime.datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    views: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        PrimaryKeyConstraint("page_id", "period", "bucket", name="pr__page_id__period__bucket"),
+    )
+
+
+class PageViewSketch(Base):
+    __tablename__ = "page_view_sketch"
+
+    page_id: Mapped[int] = mapped_column(
+        ForeignKey("page.id", ondelete="CASCADE", onupdate="CASCADE"),
+        primary_key=True
+    )
+    sketch: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    views: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    updated: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
+
+class PageViewCompacted(Base):
+    __tablename__ = "page_view_compacted"
+
+    page_id: Mapped[int] = mapped_column(
+        ForeignKey("page.id", ondelete="CASCADE", onupdate="CASCADE"),
+        primary_key=True
+    )
+    views: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+class PageHit(Base):
+    __tablename__ = "page_hit"
+
+    page_id: Mapped[int] = mapped_column(
+        ForeignKey("page.id", ondelete="CASCADE", onupdate="CASCADE"),
+        primary_key=True
+    )
+    hits: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    updated: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, index=True
+    )
+
+
+class Job(Base):
+    """ Work derived from a write, one row per (kind, arg), see repository/jobs.py """
+    __tablename__ = "job"
+    
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    kind: Mapped[str] = mapped_column(String(32), nullable=False)
+    arg: Mapped[str] = mapped_column(String(512), nullable=False)
+    # NULL - failed JOBS_MAX_ATTEMPTS times (kept with the error until queued again)
+    run_after: Mapped[datetime.datetime | None] = mapped_column(DateTime(timezone=True), nullable=True, index=True)
+    # claimed by a worker until then (after it the job runs again)
+    locked_until: Mapped[datetime.datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    # bumped on enqueue and claim: a job queued again while running is not removed
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    error: Mapped[str | None] = mapped_column(String(1024), nullable=True)
+    created: Mapped[datetime.datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        UniqueConstraint("kind", "arg", name="uq__kind__arg"),
+    )
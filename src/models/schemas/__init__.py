@@ -1,5 +1,10 @@
 from .base import TelegraphyObj, TelegraphyObjExcludeNone
 from .node import Node, NodeElement
 from .account import AccountResponse, AccountEditedResponse
-from .page import PageResponse, PageOrderBy
+from .page import (
+    PageResponse, PageOrderBy,
+    PageCreateRequest, PageEditRequest,
+    PagePatchOperation, PageRevisionResponse,
+    PageViewsResponse
+)
 from .order_mode import OrderMode
@@ -1,10 +1,10 @@
-from typing import List
+from typing import Any, List, Annotated, Literal
 from datetime import datetime, UTC
 from enum import Enum
 
 from pydantic import Field
 
-from . import TelegraphyObjExcludeNone, NodeElement
+from . import TelegraphyObj, TelegraphyObjExcludeNone, NodeElement
 
 
 class PageResponse(TelegraphyObjExcludeNone):
@@ -23,6 +23,73 @@ class PageResponse(TelegraphyObjExcludeNone):
     html_content: str = Field(default="")
 
 
+class PageViewsResponse(TelegraphyObj):
+    """
+    This object represents the number of page views.
+    """
+    views: int = Field(default=0)
+
+
+class PageRevisionResponse(TelegraphyObjExcludeNone):
+    """
+    This object represents a revision of a page.
+    """
+    revision: int
+    title: str = Field(max_length=256)
+    size: int = Field(default=0)
+    created: datetime = Field(default=datetime.now(UTC))
+    content: List[NodeElement | str] = Field(default=[])
+
+
+PageContent = Annotated[str, Field(max_length=1048576)] | List[Any]
+
+
+class PageCreateRequest(TelegraphyObj):
+    """
+    This object represents a createPage request body.
+    `content` is a JSON array of Nodes (or the same array encoded as string).
+    """
+    token: str = Field(max_length=128)
+    content: PageContent = Field(
+        description="""This abstract object represents a DOM Node.
+                    It can be a String which represents a DOM text node or a NodeElement object""",
+        examples=[["Hello ", {"tag": "b", "children": ["World", {"tag": "i", "children": ["!"]}]}]]
+    )
+    title: str = Field(min_length=1, max_length=256)
+    author_name: str | None = Field(None, max_length=128)
+    author_url: str | None = Field(None, max_length=512)
+    return_content: bool = Field(True)
+
+
+class PagePatchOperation(TelegraphyObj):
+    """
+    This object represents a JSON-Patch-style operation over page Nodes.
+    `path` addresses a node: `/0`, `/0/children/2`, `/1/children/-` (append, only for `add`).
+    """
+    op: Literal["add", "remove", "replace"]
+    path: str = Field(max_length=1024)
+    value: Any = Field(None)
+
+
+class PageEditRequest(TelegraphyObj):
+    """
+    This object represents an editPage request body.
+    Pass either full `content` or `patch` operations.
+    """
+    token: str = Field(max_length=128)
+    content: PageContent | None = Field(
+        None,
+        description="""This abstract object represents a DOM Node.
+                    It can be a String which represents a DOM text node or a NodeElement object""",
+        examples=[["Hello ", {"tag": "b", "children": ["World", {"tag": "i", "children": ["!"]}]}]]
+    )
+    patch: List[PagePatchOperation] | None = Field(None, max_length=1000)
+    title: str | None = Field(None, min_length=1, max_length=256)
+    author_name: str | None = Field(None, max_length=128)
+    author_url: str | None = Field(None, max_length=512)
+    return_content: bool = Field(True)
+
+
 class PageOrderBy(Enum):
     TITLE: str = "title"
     VIEWS: str = "views"
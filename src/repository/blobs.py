@@ -0,0 +1,82 @@
+import os
+import mmap
+import time
+import uuid
+import asyncio
+from pathlib import Path
+from typing import Iterator
+
+from src.config import app_config
+
+
+class BlobStore:
+    """
+    Page bodies (and derived files: <hash>.html) as files named by content hash:
+    <root>/ab/cd/abcd... Written once (temp file + atomic rename), read via mmap.
+    Files are not removed with their rows, see crud.sweep_blobs
+    """
+
+    def __init__(self, root: str) -> None:
+        self.root = Path(root)
+
+    def path(self, key: bytes, suffix: str = "") -> Path:
+        name = key.hex()
+        return self.root / name[:2] / name[2:4] / (name + suffix)
+
+    def _write(self, key: bytes, content: str, suffix: str) -> None:
+        path = self.path(key, suffix)
+        if path.exists():
+            # reused: keep it out of the sweep grace period
+            os.utime(path)
+            return
+        
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            with open(tmp, "wb") as file:
+                file.write(content.encode())
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(tmp, path)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+
+    def _read(self, key: bytes, suffix: str) -> str:
+        with open(self.path(key, suffix), "rb") as file:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return str(mapped, "utf-8")
+
+    async def write(self, key: bytes, content: str, suffix: str = "") -> None:
+        await asyncio.to_thread(self._write, key, content, suffix)
+
+    async def read(self, key: bytes, suffix: str = "") -> str:
+        """ Raises FileNotFoundError """
+        return await asyncio.to_thread(self._read, key, suffix)
+
+    def keys(self, older_than: float = 0) -> Iterator[bytes]:
+        """ Keys of files not modified in the last `older_than` seconds (stale temp files are removed) """
+        if not self.root.is_dir():
+            return
+        
+        before = time.time() - older_than
+        for path in self.root.glob("*/*/*"):
+            try:
+                if path.stat().st_mtime > before:
+                    continue
+            except FileNotFoundError:
+                continue
+            
+            if path.name.startswith("."):
+                path.unlink(missing_ok=True)
+                continue
+            yield bytes.fromhex(path.name.split(".")[0])
+
+    def delete(self, key: bytes) -> None:
+        """ Remove body with derived files """
+        path = self.path(key)
+        for file in path.parent.glob(f"{path.name}*"):
+            file.unlink(missing_ok=True)
+
+
+blob_store = BlobStore(app_config.CONTENT_BLOB_DIR)
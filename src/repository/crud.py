@@ -1,23 +1,43 @@
-from typing import List
+import json
+import datetime
+from typing import Dict, Iterator, List
 
-from sqlalchemy import select, func, desc, asc
+from sqlalchemy import (
+    select, update, delete,
+    func, desc, asc, tuple_, or_
+)
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import defer, joinedload, undefer
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.dialects import (
+    postgresql, sqlite, mysql
+)
 from sqlalchemy.exc import (
     NoResultFound,
     IntegrityError
 )
 
+from src.config import app_config
 from src.utils import coders
 from src.utils import html
+from src.utils import delta
+from src.utils.hll import HyperLogLog
+from src.repository.page_filter import page_filter
+from src.repository.blobs import blob_store
 from src.models.schemas import (
     PageOrderBy, OrderMode
 )
 from src.models.entities import (
-    Account, Page, PageView
+    Account, Page, PageContent, PageView,
+    PageRevision, PageViewRollup,
+    PageViewSketch, PageViewCompacted,
+    PageHit, Job
 )
 from src.exceptions import (
     AccountNotFoundException,
-    PageNotFoundException
+    PageEditConflictException,
+    PageNotFoundException,
+    PageRevisionNotFoundException
 )
 
 
@@ -64,22 +84,38 @@ async def get_page(
     db: AsyncSession,
     page_uri: str,
     raise_e: bool = True,
-    raise_is_del: bool = True
+    raise_is_del: bool = True,
+    with_html: bool = False,
+    with_content: bool = True
 ) -> Page | None:
-    result = await db.execute(
-        select(Page)
-        .where(Page.page_uri.ilike(page_uri))
-    )
+    """
+    :param with_html: load rendered `page.body.html` (deferred)
+    :param with_content: read the body if it's in the blob store
+    """
+    if not await page_filter.might_exist(page_uri):
+        if raise_e:
+            raise PageNotFoundException()
+        return None
+    
+    stmt = select(Page).where(Page.page_uri.ilike(page_uri))
+    if with_html:
+        stmt = stmt.options(joinedload(Page.body).undefer(PageContent.html))
+    
+    result = await db.execute(stmt)
     try:
         page = result.scalars().one()
     except NoResultFound:
         page = None
+        page_filter.report_false_positive()
     
     if raise_e and (
         (page is None) or (raise_is_del and page.is_deleted)
     ):
         raise PageNotFoundException()
     
+    if page is not None and with_content:
+        await load_content(page.body, with_html)
+    
     return page
 
 
@@ -100,21 +136,31 @@ async def edit_account_info(
         await db.commit()
     except IntegrityError:
         await db.rollback()
-        await db.refresh(account)
+    await db.refresh(account)
     
     return account
 
 
-async def get_account_page_count(
+async def reset_account_token(
     db: AsyncSession,
     token: str
-) -> int:
+) -> Account:
     account = await get_account(db, token)
+    account.token = coders.generate_token()
+    await db.commit()
+    await db.refresh(account)
+    
+    return account
+
 
+async def get_account_page_count(
+    db: AsyncSession,
+    acc_id: int
+) -> int:
     result = await db.execute(
         select(func.count())
         .select_from(Page)
-        .where(Page.account_id == account.id)
+        .where(Page.account_id == acc_id)
     )
     count = result.scalar_one_or_none() or 0
     
@@ -131,8 +177,10 @@ async def get_account_pages(
     order_mode: OrderMode = OrderMode.DESC,
     hide_is_del: bool = True
 ) -> List[Page]:
+    """ Pages without bodies (only `page.body.preview` is loaded) """
     stmt = (
         select(Page)
+        .options(joinedload(Page.body).load_only(PageContent.preview))
         .where(Page.account_id == acc_id)
         .where(Page.title.ilike(f"%{query.lower()}%"))
     )
@@ -151,11 +199,21 @@ async def get_account_pages(
     elif order_by == PageOrderBy.TITLE:
         stmt = stmt.order_by(order_func(Page.title))
         
+    elif order_by == PageOrderBy.VIEWS and app_config.VIEWS_MODE == "hll":
+        stmt = (
+            stmt.outerjoin(PageViewSketch, Page.id == PageViewSketch.page_id)
+            .order_by(order_func(func.coalesce(PageViewSketch.views, 0)))
+        )
+        
     elif order_by == PageOrderBy.VIEWS:
         stmt = (
             stmt.outerjoin(PageView, Page.id == PageView.page_id)
+            .outerjoin(PageViewCompacted, Page.id == PageViewCompacted.page_id)
             .group_by(Page.id)
-            .order_by(order_func(func.count(PageView.page_id)))
+            .order_by(order_func(
+                func.count(PageView.page_id)
+                + func.coalesce(func.max(PageViewCompacted.views), 0)
+            ))
         )
     
     stmt = stmt.limit(limit).offset(offset)
@@ -171,21 +229,36 @@ async def get_account_pages_views(
     acc_id: int,
     hide_is_del: bool = True
 ) -> int:
-    stmt = (
-        select(func.count(PageView.page_id))
-        .select_from(PageView)
-        .join(Page, Page.id == PageView.page_id)
-        .filter(Page.account_id == acc_id)
-    )
-    
-    if hide_is_del:
-        stmt = (
-            stmt
-            .filter(Page.is_deleted == False)
-        )
+    if app_config.VIEWS_MODE == "hll":
+        stmts = [
+            select(func.sum(PageViewSketch.views))
+            .select_from(PageViewSketch)
+            .join(Page, Page.id == PageViewSketch.page_id)
+            .filter(Page.account_id == acc_id)
+        ]
+    else:
+        stmts = [
+            select(func.count(PageView.page_id))
+            .select_from(PageView)
+            .join(Page, Page.id == PageView.page_id)
+            .filter(Page.account_id == acc_id),
+            
+            select(func.sum(PageViewCompacted.views))
+            .select_from(PageViewCompacted)
+            .join(Page, Page.id == PageViewCompacted.page_id)
+            .filter(Page.account_id == acc_id)
+        ]
     
-    result = await db.execute(stmt)
-    count = result.scalar_one_or_none() or 0
+    count = 0
+    for stmt in stmts:
+        if hide_is_del:
+            stmt = (
+                stmt
+                .filter(Page.is_deleted == False)
+            )
+        
+        result = await db.execute(stmt)
+        count += result.scalar_one_or_none() or 0
     
     return count
 
@@ -194,55 +267,241 @@ async def get_page_views_count(
     db: AsyncSession,
     page_uri: str
 ) -> int:
-    page = await get_page(db, page_uri, raise_is_del=False)
+    page = await get_page(db, page_uri, raise_is_del=False, with_content=False)
 
-    result = await db.execute(
-        select(func.count())
-        .select_from(PageView)
-        .where(PageView.page_id == page.id)
-    )
+    if app_config.VIEWS_MODE == "hll":
+        result = await db.execute(
+            select(PageViewSketch.views)
+            .where(PageViewSketch.page_id == page.id)
+        )
+    else:
+        result = await db.execute(
+            select(
+                select(func.count())
+                .select_from(PageView)
+                .where(PageView.page_id == page.id)
+                .scalar_subquery()
+                + func.coalesce(
+                    select(PageViewCompacted.views)
+                    .where(PageViewCompacted.page_id == page.id)
+                    .scalar_subquery(),
+                    0
+                )
+            )
+        )
     count = result.scalar_one_or_none() or 0
     
     return count
 
 
+async def get_pages_views_counts(
+    db: AsyncSession,
+    page_ids: List[int]
+) -> Dict[int, int]:
+    """ {page_id: views} of pages, as `get_page_views_count` in one pass """
+    counts = dict.fromkeys(page_ids, 0)
+    if not page_ids:
+        return counts
+    
+    if app_config.VIEWS_MODE == "hll":
+        stmts = [
+            select(PageViewSketch.page_id, PageViewSketch.views)
+            .where(PageViewSketch.page_id.in_(page_ids))
+        ]
+    else:
+        stmts = [
+            select(PageView.page_id, func.count())
+            .where(PageView.page_id.in_(page_ids))
+            .group_by(PageView.page_id),
+            
+            select(PageViewCompacted.page_id, PageViewCompacted.views)
+            .where(PageViewCompacted.page_id.in_(page_ids))
+        ]
+    
+    for stmt in stmts:
+        for page_id, views in await db.execute(stmt):
+            counts[page_id] += views or 0
+    
+    return counts
+
+
+def is_blob_size(content: str) -> bool:
+    threshold = app_config.CONTENT_BLOB_THRESHOLD
+    return bool(threshold) and len(content.encode()) > threshold
+
+
+async def load_content(
+    page_content: PageContent,
+    with_html: bool = False
+) -> None:
+    """ Read body (and rendered HTML) of a blob-stored content into the loaded row """
+    if not page_content.blob or page_content.content is not None:
+        return
+    
+    set_committed_value(page_content, "content", await blob_store.read(page_content.hash))
+    if with_html:
+        try:
+            html_content = await blob_store.read(page_content.hash, ".html")
+        except FileNotFoundError:
+            html_content = None
+        set_committed_value(page_content, "html", html_content)
+
+
+async def acquire_content(
+    db: AsyncSession,
+    nodes: str,
+    key: bytes | None = None
+) -> PageContent:
+    """
+    Content row of `nodes` with a new reference (not committed).
+    HTML and preview are rendered only for a new body (by a job
+    with JOBS_WORKERS), large bodies are written to the blob store.
+    `key` is `coders.content_hash(nodes)` if the caller has it already
+    """
+    key = key or coders.content_hash(nodes)
+    result = await db.execute(
+        update(PageContent)
+        .where(PageContent.hash == key)
+        .values(refs=PageContent.refs + 1)
+    )
+    if not result.rowcount:
+        html_content = preview = None
+        if app_config.JOBS_WORKERS > 0:
+            # committed with the page
+            await add_job(db, "render_content", key.hex())
+        else:
+            parsed = html.parse_nodes_from_str(nodes)
+            html_content = html.node_to_html(parsed)
+            preview = html.get_preview_from_nodes(parsed) or ""
+        
+        page_content = PageContent(
+            hash=key,
+            content=nodes,
+            html=html_content,
+            preview=preview,
+            refs=1
+        )
+        if is_blob_size(nodes):
+            await blob_store.write(key, nodes)
+            if html_content is not None:
+                await blob_store.write(key, html_content, ".html")
+            page_content.content, page_content.html, page_content.blob = None, None, True
+        
+        try:
+            async with db.begin_nested():
+                db.add(page_content)
+        except IntegrityError:
+            # added concurrently
+            await db.execute(
+                update(PageContent)
+                .where(PageContent.hash == key)
+                .values(refs=PageContent.refs + 1)
+            )
+        else:
+            if page_content.blob:
+                set_committed_value(page_content, "content", nodes)
+                set_committed_value(page_content, "html", html_content)
+            return page_content
+    
+    page_content = await db.get(PageContent, key, populate_existing=True)
+    if page_content.blob:
+        set_committed_value(page_content, "content", nodes)
+    return page_content
+
+
+async def release_contents(
+    db: AsyncSession,
+    keys: List[bytes]
+) -> None:
+    """ Drop references (one per item of `keys`), delete unreferenced contents (not committed) """
+    counts: Dict[bytes, int] = {}
+    for key in keys:
+        counts[key] = counts.get(key, 0) + 1
+    
+    for key, count in counts.items():
+        await db.execute(
+            update(PageContent)
+            .where(PageContent.hash == key)
+            .values(refs=PageContent.refs - count)
+        )
+    await db.execute(
+        delete(PageContent)
+        .where(PageContent.hash.in_(counts))
+        .where(PageContent.refs <= 0)
+    )
+
+
+def page_uri_candidates(uri: str) -> Iterator[str]:
+    """ `uri` with slugs: uri-10-19-123, uri-10-19-123-2, ... """
+    uri = uri.lower().strip()
+    seq = 0
+    while True:
+        seq += 1
+        slug = "-" + coders.create_slug(seq)
+        yield f"{uri[:255 - len(slug)]}{slug}"
+
+
+async def insert_page(
+    db: AsyncSession,
+    account_id: int,
+    page_uri: str,
+    nodes: str,
+    title: str,
+    author_name: str,
+    author_url: str
+) -> Page | None:
+    """
+    :return: None if `page_uri` is taken (`db` is rolled back, loaded objects are expired)
+    """
+    page = Page(
+        page_uri=page_uri,
+        title=title,
+        author_name=author_name,
+        author_url=author_url,
+        account_id=account_id,
+        body=await acquire_content(db, nodes)
+    )
+    await add_page_jobs(db, page_uri)
+    try:
+        db.add(page)
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        return None
+    
+    await db.refresh(page)
+    page_filter.add(page.page_uri)
+    
+    if app_config.REVISIONS_ENABLED:
+        await load_content(page.body)
+        await add_page_revision(db, page, None)
+        await db.commit()
+        await db.refresh(page)
+    
+    await load_content(page.body)
+    return page
+
+
 async def create_page(
     db: AsyncSession,
-    token: str,
+    account: Account,
     nodes: str,
     title: str,
     uri: str,
     author_name: str | None,
     author_url: str | None
 ) -> Page:
-    account = await get_account(db, token)
-    
     acc_id = account.id
     author_name = author_name or account.author_name
     author_url = author_url or account.author_url
-    uri = uri.lower().strip()
     
-    seq = 0
-    while True:
-        seq += 1
-        slug = "-" + coders.create_slug(seq)
-        
-        page = Page(
-            page_uri=f"{uri[:255 - len(slug)]}{slug}",
-            title=title,
-            author_name=author_name,
-            author_url=author_url,
-            account_id=acc_id,
-            content=nodes
+    for page_uri in page_uri_candidates(uri):
+        page = await insert_page(
+            db, acc_id, page_uri,
+            nodes, title,
+            author_name, author_url
         )
-        try:
-            db.add(page)
-            await db.commit()
-        except IntegrityError:
-            await db.rollback()
-            continue
-        else:
-            await db.refresh(page)
+        if page is not None:
             return page
 
 
@@ -255,40 +514,1022 @@ async def edit_page(
     author_name: str | None,
     author_url: str | None
 ) -> Page:
+    """
+    Raises PageEditConflictException if a concurrent edit
+    took the revision (the edit is rolled back)
+    """
     page = await get_page(db, page_uri)
+    old_title, old_content, old_hash = page.title, page.content, page.content_hash
     
     page.author_name = author_name or page.author_name
     page.author_url = author_url or page.author_url
     page.title = title or page.title
-    page.content = nodes or page.content
+    key = coders.content_hash(nodes) if nodes else None
+    if key and key != old_hash:
+        page.body = await acquire_content(db, nodes, key)
+        await release_contents(db, [old_hash])
+    
+    if app_config.REVISIONS_ENABLED and (
+        page.title != old_title or page.body.hash != old_hash
+    ):
+        await add_page_revision(db, page, (old_title, old_content, old_hash))
     
+    await add_page_jobs(db, page.page_uri)
     try:
         await db.commit()
     except IntegrityError:
         await db.rollback()
-    finally:
-        await db.refresh(page)
+        raise PageEditConflictException()
+    
+    await db.refresh(page)
     
+    await load_content(page.body)
     return page
 
 
+async def get_deleted_page_ids(
+    db: AsyncSession,
+    before: datetime.datetime,
+    limit: int = 10
+) -> List[int]:
+    result = await db.execute(
+        select(Page.id)
+        .where(Page.is_deleted == True)
+        .where(Page.deleted < before)
+        .limit(limit)
+    )
+    return result.scalars().all()
+
+
+async def delete_pages(
+    db: AsyncSession,
+    page_ids: List[int],
+    batch_size: int = 1000
+) -> None:
+    """
+    Hard delete pages with their views, rollups, sketches and revisions.
+    Views are deleted in batches (transaction per batch).
+    """
+    while True:
+        result = await db.execute(
+            select(PageView.ip, PageView.visitor, PageView.page_id)
+            .where(PageView.page_id.in_(page_ids))
+            .limit(batch_size)
+        )
+        keys = [tuple(row) for row in result]
+        if not keys:
+            break
+        
+        await db.execute(
+            delete(PageView)
+            .where(tuple_(PageView.ip, PageView.visitor, PageView.page_id).in_(keys))
+        )
+        await db.commit()
+    
+    for model in (PageViewRollup, PageViewSketch, PageViewCompacted, PageRevision, PageHit):
+        await db.execute(
+            delete(model)
+            .where(model.page_id.in_(page_ids))
+        )
+    result = await db.execute(
+        select(Page.content_hash)
+        .where(Page.id.in_(page_ids))
+    )
+    content_hashes = result.scalars().all()
+    await db.execute(
+        delete(Page)
+        .where(Page.id.in_(page_ids))
+    )
+    await release_contents(db, content_hashes)
+    await db.commit()
+
+
 async def add_view(
     db: AsyncSession,
-    ip: str,
-    hashed_info: str,
+    ip: bytes,
+    visitor: bytes,
     page_id: int
 ) -> PageView | None:
+    now = datetime.datetime.now(datetime.UTC)
     page_view = PageView(
         ip=ip,
-        user_agent_hash=hashed_info,
-        page_id=page_id
+        visitor=visitor,
+        page_id=page_id,
+        time=now
     )
     try:
         db.add(page_view)
-        await db.commit()
+        await db.flush()
     except IntegrityError:
         await db.rollback()
         return
+    
+    await increment_view_rollups(db, {
+        (page_id, period, bucket): 1
+        for period, bucket in view_buckets(now).items()
+    })
+    await db.commit()
 
     await db.refresh(page_view)
     return page_view
+
+
+async def add_views(
+    db: AsyncSession,
+    views: List[tuple[bytes, bytes, int]]
+) -> int:
+    """
+    Add views in one transaction, repeated views are skipped
+
+    :param views: [(ip, visitor, page_id)]
+    :return: count of added views
+    """
+    now = datetime.datetime.now(datetime.UTC)
+    rows = [
+        {"ip": ip, "visitor": visitor, "page_id": page_id, "time": now}
+        for ip, visitor, page_id in dict.fromkeys(views)
+    ]
+    if not rows:
+        return 0
+    
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        insert = (postgresql if dialect == "postgresql" else sqlite).insert
+        result = await db.execute(
+            insert(PageView)
+            .values(rows)
+            .on_conflict_do_nothing()
+            .returning(PageView.page_id)
+        )
+        added = result.scalars().all()
+    else:
+        added = []
+        for row in rows:
+            try:
+                async with db.begin_nested():
+                    db.add(PageView(**row))
+            except IntegrityError:
+                continue
+            added.append(row["page_id"])
+    
+    increments = {}
+    buckets = view_buckets(now).items()
+    for page_id in added:
+        for period, bucket in buckets:
+            key = (page_id, period, bucket)
+            increments[key] = increments.get(key, 0) + 1
+    
+    await increment_view_rollups(db, increments)
+    await db.commit()
+    
+    return len(added)
+
+
+VIEW_PERIODS = ("hour", "day", "month", "year")
+
+
+def view_buckets(time: datetime.datetime) -> Dict[str, datetime.datetime]:
+    """
+    Start of hour/day/month/year (UTC) containing `time`
+    """
+    if time.tzinfo is None:
+        time = time.replace(tzinfo=datetime.UTC)
+    time = time.astimezone(datetime.UTC)
+    
+    hour = time.replace(minute=0, second=0, microsecond=0)
+    day = hour.replace(hour=0)
+    month = day.replace(day=1)
+    year = month.replace(month=1)
+    return {"hour": hour, "day": day, "month": month, "year": year}
+
+
+async def increment_view_rollups(
+    db: AsyncSession,
+    increments: Dict[tuple[int, str, datetime.datetime], int]
+) -> None:
+    """
+    Add views to rollup buckets (insert or increment, not committed)
+
+    :param increments: {(page_id, period, bucket): views}
+    """
+    if not increments:
+        return
+    
+    rows = [
+        {"page_id": page_id, "period": period, "bucket": bucket, "views": views}
+        for (page_id, period, bucket), views in increments.items()
+    ]
+    dialect = db.get_bind().dialect.name
+    
+    if dialect in ("postgresql", "sqlite"):
+        insert = (postgresql if dialect == "postgresql" else sqlite).insert
+        stmt = insert(PageViewRollup)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["page_id", "period", "bucket"],
+            set_={"views": PageViewRollup.views + stmt.excluded.views}
+        )
+        await db.execute(stmt, rows)
+        
+    elif dialect in ("mysql", "mariadb"):
+        stmt = mysql.insert(PageViewRollup)
+        stmt = stmt.on_duplicate_key_update(
+            views=PageViewRollup.views + stmt.inserted.views
+        )
+        await db.execute(stmt, rows)
+        
+    else:
+        for row in rows:
+            result = await db.execute(
+                update(PageViewRollup)
+                .where(PageViewRollup.page_id == row["page_id"])
+                .where(PageViewRollup.period == row["period"])
+                .where(PageViewRollup.bucket == row["bucket"])
+                .values(views=PageViewRollup.views + row["views"])
+            )
+            if not result.rowcount:
+                db.add(PageViewRollup(**row))
+
+
+async def get_page_views_by_period(
+    db: AsyncSession,
+    page_id: int,
+    period: str,
+    bucket: datetime.datetime
+) -> int:
+    result = await db.execute(
+        select(PageViewRollup.views)
+        .where(PageViewRollup.page_id == page_id)
+        .where(PageViewRollup.period == period)
+        .where(PageViewRollup.bucket == bucket)
+    )
+    return result.scalar_one_or_none() or 0
+
+
+async def save_page_hits(
+    db: AsyncSession,
+    hits: Dict[int, int],
+    time: datetime.datetime,
+    expire: datetime.datetime
+) -> None:
+    """
+    Replace hit counts of pages (set `updated` to `time`),
+    delete hits not updated since `expire`
+    """
+    await db.execute(
+        delete(PageHit)
+        .where(PageHit.updated < expire)
+    )
+    
+    if hits:
+        result = await db.execute(
+            select(Page.id)
+            .where(Page.id.in_(hits))
+        )
+        page_ids = result.scalars().all()
+        
+        await db.execute(
+            delete(PageHit)
+            .where(PageHit.page_id.in_(page_ids))
+        )
+        db.add_all(
+            PageHit(page_id=page_id, hits=hits[page_id], updated=time)
+            for page_id in page_ids
+        )
+    
+    await db.commit()
+
+
+async def get_hot_page_uris(
+    db: AsyncSession,
+    since: datetime.datetime,
+    limit: int
+) -> List[str]:
+    """
+    Most requested pages (page_hit) updated since `since`
+    """
+    result = await db.execute(
+        select(Page.page_uri)
+        .join(PageHit, Page.id == PageHit.page_id)
+        .where(PageHit.updated >= since)
+        .where(Page.is_deleted == False)
+        .order_by(PageHit.hits.desc())
+        .limit(limit)
+    )
+    return result.scalars().all()
+
+
+async def get_top_viewed_page_uris(
+    db: AsyncSession,
+    since: datetime.datetime,
+    limit: int
+) -> List[str]:
+    """
+    Most viewed pages by daily rollups since `since`
+    """
+    views = func.sum(PageViewRollup.views)
+    result = await db.execute(
+        select(Page.page_uri)
+        .join(PageViewRollup, Page.id == PageViewRollup.page_id)
+        .where(PageViewRollup.period == "day")
+        .where(PageViewRollup.bucket >= since)
+        .where(Page.is_deleted == False)
+        .group_by(Page.id, Page.page_uri)
+        .order_by(views.desc())
+        .limit(limit)
+    )
+    return result.scalars().all()
+
+
+async def merge_view_sketches(
+    db: AsyncSession,
+    sketches: Dict[int, HyperLogLog],
+    rollups: bool = True
+) -> None:
+    """
+    Merge sketches into stored page sketches and update `views` estimates.
+    Growth of estimates is added to current rollup buckets.
+
+    :param sketches: {page_id: sketch}
+    :param rollups: add growth to rollups
+    """
+    result = await db.execute(
+        select(Page.id)
+        .where(Page.id.in_(sketches))
+    )
+    page_ids = result.scalars().all()
+    
+    result = await db.execute(
+        select(PageViewSketch)
+        .where(PageViewSketch.page_id.in_(page_ids))
+        .with_for_update()
+    )
+    stored = {row.page_id: row for row in result.scalars().all()}
+    
+    buckets = view_buckets(datetime.datetime.now(datetime.UTC))
+    increments = {}
+    
+    for page_id in page_ids:
+        row = stored.get(page_id)
+        if row is None:
+            row = PageViewSketch(page_id=page_id, views=0)
+            db.add(row)
+            sketch = sketches[page_id]
+        else:
+            sketch = HyperLogLog.from_bytes(row.sketch).merge(sketches[page_id])
+        
+        before = row.views
+        row.sketch = sketch.to_bytes()
+        row.views = sketch.count()
+        
+        if rollups and row.views > before:
+            for period, bucket in buckets.items():
+                increments[(page_id, period, bucket)] = row.views - before
+    
+    await increment_view_rollups(db, increments)
+    await db.commit()
+
+
+async def build_view_sketches(
+    db: AsyncSession,
+    precision: int,
+    batch_size: int = 1000
+) -> int:
+    """
+    Build sketches from `page_view` rows (merged into existing ones)
+
+    :param batch_size: pages per commit
+    :return: count of processed views
+    """
+    count = 0
+    last_id = 0
+    
+    while True:
+        result = await db.execute(
+            select(Page.id)
+            .where(Page.id > last_id)
+            .order_by(asc(Page.id))
+            .limit(batch_size)
+        )
+        page_ids = result.scalars().all()
+        if not page_ids:
+            break
+        last_id = page_ids[-1]
+        
+        sketches: Dict[int, HyperLogLog] = {}
+        result = await db.execute(
+            select(PageView.page_id, PageView.visitor)
+            .where(PageView.page_id.in_(page_ids))
+        )
+        for page_id, visitor in result:
+            count += 1
+            if page_id not in sketches:
+                sketches[page_id] = HyperLogLog(precision)
+            sketches[page_id].add(visitor)
+        
+        await merge_view_sketches(db, sketches, rollups=False)
+    
+    return count
+
+
+async def compact_page_views(
+    db: AsyncSession,
+    before: datetime.datetime,
+    batch_size: int = 1000
+) -> int:
+    """
+    Fold one batch of `page_view` rows older than `before`
+    into `page_view_compacted` counts and delete them.
+    Counts are taken from actually deleted rows, so concurrent runs are safe.
+
+    :return: count of deleted rows
+    """
+    result = await db.execute(
+        select(PageView.page_id, PageView.ip, PageView.visitor)
+        .where(PageView.time < before)
+        .limit(batch_size)
+    )
+    keys: Dict[int, list] = {}
+    for page_id, ip, visitor in result:
+        keys.setdefault(page_id, []).append((ip, visitor))
+    
+    deleted = 0
+    for page_id, visitors in keys.items():
+        result = await db.execute(
+            delete(PageView)
+            .where(PageView.page_id == page_id)
+            .where(tuple_(PageView.ip, PageView.visitor).in_(visitors))
+        )
+        rows = result.rowcount
+        if not rows:
+            continue
+        deleted += rows
+        
+        result = await db.execute(
+            update(PageViewCompacted)
+            .where(PageViewCompacted.page_id == page_id)
+            .values(views=PageViewCompacted.views + rows)
+        )
+        if not result.rowcount:
+            db.add(PageViewCompacted(page_id=page_id, views=rows))
+    
+    await db.commit()
+    return deleted
+
+
+async def backfill_view_rollups(
+    db: AsyncSession,
+    batch_size: int = 10000
+) -> int:
+    """
+    Backfill rollups from `page_view` rows: a bucket is raised to the count
+    of its rows, never lowered (views folded by compaction or counted by
+    sketches are only in rollups)
+
+    :return: count of processed views
+    """
+    increments: Dict[tuple[int, str, datetime.datetime], int] = {}
+    count = 0
+    
+    result = await db.stream(
+        select(PageView.page_id, PageView.time)
+        .execution_options(yield_per=batch_size)
+    )
+    async for page_id, time in result:
+        count += 1
+        for period, bucket in view_buckets(time).items():
+            key = (page_id, period, bucket)
+            increments[key] = increments.get(key, 0) + 1
+    
+    # (page_id, period, bucket) triples per IN query
+    step = min(batch_size, 1000)
+    keys = list(increments)
+    for i in range(0, len(keys), step):
+        batch = keys[i:i + step]
+        result = await db.execute(
+            select(
+                PageViewRollup.page_id, PageViewRollup.period,
+                PageViewRollup.bucket, PageViewRollup.views
+            )
+            .where(tuple_(
+                PageViewRollup.page_id, PageViewRollup.period, PageViewRollup.bucket
+            ).in_(batch))
+        )
+        # naive datetimes on SQLite
+        existing = {
+            (page_id, period, view_buckets(bucket)[period]): views
+            for page_id, period, bucket, views in result
+        }
+        await increment_view_rollups(db, {
+            key: increments[key] - existing.get(key, 0)
+            for key in batch
+            if increments[key] > existing.get(key, 0)
+        })
+    await db.commit()
+    
+    return count
+
+
+async def add_page_revision(
+    db: AsyncSession,
+    page: Page,
+    previous: tuple[str, str, bytes] | None
+) -> PageRevision:
+    """
+    Add revision with current page title/content (not committed).
+    Stored as delta against previous revision, every
+    `REVISION_SNAPSHOT_INTERVAL` revision is a full snapshot.
+    The page row is locked until commit (revisions of concurrent edits).
+
+    :param previous: (title, content, content hash) before edit,
+        used as first snapshot for pages without revisions
+    """
+    await db.execute(
+        select(Page.id)
+        .where(Page.id == page.id)
+        .with_for_update()
+    )
+    result = await db.execute(
+        select(PageRevision.revision, PageRevision.content_hash)
+        .where(PageRevision.page_id == page.id)
+        .order_by(desc(PageRevision.revision))
+        .limit(1)
+    )
+    last, last_hash = result.one_or_none() or (0, None)
+    
+    if not last and previous is not None:
+        old_title, old_content, last_hash = previous
+        last = 1
+        db.add(PageRevision(
+            page_id=page.id,
+            revision=last,
+            title=old_title,
+            is_snapshot=True,
+            data=delta.compress(old_content),
+            size=len(old_content),
+            content_hash=last_hash
+        ))
+    
+    revision = last + 1
+    snapshot = delta.compress(page.content)
+    data, is_snapshot = snapshot, True
+    
+    # previous content must be the last revision, else (revisions were disabled) - snapshot
+    if (
+        previous is not None
+        and last_hash == previous[2]
+        and (revision - 1) % app_config.REVISION_SNAPSHOT_INTERVAL
+    ):
+        nodes_delta = delta.make_delta(
+            previous[1], page.content,
+            app_config.REVISION_DELTA_MAX_NODES
+        )
+        if nodes_delta is not None:
+            patch = delta.compress(coders.json_dumps(nodes_delta))
+            if len(patch) < len(snapshot):
+                data, is_snapshot = patch, False
+    
+    page_revision = PageRevision(
+        page_id=page.id,
+        revision=revision,
+        title=page.title,
+        is_snapshot=is_snapshot,
+        data=data,
+        size=len(page.content),
+        content_hash=page.body.hash
+    )
+    db.add(page_revision)
+    
+    return page_revision
+
+
+async def get_page_revisions(
+    db: AsyncSession,
+    page_id: int,
+    limit: int = 10,
+    offset: int = 0
+) -> List[PageRevision]:
+    result = await db.execute(
+        select(PageRevision)
+        .options(defer(PageRevision.data))
+        .where(PageRevision.page_id == page_id)
+        .order_by(desc(PageRevision.revision))
+        .limit(limit)
+        .offset(offset)
+    )
+    return result.scalars().all()
+
+
+async def get_page_revision(
+    db: AsyncSession,
+    page_id: int,
+    revision: int
+) -> tuple[PageRevision, str]:
+    """
+    Get revision and rebuild its content from the nearest snapshot
+
+    :return: (revision, content)
+    """
+    result = await db.execute(
+        select(func.max(PageRevision.revision))
+        .where(PageRevision.page_id == page_id)
+        .where(PageRevision.is_snapshot == True)
+        .where(PageRevision.revision <= revision)
+    )
+    snapshot = result.scalar_one_or_none()
+    if snapshot is None:
+        raise PageRevisionNotFoundException()
+    
+    result = await db.execute(
+        select(PageRevision)
+        .where(PageRevision.page_id == page_id)
+        .where(PageRevision.revision >= snapshot)
+        .where(PageRevision.revision <= revision)
+        .order_by(asc(PageRevision.revision))
+    )
+    revisions = result.scalars().all()
+    if revisions[-1].revision != revision:
+        raise PageRevisionNotFoundException()
+    
+    nodes = []
+    for page_revision in revisions:
+        data = json.loads(delta.decompress(page_revision.data))
+        nodes = data if page_revision.is_snapshot else delta.apply_delta(nodes, data)
+    
+    return revisions[-1], coders.json_dumps(nodes)
+
+
+PAGE_DEPENDENTS = (
+    PageView, PageRevision, PageViewRollup,
+    PageViewSketch, PageViewCompacted, PageHit
+)
+
+
+async def get_page_uris_after(
+    db: AsyncSession,
+    after_id: int,
+    limit: int = 1000
+) -> List[tuple[int, str]]:
+    """ [(id, page_uri)] of pages with id > `after_id` by id """
+    result = await db.execute(
+        select(Page.id, Page.page_uri)
+        .where(Page.id > after_id)
+        .order_by(asc(Page.id))
+        .limit(limit)
+    )
+    return [tuple(row) for row in result]
+
+
+async def copy_page(
+    source: AsyncSession,
+    target: AsyncSession,
+    page_id: int,
+    batch_size: int = 10000
+) -> bool:
+    """
+    Copy page with its content, views, revisions, rollups, sketch, counts and hits
+    into `target` (one transaction, new page id)
+
+    :return: False if a page with this URI is already in `target`
+    """
+    page_table = Page.__table__
+    result = await source.execute(
+        select(page_table)
+        .where(page_table.c.id == page_id)
+    )
+    row = dict(result.mappings().one())
+    del row["id"]
+    
+    result = await target.execute(
+        select(Page.id)
+        .where(Page.page_uri == row["page_uri"])
+    )
+    if result.scalar_one_or_none() is not None:
+        return False
+    
+    result = await target.execute(
+        update(PageContent)
+        .where(PageContent.hash == row["content_hash"])
+        .values(refs=PageContent.refs + 1)
+    )
+    if not result.rowcount:
+        content_table = PageContent.__table__
+        result = await source.execute(
+            select(content_table)
+            .where(content_table.c.hash == row["content_hash"])
+        )
+        content_row = result.mappings().one()
+        await target.execute(
+            content_table.insert()
+            .values({**content_row, "refs": 1})
+        )
+        if content_row["preview"] is None:
+            await add_job(target, "render_content", content_row["hash"].hex())
+    
+    result = await target.execute(
+        page_table.insert()
+        .values(row)
+        .returning(page_table.c.id)
+    )
+    new_id = result.scalar_one()
+    
+    for model in PAGE_DEPENDENTS:
+        table = model.__table__
+        result = await source.stream(
+            select(table)
+            .where(table.c.page_id == page_id)
+            .execution_options(yield_per=batch_size)
+        )
+        async for partition in result.mappings().partitions():
+            await target.execute(
+                table.insert(),
+                [{**row, "page_id": new_id} for row in partition]
+            )
+    
+    await target.commit()
+    return True
+
+
+async def render_page_contents(
+    db: AsyncSession,
+    rerender: bool = False,
+    batch_size: int = 100
+) -> int:
+    """
+    Render HTML and preview of contents (one transaction per batch)
+
+    :param rerender: all contents, else only not rendered ones
+    :return: count of rendered contents
+    """
+    count = 0
+    last_hash = b""
+    while True:
+        stmt = (
+            select(PageContent.hash, PageContent.content, PageContent.blob)
+            .where(PageContent.hash > last_hash)
+            .order_by(asc(PageContent.hash))
+            .limit(batch_size)
+        )
+        if not rerender:
+            stmt = stmt.where(PageContent.preview == None)
+        
+        rows = (await db.execute(stmt)).all()
+        if not rows:
+            break
+        last_hash = rows[-1][0]
+        
+        for key, content, blob in rows:
+            await store_rendered_content(db, key, content, blob)
+        await db.commit()
+        count += len(rows)
+    
+    return count
+
+
+async def store_rendered_content(
+    db: AsyncSession,
+    key: bytes,
+    content: str | None,
+    blob: bool
+) -> None:
+    """ Render HTML and preview of the content row (not committed) """
+    if blob:
+        content = await blob_store.read(key)
+    parsed = html.parse_nodes_from_str(content)
+    html_content = html.node_to_html(parsed)
+    if blob:
+        await blob_store.write(key, html_content, ".html")
+    
+    await db.execute(
+        update(PageContent)
+        .where(PageContent.hash == key)
+        .values(
+            html=None if blob else html_content,
+            preview=html.get_preview_from_nodes(parsed) or ""
+        )
+    )
+
+
+async def render_content(
+    db: AsyncSession,
+    key: bytes
+) -> bool:
+    """
+    Render HTML and preview of the content if it's not rendered yet
+
+    :return: False if it's rendered or removed
+    """
+    result = await db.execute(
+        select(PageContent.content, PageContent.blob)
+        .where(PageContent.hash == key)
+        .where(PageContent.preview == None)
+    )
+    row = result.first()
+    # the connection is not held while rendering
+    await db.commit()
+    if row is None:
+        return False
+    
+    await store_rendered_content(db, key, *row)
+    await db.commit()
+    return True
+
+
+async def move_blobs(
+    db: AsyncSession,
+    batch_size: int = 100
+) -> tuple[int, int]:
+    """
+    Move bodies larger than `CONTENT_BLOB_THRESHOLD` to the blob store
+    and smaller ones back (one transaction per batch).
+    Files of moved back bodies are left to `sweep_blobs`
+
+    :return: (moved out, moved back)
+    """
+    moved_out = moved_back = 0
+    last_hash = b""
+    while True:
+        result = await db.execute(
+            select(PageContent)
+            .options(undefer(PageContent.html))
+            .where(PageContent.hash > last_hash)
+            .order_by(asc(PageContent.hash))
+            .limit(batch_size)
+        )
+        page_contents = result.scalars().all()
+        if not page_contents:
+            break
+        last_hash = page_contents[-1].hash
+        
+        for page_content in page_contents:
+            if not page_content.blob and is_blob_size(page_content.content):
+                await blob_store.write(page_content.hash, page_content.content)
+                if page_content.html is not None:
+                    await blob_store.write(page_content.hash, page_content.html, ".html")
+                page_content.content, page_content.html, page_content.blob = None, None, True
+                moved_out += 1
+            
+            elif page_content.blob:
+                content = await blob_store.read(page_content.hash)
+                if is_blob_size(content):
+                    continue
+                try:
+                    html_content = await blob_store.read(page_content.hash, ".html")
+                except FileNotFoundError:
+                    html_content = None
+                page_content.content, page_content.html, page_content.blob = content, html_content, False
+                moved_back += 1
+        
+        await db.commit()
+        db.expunge_all()
+    
+    return moved_out, moved_back
+
+
+async def get_blob_hashes(
+    db: AsyncSession,
+    keys: List[bytes]
+) -> List[bytes]:
+    """ Which of `keys` are contents stored in the blob store """
+    result = await db.execute(
+        select(PageContent.hash)
+        .where(PageContent.hash.in_(keys))
+        .where(PageContent.blob == True)
+    )
+    return result.scalars().all()
+
+
+async def add_job(
+    db: AsyncSession,
+    kind: str,
+    arg: str
+) -> None:
+    """
+    Queue a job to run now (not committed). A queued, failed or running
+    job of the same kind and arg is reset instead (a running one runs again)
+    """
+    now = datetime.datetime.now(datetime.UTC)
+    row = {"kind": kind, "arg": arg, "run_after": now, "version": 0, "attempts": 0}
+    reset = {"run_after": now, "version": Job.version + 1, "attempts": 0, "error": None}
+    dialect = db.get_bind().dialect.name
+    
+    if dialect in ("postgresql", "sqlite"):
+        insert = (postgresql if dialect == "postgresql" else sqlite).insert
+        stmt = insert(Job).values(row)
+        await db.execute(stmt.on_conflict_do_update(
+            index_elements=["kind", "arg"],
+            set_=reset
+        ))
+        
+    elif dialect in ("mysql", "mariadb"):
+        stmt = mysql.insert(Job).values(row)
+        await db.execute(stmt.on_duplicate_key_update(**reset))
+        
+    else:
+        result = await db.execute(
+            update(Job)
+            .where(Job.kind == kind)
+            .where(Job.arg == arg)
+            .values(reset)
+        )
+        if not result.rowcount:
+            db.add(Job(**row))
+
+
+async def add_page_jobs(
+    db: AsyncSession,
+    page_uri: str
+) -> None:
+    """ Queue derived work of a page write (not committed) """
+    if app_config.JOBS_WORKERS > 0 and app_config.PAGES_SNAPSHOT_DIR:
+        await add_job(db, "publish_page", page_uri)
+
+
+async def claim_jobs(
+    db: AsyncSession,
+    limit: int,
+    lease: float
+) -> List[tuple]:
+    """
+    Lock up to `limit` due jobs for `lease` seconds (committed).
+    A job claimed concurrently by another worker is skipped
+
+    :return: [(id, kind, arg, version, attempts)] with the claimed version
+    """
+    now = datetime.datetime.now(datetime.UTC)
+    result = await db.execute(
+        select(Job.id, Job.kind, Job.arg, Job.version, Job.attempts)
+        .where(Job.run_after <= now)
+        .where(or_(Job.locked_until == None, Job.locked_until < now))
+        .order_by(asc(Job.run_after))
+        .limit(limit)
+    )
+    claimed = []
+    for job_id, kind, arg, version, attempts in result.all():
+        result = await db.execute(
+            update(Job)
+            .where(Job.id == job_id)
+            .where(Job.version == version)
+            .values(
+                locked_until=now + datetime.timedelta(seconds=lease),
+                version=version + 1
+            )
+        )
+        if result.rowcount:
+            claimed.append((job_id, kind, arg, version + 1, attempts))
+    await db.commit()
+    
+    return claimed
+
+
+async def complete_job(
+    db: AsyncSession,
+    job_id: int,
+    version: int
+) -> None:
+    """ Remove the finished job, unless it was queued again meanwhile (then unlock it) """
+    result = await db.execute(
+        delete(Job)
+        .where(Job.id == job_id)
+        .where(Job.version == version)
+    )
+    if not result.rowcount:
+        await db.execute(
+            update(Job)
+            .where(Job.id == job_id)
+            .values(locked_until=None)
+        )
+    await db.commit()
+
+
+async def fail_job(
+    db: AsyncSession,
+    job_id: int,
+    version: int,
+    error: str,
+    retry_after: datetime.timedelta | None
+) -> None:
+    """
+    Unlock the failed job to run after `retry_after` (None - never: kept with the error).
+    Queued again meanwhile - only unlocked
+    """
+    result = await db.execute(
+        update(Job)
+        .where(Job.id == job_id)
+        .where(Job.version == version)
+        .values(
+            locked_until=None,
+            attempts=Job.attempts + 1,
+            error=error[:1024],
+            run_after=(
+                datetime.datetime.now(datetime.UTC) + retry_after
+                if retry_after is not None else None
+            )
+        )
+    )
+    if not result.rowcount:
+        await db.execute(
+            update(Job)
+            .where(Job.id == job_id)
+            .values(locked_until=None)
+        )
+    await db.commit()
@@ -1,3 +1,10 @@
+import itertools
+import logging
+import time
+import uuid
+from typing import Dict, List, Tuple
+
+from sqlalchemy import event, exc
 from sqlalchemy.ext.asyncio import (
     async_sessionmaker,
     AsyncEngine,
@@ -8,29 +15,261 @@ from sqlalchemy.pool import AsyncAdaptedQueuePool
 from src.config import app_config
 
 
+logger = logging.getLogger(__name__)
+
+
+class MeteredPool(AsyncAdaptedQueuePool):
+    """
+    Queue pool that counts checkouts, time spent waiting for a connection
+    and checkout timeouts
+    """
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            wait = time.perf_counter() - start
+            self.checkouts += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+
+    def recreate(self) -> "MeteredPool":
+        pool = super().recreate()
+        pool.checkouts, pool.timeouts = self.checkouts, self.timeouts
+        pool.wait_total, pool.wait_max = self.wait_total, self.wait_max
+        return pool
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size(),
+            "max_overflow": self._max_overflow,
+            "checked_out": self.checkedout(),
+            "overflow": max(self.overflow(), 0),
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_avg_ms": (self.wait_total / self.checkouts * 1000) if self.checkouts else 0.0,
+            "wait_max_ms": self.wait_max * 1000
+        }
+
+
+def pool_limits() -> Tuple[int, int]:
+    """
+    (pool_size, max_overflow) of an engine: DB_MAX_CONNECTIONS split between
+    SERVER_WORKERS and the pooled engines of a worker (primary, replicas,
+    shards; 1/5 of a share is overflow), DB_POOL_SIZE / DB_POOL_OVERFLOW
+    if no budget is set
+    """
+    if app_config.DB_MAX_CONNECTIONS <= 0:
+        return app_config.DB_POOL_SIZE, app_config.DB_POOL_OVERFLOW
+    
+    urls = {
+        url for url in (
+            app_config.DATABASE_URL,
+            *app_config.DB_REPLICA_URLS,
+            *app_config.DB_SHARD_URLS
+        )
+        if not url.startswith('sqlite')
+    }
+    engines = max(1, len(urls)) * max(1, app_config.SERVER_WORKERS)
+    per_engine = max(1, app_config.DB_MAX_CONNECTIONS // engines)
+    overflow = per_engine // 5
+    return per_engine - overflow, overflow
+
+
+def connect_args(url: str) -> dict:
+    """ PgBouncer (transaction pooling) can't keep prepared statements """
+    if not app_config.DB_PGBOUNCER:
+        return {}
+    
+    if "+asyncpg" in url:
+        return {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__"
+        }
+    if "+psycopg" in url:
+        return {"prepare_threshold": None}
+    return {}
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA mmap_size={int(app_config.SQLITE_MMAP_SIZE)}")
+    cursor.execute(f"PRAGMA busy_timeout={int(app_config.SQLITE_BUSY_TIMEOUT * 1000)}")
+    cursor.close()
+
+
+def _set_sqlite_query_only(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA query_only=ON")
+    cursor.close()
+
+
+def create_sqlite_engine(url: str, pool_size: int, read_only: bool = False) -> AsyncEngine:
+    """
+    SQLite engine for SQLITE_TUNED mode: WAL, synchronous=NORMAL, mmap,
+    busy timeout; fixed pool (pool_size=1 -> single writer connection)
+    """
+    engine = create_async_engine(
+        url=url,
+        echo=app_config.SQL_DEBUG,
+        pool_size=pool_size,
+        max_overflow=0,
+        pool_timeout=app_config.DB_TIMEOUT,
+        poolclass=MeteredPool,
+        connect_args={
+            "check_same_thread": False,
+            "timeout": app_config.SQLITE_BUSY_TIMEOUT
+        }
+    )
+    event.listen(engine.sync_engine, "connect", _set_sqlite_pragmas)
+    if read_only:
+        event.listen(engine.sync_engine, "connect", _set_sqlite_query_only)
+    return engine
+
+
+def create_engine(url: str) -> AsyncEngine:
+    if url.startswith('sqlite') and app_config.SQLITE_TUNED:
+        return create_sqlite_engine(url, 1)
+    
+    if url.startswith('sqlite'):
+        return create_async_engine(
+            url=url,
+            echo=app_config.SQL_DEBUG,
+            connect_args={"check_same_thread": False}
+        )
+    
+    pool_size, max_overflow = pool_limits()
+    return create_async_engine(
+        url=url,
+        echo=app_config.SQL_DEBUG,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=app_config.DB_TIMEOUT,
+        poolclass=MeteredPool,
+        connect_args=connect_args(url)
+    )
+
+
 class AsyncDatabase:
-    def __init__(self) -> None:
-        IS_SQLITE = app_config.DATABASE_URL.startswith('sqlite')
-        
-        if IS_SQLITE:
-            self.async_engine: AsyncEngine = create_async_engine(
-                url=app_config.DATABASE_URL,
-                echo=app_config.SQL_DEBUG,
-                connect_args={"check_same_thread": False}
-            )
-        else:
-            self.async_engine: AsyncEngine = create_async_engine(
-                url=app_config.DATABASE_URL,
-                echo=app_config.SQL_DEBUG,
-                pool_size=app_config.DB_POOL_SIZE,
-                max_overflow=app_config.DB_POOL_OVERFLOW,
-                pool_timeout=app_config.DB_TIMEOUT,
-                poolclass=AsyncAdaptedQueuePool
-            )
+    def __init__(self, url: str | None = None, replica_urls: List[str] | None = None) -> None:
+        url = url or app_config.DATABASE_URL
+        if replica_urls is None:
+            replica_urls = app_config.DB_REPLICA_URLS
         
+        self.url = url
+        self.async_engine: AsyncEngine = create_engine(url)
+        # sessions are lazy: a connection is checked out on the first query
+        # and returned on commit/rollback/close
         self.async_session = async_sessionmaker(
             self.async_engine, class_=AsyncSession,
             autoflush=False, autocommit=False)
+        
+        self.is_sqlite = url.startswith('sqlite')
+        
+        # SQLITE_TUNED: readers use own pool, writes go through one connection
+        self.reader_engine: AsyncEngine | None = None
+        self.reader_session = None
+        if self.is_sqlite and app_config.SQLITE_TUNED:
+            self.reader_engine = create_sqlite_engine(
+                url, app_config.SQLITE_READERS, read_only=True
+            )
+            self.reader_session = async_sessionmaker(
+                self.reader_engine, class_=AsyncSession,
+                autoflush=False, autocommit=False)
+        
+        # read replicas
+        if self.reader_session is not None and replica_urls:
+            logger.warning("DB_REPLICA_URLS are ignored with SQLITE_TUNED (reads use the reader pool)")
+            replica_urls = []
+        self.replica_engines: List[AsyncEngine] = [
+            create_engine(replica_url) for replica_url in replica_urls
+        ]
+        self.replica_sessions = [
+            async_sessionmaker(
+                engine, class_=AsyncSession,
+                autoflush=False, autocommit=False)
+            for engine in self.replica_engines
+        ]
+        self._next_replica = itertools.cycle(range(len(self.replica_sessions)))
+        # key (token, page uri) -> monotonic time until reads go to primary
+        self.recent_writes: Dict[str, float] = {}
+
+    def mark_write(self, *keys: str | None) -> None:
+        """
+        Reads by these keys go to primary for DB_READ_YOUR_WRITES seconds
+        (in this worker, see `src.api.dependencies.mark_write` for the client)
+        """
+        if not self.replica_engines:
+            return
+        
+        now = time.monotonic()
+        if len(self.recent_writes) > 10000:
+            self.recent_writes = {
+                key: until for key, until in self.recent_writes.items()
+                if until > now
+            }
+        
+        until = now + app_config.DB_READ_YOUR_WRITES
+        for key in keys:
+            if key is not None:
+                self.recent_writes[key] = until
+
+    def is_recent_write(self, key: str | None) -> bool:
+        until = self.recent_writes.get(key)
+        return until is not None and until > time.monotonic()
+
+    def read_session(self, *keys: str | None, primary: bool = False) -> AsyncSession:
+        """
+        Session on a replica (round robin / least busy), on primary without
+        replicas, if `primary` or after a write by one of `keys`.
+        SQLITE_TUNED: session on the reader pool
+        """
+        if self.reader_session is not None:
+            return self.reader_session()
+        
+        if primary or not self.replica_sessions or any(map(self.is_recent_write, keys)):
+            return self.async_session()
+        
+        index = next(self._next_replica)
+        if app_config.DB_REPLICA_MODE == "least_busy":
+            count = len(self.replica_engines)
+            index = min(
+                ((index + i) % count for i in range(count)),
+                key=lambda i: getattr(self.replica_engines[i].pool, "checkedout", int)()
+            )
+        
+        return self.replica_sessions[index]()
+
+    async def dispose(self) -> None:
+        for engine in (self.async_engine, self.reader_engine, *self.replica_engines):
+            if engine is not None:
+                await engine.dispose()
+
+    def pool_stats(self) -> dict:
+        engines = {"primary": self.async_engine}
+        if self.reader_engine is not None:
+            engines["reader"] = self.reader_engine
+        for i, engine in enumerate(self.replica_engines):
+            engines[f"replica_{i}"] = engine
+        
+        return {
+            name: engine.pool.stats()
+            for name, engine in engines.items()
+            if isinstance(engine.pool, MeteredPool)
+        }
 
 
 async_db = AsyncDatabase()
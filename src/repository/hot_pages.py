@@ -0,0 +1,63 @@
+import asyncio
+import datetime
+import logging
+
+from src.exceptions import PageNotFoundException
+from src.repository import crud, reader
+from src.repository.sharding import shards
+from src.repository.writes import writes
+
+
+logger = logging.getLogger(__name__)
+
+
+async def persist_hot_pages(top: int, expire: datetime.timedelta) -> None:
+    """
+    Save top requested pages since the last call (page_hit) and reset counters
+    """
+    hits = reader.page_hits.top(top)
+    reader.page_hits.clear()
+    
+    now = datetime.datetime.now(datetime.UTC)
+    for shard, database in enumerate(shards):
+        shard_hits = {page_id: count for (key_shard, page_id), count in hits if key_shard == shard}
+        await writes.call(
+            database,
+            lambda db: crud.save_page_hits(db, shard_hits, now, now - expire)
+        )
+
+
+async def run_hot_pages(interval: float, top: int) -> None:
+    expire = datetime.timedelta(seconds=max(interval * 10, 86400))
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await persist_hot_pages(top, expire)
+        except Exception:
+            logger.exception("Hot pages persist failed")
+
+
+async def prewarm_pages(limit: int, concurrency: int = 8) -> None:
+    """
+    Load the hottest pages (persisted hits, then most viewed last week)
+    into the page cache
+    """
+    now = datetime.datetime.now(datetime.UTC)
+    hot, viewed = [], []
+    for database in shards:
+        async with database.async_session() as db:
+            hot += await crud.get_hot_page_uris(db, now - datetime.timedelta(days=1), limit)
+            viewed += await crud.get_top_viewed_page_uris(db, now - datetime.timedelta(days=7), limit)
+    
+    page_uris = list(dict.fromkeys(uri.lower() for uri in (*hot, *viewed)))[:limit]
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def prewarm(page_uri: str) -> None:
+        async with semaphore:
+            try:
+                await reader.prewarm(page_uri)
+            except PageNotFoundException:
+                pass
+    
+    await asyncio.gather(*map(prewarm, page_uris))
+    logger.info(f"Prewarmed {len(page_uris)} pages")
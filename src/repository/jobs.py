@@ -0,0 +1,133 @@
+import asyncio
+import datetime
+import logging
+from contextlib import suppress
+from typing import Awaitable, Callable, Dict, Set
+
+from src.config import app_config
+from src.repository import crud, snapshots
+from src.repository.database import AsyncDatabase
+from src.repository.sharding import shards
+from src.repository.writes import writes
+
+
+logger = logging.getLogger(__name__)
+
+
+async def render_content(database: AsyncDatabase, arg: str) -> None:
+    await writes.call(database, lambda db: crud.render_content(db, bytes.fromhex(arg)))
+
+
+async def publish_page(database: AsyncDatabase, arg: str) -> None:
+    await snapshots.refresh(arg)
+
+
+# kind -> handler(database of the job, arg), must be idempotent: a job may run again
+HANDLERS: Dict[str, Callable[[AsyncDatabase, str], Awaitable[None]]] = {
+    "render_content": render_content,
+    "publish_page": publish_page,
+}
+
+
+class JobWorker:
+    """
+    Runs jobs of the `job` tables of all shards, up to `concurrency` at once.
+    Polls every `interval` seconds or when woken up after a write
+    """
+    def __init__(
+        self,
+        concurrency: int,
+        lease: float,
+        max_attempts: int,
+        retry_delay: float
+    ) -> None:
+        self.concurrency = concurrency
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.running: Set[asyncio.Task] = set()
+        self.wakeup = asyncio.Event()
+
+    def wake(self) -> None:
+        self.wakeup.set()
+
+    async def execute(self, database: AsyncDatabase, job: tuple) -> None:
+        job_id, kind, arg, version, attempts = job
+        try:
+            await HANDLERS[kind](database, arg)
+        except Exception as e:
+            attempts += 1
+            logger.exception(f"Job {kind} {arg} failed (attempt {attempts})")
+            retry_after = (
+                datetime.timedelta(seconds=self.retry_delay * 2 ** (attempts - 1))
+                if attempts < self.max_attempts else None
+            )
+            await writes.call(
+                database,
+                lambda db: crud.fail_job(db, job_id, version, repr(e), retry_after)
+            )
+        else:
+            await writes.call(database, lambda db: crud.complete_job(db, job_id, version))
+
+    def _done(self, task: asyncio.Task) -> None:
+        self.running.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            # unlocked after the lease
+            logger.error("Failed to finish a job", exc_info=task.exception())
+        self.wake()
+
+    async def claim(self) -> int:
+        """ Start due jobs while there are free slots, :return: count of started jobs """
+        started = 0
+        for database in shards:
+            free = self.concurrency - len(self.running)
+            if free <= 0:
+                break
+            
+            jobs = await writes.call(database, lambda db: crud.claim_jobs(db, free, self.lease))
+            for job in jobs:
+                task = asyncio.create_task(self.execute(database, job))
+                self.running.add(task)
+                task.add_done_callback(self._done)
+            started += len(jobs)
+        return started
+
+    async def run(self, interval: float, drain_timeout: float = 10) -> None:
+        try:
+            while True:
+                self.wakeup.clear()
+                if len(self.running) < self.concurrency:
+                    try:
+                        if await self.claim():
+                            # maybe more due
+                            continue
+                    except Exception:
+                        logger.exception("Failed to claim jobs")
+                
+                with suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(self.wakeup.wait(), interval)
+        finally:
+            # on shutdown started jobs get time to finish, the rest runs again after the lease
+            if self.running:
+                await asyncio.wait(set(self.running), timeout=drain_timeout)
+            for task in set(self.running):
+                task.cancel()
+
+
+job_worker = JobWorker(
+    app_config.JOBS_WORKERS,
+    app_config.JOBS_LEASE,
+    app_config.JOBS_MAX_ATTEMPTS,
+    app_config.JOBS_RETRY_DELAY
+)
+
+
+async def page_written(page_uri: str) -> None:
+    """
+    After a page is created or edited: start its jobs queued with the write
+    (content rendering, snapshot), without JOBS_WORKERS publish the snapshot now
+    """
+    if app_config.JOBS_WORKERS <= 0:
+        await snapshots.publish(page_uri)
+        return
+    job_worker.wake()
@@ -13,7 +13,9 @@ from src.models.entities import Base
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
-config.set_main_option("sqlalchemy.url", app_config.DATABASE_URL)
+# alembic -x shard=<url> upgrade head -> migrate a shard (DB_SHARD_URLS)
+SHARD_URL = context.get_x_argument(as_dictionary=True).get("shard")
+config.set_main_option("sqlalchemy.url", SHARD_URL or app_config.DATABASE_URL)
 
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
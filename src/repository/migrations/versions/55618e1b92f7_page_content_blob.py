@@ -0,0 +1,33 @@
+"""page content blob
+
+Revision ID: 55618e1b92f7
+Revises: 9fe4cd12aa6f
+Create Date: 2026-10-19 17:12:05.228715
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '55618e1b92f7'
+down_revision: Union[str, None] = '9fe4cd12aa6f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+
+# bodies are moved to the blob store by `python -m src.cli move-blobs`
+def upgrade() -> None:
+    with op.batch_alter_table('page_content', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('blob', sa.Boolean(), server_default=sa.false(), nullable=False))
+        batch_op.alter_column('content', existing_type=sa.String(length=1048576), nullable=True)
+
+
+# run `CONTENT_BLOB_THRESHOLD=0 python -m src.cli move-blobs` before
+def downgrade() -> None:
+    with op.batch_alter_table('page_content', schema=None) as batch_op:
+        batch_op.alter_column('content', existing_type=sa.String(length=1048576), nullable=False)
+        batch_op.drop_column('blob')
@@ -0,0 +1,32 @@
+"""page content blob false
+
+Revision ID: 853a953716f4
+Revises: f035333cfdab
+Create Date: 2026-10-19 20:11:52.804316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '853a953716f4'
+down_revision: Union[str, None] = 'f035333cfdab'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# SQLite stored server_default 'f' of existing rows as the text 'f' (read as True)
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    
+    op.execute("UPDATE page_content SET blob = 0 WHERE blob NOT IN (0, 1)")
+    with op.batch_alter_table('page_content', schema=None) as batch_op:
+        batch_op.alter_column('blob', existing_type=sa.Boolean(), server_default=sa.false())
+
+
+def downgrade() -> None:
+    pass
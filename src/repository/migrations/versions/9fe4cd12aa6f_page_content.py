@@ -0,0 +1,116 @@
+"""page content
+
+Revision ID: 9fe4cd12aa6f
+Revises: d18381ba0109
+Create Date: 2026-10-19 17:21:40.518093
+
+"""
+from typing import Sequence, Union
+from hashlib import sha256
+from json import dumps, loads
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9fe4cd12aa6f'
+down_revision: Union[str, None] = 'd18381ba0109'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+BATCH_SIZE = 1000
+
+
+# frozen copy of coders.content_hash
+def _content_hash(content: str) -> bytes:
+    normalized = dumps(loads(content), ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+    return sha256(normalized.encode()).digest()
+
+
+def upgrade() -> None:
+    op.create_table('page_content',
+    sa.Column('hash', sa.LargeBinary(length=32), nullable=False),
+    sa.Column('content', sa.String(length=1048576), nullable=False),
+    sa.Column('html', sa.String(length=4194304), nullable=True),
+    sa.Column('preview', sa.String(length=2048), nullable=True),
+    sa.Column('refs', sa.Integer(), nullable=False),
+    sa.Column('created', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+    sa.PrimaryKeyConstraint('hash')
+    )
+    with op.batch_alter_table('page', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('content_hash', sa.LargeBinary(length=32), nullable=True))
+    
+    # move bodies, html/preview are rendered by `python -m src.cli render-contents`
+    bind = op.get_bind()
+    page = sa.table('page', sa.column('id'), sa.column('content'), sa.column('content_hash'))
+    page_content = sa.table('page_content', sa.column('hash'), sa.column('content'), sa.column('refs'))
+    last_id = 0
+    while rows := bind.execute(
+        sa.select(page.c.id, page.c.content)
+        .where(page.c.id > last_id)
+        .order_by(page.c.id)
+        .limit(BATCH_SIZE)
+    ).all():
+        last_id = rows[-1].id
+        hashes = {row.id: _content_hash(row.content) for row in rows}
+        contents, refs = {}, {}
+        for row in rows:
+            key = hashes[row.id]
+            contents.setdefault(key, row.content)
+            refs[key] = refs.get(key, 0) + 1
+        
+        existing = set(bind.execute(
+            sa.select(page_content.c.hash)
+            .where(page_content.c.hash.in_(refs))
+        ).scalars())
+        if existing:
+            bind.execute(
+                page_content.update()
+                .where(page_content.c.hash == sa.bindparam('key'))
+                .values(refs=page_content.c.refs + sa.bindparam('count')),
+                [{"key": key, "count": refs[key]} for key in existing]
+            )
+        new = [
+            {"hash": key, "content": contents[key], "refs": count}
+            for key, count in refs.items() if key not in existing
+        ]
+        if new:
+            bind.execute(page_content.insert(), new)
+        bind.execute(
+            page.update()
+            .where(page.c.id == sa.bindparam('page_id'))
+            .values(content_hash=sa.bindparam('key')),
+            [{"page_id": page_id, "key": key} for page_id, key in hashes.items()]
+        )
+    
+    with op.batch_alter_table('page', schema=None) as batch_op:
+        batch_op.alter_column('content_hash', existing_type=sa.LargeBinary(length=32), nullable=False)
+        batch_op.create_index(batch_op.f('ix_page_content_hash'), ['content_hash'], unique=False)
+        batch_op.create_foreign_key('page_content_hash_fkey', 'page_content', ['content_hash'], ['hash'])
+        batch_op.drop_column('content')
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('page', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('content', sa.String(length=1048576), nullable=True))
+    
+    page = sa.table('page', sa.column('content'), sa.column('content_hash'))
+    page_content = sa.table('page_content', sa.column('hash'), sa.column('content'))
+    op.get_bind().execute(
+        page.update()
+        .values(content=(
+            sa.select(page_content.c.content)
+            .where(page_content.c.hash == page.c.content_hash)
+            .scalar_subquery()
+        ))
+    )
+    
+    with op.batch_alter_table('page', schema=None) as batch_op:
+        batch_op.alter_column('content', existing_type=sa.String(length=1048576), nullable=False)
+        batch_op.drop_constraint('page_content_hash_fkey', type_='foreignkey')
+        batch_op.drop_index(batch_op.f('ix_page_content_hash'))
+        batch_op.drop_column('content_hash')
+    
+    op.drop_table('page_content')
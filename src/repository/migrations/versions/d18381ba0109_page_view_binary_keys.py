@@ -0,0 +1,105 @@
+"""page view binary keys
+
+Revision ID: d18381ba0109
+Revises: dcb7696efc67
+Create Date: 2026-10-19 17:02:08.047763
+
+"""
+from typing import Sequence, Union
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from hashlib import sha256
+from ipaddress import IPv4Address, IPv6Address, ip_address
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd18381ba0109'
+down_revision: Union[str, None] = 'dcb7696efc67'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+BATCH_SIZE = 10000
+
+
+# frozen copies of coders.pack_ip / coders.calc_digest
+def _pack_ip(ip: str) -> bytes:
+    try:
+        address = ip_address(ip)
+    except ValueError:
+        return sha256(ip.encode()).digest()[:16]
+    
+    if isinstance(address, IPv4Address):
+        address = IPv6Address(f"::ffff:{address}")
+    return address.packed
+
+
+def _unpack_ip(packed: bytes) -> str:
+    address = IPv6Address(packed)
+    return str(address.ipv4_mapped or address)
+
+
+def _b64_to_digest(b64: str) -> bytes:
+    # b64 SHA-256 (coders.calc_sha256) -> first 16 bytes of the digest
+    return urlsafe_b64decode(b64 + "=" * (-len(b64) % 4))[:16]
+
+
+def _digest_to_b64(digest: bytes) -> str:
+    return urlsafe_b64encode(digest).decode().strip("=")
+
+
+def _create_page_view(key_type: sa.types.TypeEngine, visitor: str, pk_name: str) -> None:
+    op.create_table('page_view',
+    sa.Column('ip', key_type, nullable=False),
+    sa.Column(visitor, key_type, nullable=False),
+    sa.Column('page_id', sa.Integer(), nullable=False),
+    sa.Column('time', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+    sa.ForeignKeyConstraint(['page_id'], ['page.id'], onupdate='CASCADE', ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('ip', visitor, 'page_id', name=pk_name)
+    )
+
+
+def _convert(convert_row) -> None:
+    """ Copy `page_view_old` into the new `page_view` in batches, then drop it """
+    bind = op.get_bind()
+    old = sa.Table('page_view_old', sa.MetaData(), autoload_with=bind)
+    new = sa.Table('page_view', sa.MetaData(), autoload_with=bind)
+    
+    result = bind.execute(sa.select(old))
+    while rows := result.fetchmany(BATCH_SIZE):
+        bind.execute(new.insert(), [convert_row(row) for row in rows])
+    
+    op.drop_table('page_view_old')
+    with op.batch_alter_table('page_view', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_page_view_time'), ['time'], unique=False)
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('page_view', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_page_view_time'))
+    op.rename_table('page_view', 'page_view_old')
+    
+    _create_page_view(sa.LargeBinary(16), 'visitor', 'pr__ip__visitor__page_id')
+    _convert(lambda row: {
+        "ip": _pack_ip(row.ip),
+        "visitor": _b64_to_digest(row.user_agent_hash),
+        "page_id": row.page_id,
+        "time": row.time
+    })
+
+
+def downgrade() -> None:
+    # hosts which are not an IP address and the dropped half of the hashes can't be restored
+    with op.batch_alter_table('page_view', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_page_view_time'))
+    op.rename_table('page_view', 'page_view_old')
+    
+    _create_page_view(sa.String(64), 'user_agent_hash', 'pr__ip__user_agent_hash__page_id')
+    _convert(lambda row: {
+        "ip": _unpack_ip(row.ip),
+        "user_agent_hash": _digest_to_b64(row.visitor),
+        "page_id": row.page_id,
+        "time": row.time
+    })
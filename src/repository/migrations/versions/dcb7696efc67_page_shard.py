@@ -0,0 +1,43 @@
+"""page_shard
+
+Revision ID: dcb7696efc67
+Revises: 9bbe81daa933
+Create Date: 2026-10-19 16:57:57.847192
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'dcb7696efc67'
+down_revision: Union[str, None] = '9bbe81daa933'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# accounts are not in shards (alembic -x shard=<url>): page.account_id
+# can't reference them. SQLite doesn't enforce foreign keys here
+def _is_shard() -> bool:
+    return (
+        context.get_x_argument(as_dictionary=True).get("shard") is not None
+        and op.get_bind().dialect.name != "sqlite"
+    )
+
+
+def upgrade() -> None:
+    if not _is_shard():
+        return
+    
+    for fk in sa.inspect(op.get_bind()).get_foreign_keys('page'):
+        if fk['referred_table'] == 'account':
+            op.drop_constraint(fk['name'], 'page', type_='foreignkey')
+
+
+def downgrade() -> None:
+    if not _is_shard():
+        return
+    
+    op.create_foreign_key('page_account_id_fkey', 'page', 'account', ['account_id'], ['id'])
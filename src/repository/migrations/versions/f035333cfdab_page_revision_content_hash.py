@@ -0,0 +1,29 @@
+"""page revision content hash
+
+Revision ID: f035333cfdab
+Revises: c3f1a9d2b7e4
+Create Date: 2026-10-19 19:04:41.372950
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f035333cfdab'
+down_revision: Union[str, None] = 'c3f1a9d2b7e4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# existing revisions have no hash: the next revision of a page is a snapshot
+def upgrade() -> None:
+    with op.batch_alter_table('page_revision', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('content_hash', sa.LargeBinary(length=32), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('page_revision', schema=None) as batch_op:
+        batch_op.drop_column('content_hash')
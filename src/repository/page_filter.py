@@ -0,0 +1,140 @@
+import asyncio
+import logging
+import time
+from typing import Dict
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import app_config
+from src.models.entities import Page
+from src.repository.sharding import shards
+from src.utils.bloom import BloomFilter
+
+
+logger = logging.getLogger(__name__)
+
+
+class PageFilter:
+    """
+    In-memory Bloom filter of existing page URIs (lowercase).
+    A miss is trusted after an incremental sync started after the check
+    (pages created by other workers), then it means "no such page" without
+    a lookup by URI; concurrent misses share one sync.
+    """
+    def __init__(self, error_rate: float) -> None:
+        self.error_rate = error_rate
+        self.bloom: BloomFilter | None = None
+        # per shard
+        self.last_id: Dict[int, int] = {}
+        # start of the last sync
+        self.last_sync: Dict[int, float] = {}
+        self.removed = 0
+        self.lock = asyncio.Lock()
+        
+        self.checks = 0
+        self.negatives = 0
+        self.false_positives = 0
+
+    def session(self, shard: int) -> AsyncSession:
+        # not a replica (may lag); on SQLite the reader pool, as sync runs
+        # inside requests that may hold the single writer connection
+        database = shards.databases[shard]
+        if database.reader_session is not None:
+            return database.reader_session()
+        return database.async_session()
+
+    async def build(self) -> None:
+        started = time.monotonic()
+        rows = []
+        last_id = {}
+        for shard in range(len(shards)):
+            async with self.session(shard) as db:
+                result = await db.stream(
+                    select(Page.id, Page.page_uri)
+                    .where(Page.is_deleted == False)
+                    .execution_options(yield_per=10000)
+                )
+                shard_rows = [(page_id, page_uri) async for page_id, page_uri in result]
+            rows += shard_rows
+            last_id[shard] = max((page_id for page_id, _ in shard_rows), default=0)
+        
+        bloom = BloomFilter(max(len(rows) * 2, 100000), self.error_rate)
+        for _, page_uri in rows:
+            bloom.add(page_uri.lower())
+        
+        self.bloom, self.last_id, self.removed = bloom, last_id, 0
+        self.last_sync = dict.fromkeys(last_id, started)
+        logger.info(f"Page filter built: {len(rows)} pages")
+
+    async def sync(self, shard: int) -> None:
+        if self.bloom is None:
+            return
+        
+        if (
+            self.bloom.count > self.bloom.capacity
+            or self.removed > self.bloom.count // 4
+        ):
+            await self.build()
+            return
+        
+        started = time.monotonic()
+        async with self.session(shard) as db:
+            result = await db.execute(
+                select(Page.id, Page.page_uri)
+                .where(Page.id > self.last_id.get(shard, 0))
+            )
+            for page_id, page_uri in result:
+                self.bloom.add(page_uri.lower())
+                self.last_id[shard] = max(self.last_id.get(shard, 0), page_id)
+        self.last_sync[shard] = started
+
+    def add(self, page_uri: str) -> None:
+        if self.bloom is not None:
+            self.bloom.add(page_uri.lower())
+
+    def remove(self, page_uri: str) -> None:
+        """ Bloom filter can't remove: count it, rebuild after enough removals """
+        self.removed += 1
+
+    async def might_exist(self, page_uri: str) -> bool:
+        if self.bloom is None:
+            return True
+        
+        self.checks += 1
+        page_uri = page_uri.lower()
+        if page_uri in self.bloom:
+            return True
+        
+        shard = shards.index(page_uri)
+        checked = time.monotonic()
+        async with self.lock:
+            if self.last_sync.get(shard, 0) <= checked:
+                await self.sync(shard)
+        if page_uri in self.bloom:
+            return True
+        
+        self.negatives += 1
+        return False
+
+    def report_false_positive(self) -> None:
+        self.false_positives += 1
+
+    def stats(self) -> dict:
+        positives = self.checks - self.negatives
+        return {
+            "enabled": self.bloom is not None,
+            "items": self.bloom.count if self.bloom else 0,
+            "capacity": self.bloom.capacity if self.bloom else 0,
+            "size_bytes": len(self.bloom.bits) if self.bloom else 0,
+            "hashes": self.bloom.hashes if self.bloom else 0,
+            "removed_since_build": self.removed,
+            "expected_fp_rate": self.bloom.expected_error_rate() if self.bloom else 0.0,
+            "checks": self.checks,
+            "negatives": self.negatives,
+            "false_positives": self.false_positives,
+            "observed_fp_rate": (self.false_positives / positives) if positives else 0.0
+        }
+
+
+page_filter = PageFilter(app_config.PAGES_FILTER_ERROR_RATE)
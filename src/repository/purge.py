@@ -0,0 +1,49 @@
+import asyncio
+import datetime
+import logging
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.repository import crud
+from src.repository.sharding import shards
+from src.repository.writes import writes
+
+
+logger = logging.getLogger(__name__)
+
+
+async def purge_deleted_pages(grace: datetime.timedelta, batch_size: int) -> int:
+    """
+    Hard delete pages soft-deleted more than `grace` ago, `batch_size` pages at a time
+
+    :return: count of purged pages
+    """
+    before = datetime.datetime.now(datetime.UTC) - grace
+    total = 0
+    
+    async def purge(db: AsyncSession) -> int:
+        page_ids = await crud.get_deleted_page_ids(db, before, batch_size)
+        if page_ids:
+            await crud.delete_pages(db, page_ids)
+        return len(page_ids)
+    
+    for database in shards:
+        while True:
+            purged = await writes.call(database, purge)
+            if not purged:
+                break
+            total += purged
+            await asyncio.sleep(0)
+    
+    return total
+
+
+async def run_purge(interval: float, grace: datetime.timedelta, batch_size: int) -> None:
+    while True:
+        try:
+            total = await purge_deleted_pages(grace, batch_size)
+            if total:
+                logger.info(f"Purged {total} deleted pages")
+        except Exception:
+            logger.exception("Failed to purge deleted pages")
+        await asyncio.sleep(interval)
@@ -0,0 +1,158 @@
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import app_config
+from src.repository import crud
+from src.repository.sharding import shards
+from src.exceptions import PageNotFoundException
+from src.models.entities import Page
+from src.models.schemas import PageResponse
+from src.utils.html import (
+    node_to_html, parse_nodes_from_str,
+    get_preview_from_nodes
+)
+from src.utils.cache import TTLCache
+from src.utils.heavy_hitters import SpaceSaving
+from src.utils.singleflight import SingleFlight
+
+
+# concurrent reads of the same page share one DB fetch (and render)
+page_flight = SingleFlight()
+# page reads/renders of this worker, invalidated on edit/delete
+page_cache = TTLCache(app_config.PAGES_CACHE_SIZE, app_config.PAGES_CACHE_TTL)
+# loads in progress by cache key: [count, generation], invalidate bumps generation
+_loads: Dict[tuple, List[int]] = {}
+# most requested pages by (shard, page id), persisted by hot_pages
+page_hits = SpaceSaving(app_config.PAGES_HOT_TOP * 10)
+
+
+async def _read(
+    page_uri: str,
+    func: Callable[[AsyncSession], Awaitable[Any]],
+    primary: bool = False
+) -> Any:
+    """
+    Run `func` on a replica session of the page's shard (on primary if `primary`),
+    retry on primary if the page is not there yet (replica lag)
+    """
+    database = shards.get(page_uri)
+    try:
+        async with database.read_session(page_uri, primary=primary) as db:
+            return await func(db)
+    except PageNotFoundException:
+        if primary or not database.replica_engines or database.is_recent_write(page_uri):
+            raise
+    
+    async with database.async_session() as db:
+        return await func(db)
+
+
+async def _fetch_page(page_uri: str, primary: bool = False) -> Tuple[Page, int]:
+    async def fetch(db: AsyncSession) -> Tuple[Page, int]:
+        views = await crud.get_page_views_count(db, page_uri)
+        page = await crud.get_page(db, page_uri)
+        return page, views
+    
+    return await _read(page_uri, fetch, primary)
+
+
+async def _render_page(page_uri: str, primary: bool = False) -> Tuple[int, Dict[str, Any]]:
+    page = await _read(page_uri, lambda db: crud.get_page(db, page_uri, with_html=True), primary)
+    body = page.body
+    # rendered once per distinct content (crud.acquire_content)
+    if body.html is None:
+        nodes = parse_nodes_from_str(body.content)
+        html_content, image_url = node_to_html(nodes), get_preview_from_nodes(nodes)
+    else:
+        html_content, image_url = body.html, body.preview
+    
+    return page.id, PageResponse(
+        path=page.page_uri,
+        author_name=page.author_name,
+        author_url=page.author_url,
+        title=page.title,
+        image_url=image_url or "",
+        can_edit=False,
+        created=page.created,
+        html_content=html_content
+    ).model_dump(mode="python", exclude_defaults=True)
+
+
+async def _load(key: tuple, func) -> Any:
+    result = page_cache.get(key)
+    if result is not None:
+        return result
+    
+    load = _loads.setdefault(key, [0, 0])
+    load[0] += 1
+    generation = load[1]
+    try:
+        result = await page_flight.do(key, func)
+    finally:
+        load[0] -= 1
+        if not load[0]:
+            del _loads[key]
+    
+    # invalidated during the fetch: the result may be older than the write
+    if load[1] == generation:
+        page_cache.set(key, result)
+    return result
+
+
+async def get_page(page_uri: str, primary: bool = False) -> Tuple[Page, int]:
+    """
+    Page (detached, read-only, with content) and views count.
+    Raises PageNotFoundException
+
+    :param primary: read from primary bypassing the cache (after the client's write)
+    """
+    page_uri = page_uri.lower()
+    if primary:
+        result = await _fetch_page(page_uri, primary=True)
+    else:
+        result = await _load(("page", page_uri), lambda: _fetch_page(page_uri))
+    page_hits.add((shards.index(page_uri), result[0].id))
+    return result
+
+
+async def get_page_context(page_uri: str, primary: bool = False) -> Dict[str, Any]:
+    """
+    Template context of the rendered page (shared, don't modify).
+    Raises PageNotFoundException
+
+    :param primary: read from primary bypassing the cache (after the client's write)
+    """
+    page_uri = page_uri.lower()
+    if primary:
+        page_id, context = await _render_page(page_uri, primary=True)
+    else:
+        page_id, context = await _load(("html", page_uri), lambda: _render_page(page_uri))
+    page_hits.add((shards.index(page_uri), page_id))
+    return context
+
+
+async def render_page_context(page_uri: str) -> Dict[str, Any]:
+    """
+    Template context of the rendered page, bypassing the cache (not counted as a hit).
+    Raises PageNotFoundException
+    """
+    _, context = await _render_page(page_uri.lower())
+    return context
+
+
+async def prewarm(page_uri: str) -> None:
+    """ Load page into the cache (not counted as a hit) """
+    page_uri = page_uri.lower()
+    await _load(("page", page_uri), lambda: _fetch_page(page_uri))
+    await _load(("html", page_uri), lambda: _render_page(page_uri))
+
+
+def invalidate(page_uri: str) -> None:
+    page_uri = page_uri.lower()
+    for key in (("page", page_uri), ("html", page_uri)):
+        page_cache.pop(key)
+        page_flight.forget(key)
+        load = _loads.get(key)
+        if load is not None:
+            load[1] += 1
@@ -0,0 +1,209 @@
+import logging
+from itertools import islice
+from typing import Dict, List, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.repository import crud
+from src.repository.database import async_db
+from src.repository.sharding import shards
+from src.repository.blobs import blob_store
+from src.models.entities import Account, Page
+from src.models.schemas import PageOrderBy, OrderMode
+
+
+logger = logging.getLogger(__name__)
+
+
+async def create_page(
+    db: AsyncSession,
+    account: Account,
+    nodes: str,
+    title: str,
+    uri: str,
+    author_name: str | None,
+    author_url: str | None
+) -> Page:
+    """
+    Create page in the shard of its URI (in `db` if that's the primary)
+    """
+    if not shards.enabled:
+        return await crud.create_page(
+            db, account, nodes, title, uri,
+            author_name, author_url
+        )
+    
+    acc_id = account.id
+    author_name = author_name or account.author_name
+    author_url = author_url or account.author_url
+    
+    for page_uri in crud.page_uri_candidates(uri):
+        database = shards.get(page_uri)
+        if database is async_db:
+            page = await crud.insert_page(
+                db, acc_id, page_uri,
+                nodes, title,
+                author_name, author_url
+            )
+        else:
+            async with database.async_session() as page_db:
+                page = await crud.insert_page(
+                    page_db, acc_id, page_uri,
+                    nodes, title,
+                    author_name, author_url
+                )
+        if page is not None:
+            return page
+
+
+async def get_account_page_count(account: Account) -> int:
+    counts = await shards.fan_out(
+        lambda db: crud.get_account_page_count(db, account.id),
+        account.token
+    )
+    return sum(counts)
+
+
+async def get_account_pages_views(account: Account) -> int:
+    counts = await shards.fan_out(
+        lambda db: crud.get_account_pages_views(db, account.id),
+        account.token
+    )
+    return sum(counts)
+
+
+async def get_account_pages(
+    account: Account,
+    query: str,
+    limit: int = 10,
+    offset: int = 0,
+    order_by: PageOrderBy = PageOrderBy.DATE,
+    order_mode: OrderMode = OrderMode.DESC
+) -> List[Tuple[Page, int]]:
+    """
+    Pages of account with views count: first `offset + limit` of every
+    shard, merged (offset is applied in DB without shards)
+
+    :return: [(page, views)]
+    """
+    with_views = order_by == PageOrderBy.VIEWS or not shards.enabled
+    
+    async def fetch(db: AsyncSession) -> List[Tuple[Page, int | None]]:
+        pages = await crud.get_account_pages(
+            db, account.id,
+            query=query,
+            limit=(offset + limit) if shards.enabled else limit,
+            offset=0 if shards.enabled else offset,
+            order_by=order_by,
+            order_mode=order_mode
+        )
+        if not with_views:
+            return [(page, None) for page in pages]
+        
+        counts = await crud.get_pages_views_counts(db, [page.id for page in pages])
+        return [(page, counts[page.id]) for page in pages]
+    
+    results = await shards.fan_out(fetch, account.token)
+    if not shards.enabled:
+        return results[0]
+    
+    if order_by == PageOrderBy.VIEWS:
+        key = lambda item: item[1]
+    elif order_by == PageOrderBy.TITLE:
+        key = lambda item: item[0].title
+    else:
+        key = lambda item: item[0].created
+    
+    pages = sorted(
+        (item for result in results for item in result),
+        key=key, reverse=(order_mode == OrderMode.DESC)
+    )[offset:offset + limit]
+    
+    if with_views:
+        return pages
+    
+    by_shard: Dict[int, List[int]] = {}
+    for page, _ in pages:
+        by_shard.setdefault(shards.index(page.page_uri), []).append(page.id)
+    
+    counts: Dict[Tuple[int, int], int] = {}
+    for index, page_ids in by_shard.items():
+        async with shards.databases[index].read_session(account.token) as db:
+            for page_id, views in (await crud.get_pages_views_counts(db, page_ids)).items():
+                counts[index, page_id] = views
+    
+    return [(page, counts[shards.index(page.page_uri), page.id]) for page, _ in pages]
+
+
+async def _same_page(source: AsyncSession, target: AsyncSession, page_uri: str) -> bool:
+    pages = []
+    for db in (source, target):
+        result = await db.execute(
+            select(Page.account_id, Page.created)
+            .where(Page.page_uri == page_uri)
+        )
+        pages.append(tuple(result.one()))
+    return pages[0] == pages[1]
+
+
+async def rebalance(batch_size: int = 1000) -> int:
+    """
+    Move pages that are not in the shard of their URI (after DB_SHARD_URLS
+    changed) with all their rows: copy, then delete from the old shard
+
+    :return: count of moved pages
+    """
+    moved = 0
+    for index, database in enumerate(shards):
+        after_id = 0
+        while True:
+            async with database.async_session() as db:
+                rows = await crud.get_page_uris_after(db, after_id, batch_size)
+            if not rows:
+                break
+            after_id = rows[-1][0]
+            
+            for page_id, page_uri in rows:
+                target_index = shards.index(page_uri)
+                if target_index == index:
+                    continue
+                
+                async with (
+                    database.async_session() as source,
+                    shards.databases[target_index].async_session() as target
+                ):
+                    # already copied by an interrupted run -> only delete
+                    if not await crud.copy_page(source, target, page_id):
+                        if not await _same_page(source, target, page_uri):
+                            logger.warning(f"Page {page_uri} exists in shard {target_index}, kept in {index}")
+                            continue
+                    await crud.delete_pages(source, [page_id])
+                
+                moved += 1
+                logger.info(f"Moved {page_uri}: shard {index} -> {target_index}")
+    
+    return moved
+
+
+async def sweep_blobs(grace: float, batch_size: int = 1000) -> int:
+    """
+    Remove blob files whose content is not blob-stored in any shard.
+    Files written in the last `grace` seconds are kept (their rows may be not committed yet)
+
+    :return: count of removed bodies
+    """
+    removed = 0
+    keys = blob_store.keys(older_than=grace)
+    while batch := list(dict.fromkeys(islice(keys, batch_size))):
+        found = set()
+        for database in shards:
+            async with database.async_session() as db:
+                found.update(await crud.get_blob_hashes(db, batch))
+        
+        for key in batch:
+            if key not in found:
+                blob_store.delete(key)
+                removed += 1
+    
+    return removed
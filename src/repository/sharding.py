@@ -0,0 +1,96 @@
+import asyncio
+import bisect
+from hashlib import blake2b
+from typing import Awaitable, Callable, List, Tuple, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import app_config
+from src.repository.database import AsyncDatabase, async_db
+
+
+T = TypeVar("T")
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(blake2b(value.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """
+    Consistent hashing: adding/removing a node moves ~1/N of the keys
+    """
+    def __init__(self, nodes: List[str], vnodes: int = 160) -> None:
+        points = sorted(
+            (_hash(f"{node}#{i}"), index)
+            for index, node in enumerate(nodes)
+            for i in range(vnodes)
+        )
+        self.hashes = [point for point, _ in points]
+        self.nodes = [index for _, index in points]
+
+    def get(self, key: str) -> int:
+        """ Index of the node owning `key` """
+        i = bisect.bisect(self.hashes, _hash(key)) % len(self.hashes)
+        return self.nodes[i]
+
+
+class Shards:
+    """
+    Databases of pages (and their views, revisions, ...) by consistent hash
+    of the lowercased page URI. Accounts stay on the primary (`async_db`).
+    Without DB_SHARD_URLS the primary is the only shard.
+    The ring is keyed by shard names, not URLs (credentials and hosts may change)
+    """
+    def __init__(self, urls: List[str], names: List[str] | None = None) -> None:
+        names = names or [f"shard{index}" for index in range(len(urls))]
+        if len(names) != len(urls) or len(set(names)) != len(names):
+            raise ValueError("DB_SHARD_NAMES must name every shard of DB_SHARD_URLS once")
+        
+        self.urls = urls
+        self.names = names
+        self.databases: List[AsyncDatabase] = [
+            async_db if url == async_db.url else AsyncDatabase(url, [])
+            for url in urls
+        ] or [async_db]
+        self.ring = HashRing(names) if urls else None
+
+    @property
+    def enabled(self) -> bool:
+        return self.ring is not None
+
+    def index(self, page_uri: str) -> int:
+        if self.ring is None:
+            return 0
+        return self.ring.get(page_uri.lower())
+
+    def get(self, page_uri: str) -> AsyncDatabase:
+        return self.databases[self.index(page_uri)]
+
+    def __iter__(self):
+        return iter(self.databases)
+
+    def __len__(self) -> int:
+        return len(self.databases)
+
+    async def fan_out(
+        self,
+        func: Callable[[AsyncSession], Awaitable[T]],
+        *keys: str | None
+    ) -> List[T]:
+        """
+        Run `func` on a read session of every shard concurrently
+        """
+        async def run(database: AsyncDatabase) -> T:
+            async with database.read_session(*keys) as db:
+                return await func(db)
+        
+        return await asyncio.gather(*map(run, self.databases))
+
+    async def dispose(self) -> None:
+        for database in self.databases:
+            if database is not async_db:
+                await database.dispose()
+
+
+shards = Shards(app_config.DB_SHARD_URLS, app_config.DB_SHARD_NAMES)
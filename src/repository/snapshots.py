@@ -0,0 +1,186 @@
+import os
+import gzip
+import time
+import uuid
+import asyncio
+import logging
+from pathlib import Path
+from typing import Iterable
+
+from src.config import app_config
+from src.exceptions import PageNotFoundException
+from src.repository import crud, reader
+from src.repository.sharding import shards
+from src.frontend_shell import page_shell
+
+
+logger = logging.getLogger(__name__)
+
+
+class SnapshotStore:
+    """
+    Rendered pages as static files for the web server: <root>/<page_uri>.html
+    and precompressed <page_uri>.html.gz. Written atomically (temp file + rename),
+    a page without a file is a miss and is served by the app
+    """
+
+    SUFFIXES = (".html", ".html.gz")
+
+    def __init__(self, root: str) -> None:
+        self.root = Path(root) if root else None
+
+    @property
+    def enabled(self) -> bool:
+        return self.root is not None
+
+    def path(self, page_uri: str, suffix: str = ".html") -> Path:
+        name = page_uri.lower()
+        if not name or "/" in name or name.startswith("."):
+            raise ValueError(f"Bad page uri: {page_uri!r}")
+        return self.root / (name + suffix)
+
+    def _replace(self, path: Path, data: bytes) -> None:
+        tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            with open(tmp, "wb") as file:
+                file.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+
+    def _write(self, page_uri: str, html: str) -> None:
+        data = html.encode()
+        self.root.mkdir(parents=True, exist_ok=True)
+        # compressed first: a new .html is never served with an older .gz
+        self._replace(self.path(page_uri, ".html.gz"), gzip.compress(data, 9, mtime=0))
+        self._replace(self.path(page_uri, ".html"), data)
+
+    def _delete(self, page_uri: str) -> None:
+        for suffix in self.SUFFIXES:
+            self.path(page_uri, suffix).unlink(missing_ok=True)
+
+    async def write(self, page_uri: str, html: str) -> None:
+        await asyncio.to_thread(self._write, page_uri, html)
+
+    async def delete(self, page_uri: str) -> None:
+        await asyncio.to_thread(self._delete, page_uri)
+
+    def prune(self, keep: Iterable[str], before: float) -> int:
+        """
+        Remove snapshots not in `keep` and not modified since `before`
+        (timestamp) with stale temp files
+        
+        :return: count of removed pages
+        """
+        if not self.root.is_dir():
+            return 0
+        
+        keep = set(keep)
+        removed = 0
+        for path in self.root.iterdir():
+            try:
+                if path.stat().st_mtime >= before:
+                    continue
+            except FileNotFoundError:
+                continue
+            
+            if path.name.startswith("."):
+                path.unlink(missing_ok=True)
+            elif path.name.endswith(self.SUFFIXES) and path.name.split(".")[0] not in keep:
+                path.unlink(missing_ok=True)
+                removed += path.name.endswith(".html")
+        return removed
+
+
+snapshot_store = SnapshotStore(app_config.PAGES_SNAPSHOT_DIR)
+
+
+async def render(page_uri: str) -> str:
+    """ Raises PageNotFoundException """
+    context = await reader.render_page_context(page_uri)
+    return page_shell.render(context)
+
+
+async def refresh(page_uri: str) -> None:
+    """ Write the page snapshot (or remove it if the page is gone) """
+    if not snapshot_store.enabled:
+        return
+    
+    try:
+        html = await render(page_uri)
+    except PageNotFoundException:
+        await snapshot_store.delete(page_uri)
+        return
+    await snapshot_store.write(page_uri, html)
+
+
+async def publish(page_uri: str) -> None:
+    """
+    Refresh the page snapshot. Errors are logged: the app still serves the page on a miss
+    """
+    try:
+        await refresh(page_uri)
+    except Exception:
+        logger.exception(f"Failed to publish page {page_uri}")
+
+
+async def unpublish(page_uri: str) -> None:
+    if not snapshot_store.enabled:
+        return
+    
+    try:
+        await snapshot_store.delete(page_uri)
+    except Exception:
+        logger.exception(f"Failed to remove page snapshot {page_uri}")
+
+
+async def publish_all(workers: int = 8, batch_size: int = 1000) -> int:
+    """
+    Regenerate snapshots of all pages with `workers` concurrent renders,
+    then remove snapshots of pages that no longer exist
+    
+    :return: count of published pages
+    """
+    started = time.time()
+    queue: asyncio.Queue[str | None] = asyncio.Queue(maxsize=workers * 4)
+    published: set[str] = set()
+    failed: set[str] = set()
+    
+    async def worker() -> None:
+        while (page_uri := await queue.get()) is not None:
+            try:
+                await snapshot_store.write(page_uri, await render(page_uri))
+                published.add(page_uri.lower())
+            except PageNotFoundException:
+                pass
+            except Exception:
+                # existing snapshot (if any) is kept
+                failed.add(page_uri.lower())
+                logger.exception(f"Failed to publish page {page_uri}")
+    
+    tasks = [asyncio.create_task(worker()) for _ in range(workers)]
+    try:
+        for database in shards:
+            after_id = 0
+            while True:
+                async with database.async_session() as db:
+                    rows = await crud.get_page_uris_after(db, after_id, batch_size)
+                if not rows:
+                    break
+                after_id = rows[-1][0]
+                
+                for _, page_uri in rows:
+                    await queue.put(page_uri)
+        
+        for _ in tasks:
+            await queue.put(None)
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+    
+    removed = await asyncio.to_thread(snapshot_store.prune, published | failed, started)
+    if removed:
+        logger.info(f"Removed {removed} snapshots of deleted pages")
+    return len(published)
@@ -0,0 +1,91 @@
+import asyncio
+import datetime
+import logging
+from typing import Dict, Tuple
+
+from src.config import app_config
+from src.repository import crud
+from src.repository.sharding import shards
+from src.repository.writes import writes
+from src.utils.hll import HyperLogLog
+
+
+logger = logging.getLogger(__name__)
+
+
+class ViewSketchBuffer:
+    """
+    In-memory HyperLogLog sketches of new views (VIEWS_MODE=hll),
+    periodically merged into `page_view_sketch`
+    """
+    def __init__(self, precision: int) -> None:
+        self.precision = precision
+        # (shard, page_id) -> sketch
+        self.sketches: Dict[Tuple[int, int], HyperLogLog] = {}
+
+    def add(self, shard: int, page_id: int, visitor: bytes) -> None:
+        sketch = self.sketches.get((shard, page_id))
+        if sketch is None:
+            sketch = self.sketches[(shard, page_id)] = HyperLogLog(self.precision)
+        sketch.add(visitor)
+
+    async def flush(self) -> None:
+        sketches, self.sketches = self.sketches, {}
+        
+        by_shard: Dict[int, Dict[int, HyperLogLog]] = {}
+        for (shard, page_id), sketch in sketches.items():
+            by_shard.setdefault(shard, {})[page_id] = sketch
+        
+        for shard, shard_sketches in by_shard.items():
+            try:
+                await writes.call(
+                    shards.databases[shard],
+                    lambda db: crud.merge_view_sketches(db, shard_sketches)
+                )
+            except Exception:
+                logger.exception("Failed to flush view sketches, will retry")
+                for page_id, sketch in shard_sketches.items():
+                    pending = self.sketches.get((shard, page_id))
+                    self.sketches[(shard, page_id)] = sketch if pending is None else pending.merge(sketch)
+
+    async def run(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            await self.flush()
+
+
+view_sketches = ViewSketchBuffer(app_config.VIEWS_HLL_PRECISION)
+
+
+async def compact_views(retention: datetime.timedelta, batch_size: int) -> int:
+    """
+    Fold all `page_view` rows older than `retention` in batches (one transaction per batch)
+
+    :return: count of folded rows
+    """
+    before = datetime.datetime.now(datetime.UTC) - retention
+    total = 0
+    
+    for database in shards:
+        while True:
+            deleted = await writes.call(
+                database,
+                lambda db: crud.compact_page_views(db, before, batch_size)
+            )
+            total += deleted
+            if deleted < batch_size:
+                break
+            await asyncio.sleep(0)
+    
+    return total
+
+
+async def run_compaction(interval: float, retention: datetime.timedelta, batch_size: int) -> None:
+    while True:
+        try:
+            total = await compact_views(retention, batch_size)
+            if total:
+                logger.info(f"Compacted {total} page views")
+        except Exception:
+            logger.exception("Failed to compact page views")
+        await asyncio.sleep(interval)
@@ -0,0 +1,112 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import app_config
+from src.repository import crud
+from src.repository.database import AsyncDatabase
+from src.repository.sharding import shards
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class WriteQueue:
+    """
+    Serialized writes (SQLITE_TUNED, one writer connection per database):
+    requests and background tasks enqueue writes and wait, one writer task
+    runs them in order. Views queued together are inserted in one transaction
+    (group commit). Without the writer task writes run in the caller's task
+    """
+    def __init__(self, batch_size: int) -> None:
+        self.batch_size = batch_size
+        self.queue: asyncio.Queue | None = None
+        self.running = False
+
+    async def call(self, database: AsyncDatabase, func: Callable[[AsyncSession], Awaitable[T]]) -> T:
+        """
+        Run `func` with a session of `database`, :return: its result
+        (exceptions are raised to the caller). `func` must not use `writes` itself
+        """
+        if not self.running:
+            async with database.async_session() as db:
+                return await func(db)
+        
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((database, func, future))
+        return await future
+
+    async def add_view(self, shard: int, ip: bytes, visitor: bytes, page_id: int) -> None:
+        if not self.running:
+            async with shards.databases[shard].async_session() as db:
+                await crud.add_view(db, ip=ip, visitor=visitor, page_id=page_id)
+            return
+        
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((shard, (ip, visitor, page_id), future))
+        await future
+
+    async def execute(self, database: AsyncDatabase, func: Callable, future: asyncio.Future) -> None:
+        try:
+            async with database.async_session() as db:
+                result = await func(db)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+        else:
+            if not future.done():
+                future.set_result(result)
+
+    async def write_views(self, batch: list) -> None:
+        by_shard: Dict[int, list] = {}
+        for shard, view, future in batch:
+            by_shard.setdefault(shard, []).append((view, future))
+        
+        for shard, items in by_shard.items():
+            try:
+                async with shards.databases[shard].async_session() as db:
+                    await crud.add_views(db, [view for view, _ in items])
+            except Exception as e:
+                logger.exception("Failed to write views")
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+            else:
+                for _, future in items:
+                    if not future.done():
+                        future.set_result(None)
+
+    async def write(self, batch: list) -> None:
+        """ Calls one by one in queue order, then all views of the batch at once """
+        views = []
+        for item in batch:
+            if isinstance(item[0], int):
+                views.append(item)
+            else:
+                await self.execute(*item)
+        if views:
+            await self.write_views(views)
+
+    async def run(self) -> None:
+        self.queue = asyncio.Queue()
+        self.running = True
+        try:
+            while True:
+                batch = [await self.queue.get()]
+                while len(batch) < self.batch_size and not self.queue.empty():
+                    batch.append(self.queue.get_nowait())
+                await self.write(batch)
+        finally:
+            self.running = False
+            batch = []
+            while not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            if batch:
+                await self.write(batch)
+
+
+writes = WriteQueue(app_config.SQLITE_WRITE_BATCH)
@@ -0,0 +1,72 @@
+import random
+import socket
+import asyncio
+
+import uvicorn
+from uvicorn.supervisors import Multiprocess
+
+from src.config import app_config
+
+
+class WorkerServer(uvicorn.Server):
+    """
+    Server of a worker process. Exits after limit_max_requests plus random
+    jitter (workers are not recycled all at once), the supervisor starts a new one
+    """
+
+    def __init__(self, config: uvicorn.Config, max_requests_jitter: int = 0) -> None:
+        super().__init__(config)
+        self.max_requests_jitter = max_requests_jitter
+
+    def run(self, sockets: list[socket.socket] | None = None) -> None:
+        # config is a copy per (spawned) worker
+        if self.config.limit_max_requests and self.max_requests_jitter > 0:
+            self.config.limit_max_requests += random.randint(0, self.max_requests_jitter)
+        super().run(sockets)
+
+    async def shutdown(self, sockets: list[socket.socket] | None = None) -> None:
+        # stop accepting first: uvicorn closes connections without a started
+        # request, a just accepted one gets a moment to send it
+        for server in self.servers:
+            server.close()
+        await asyncio.sleep(0.2)
+        await super().shutdown(sockets)
+
+
+def bind_socket(host: str, port: int, reuse_port: bool) -> socket.socket:
+    """ Listening socket shared by all workers """
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_production(app: str) -> None:
+    """
+    Serve `app` ("module:attribute") with uvloop and httptools in SERVER_WORKERS
+    supervised processes: a recycled or crashed worker is replaced, SIGTERM stops
+    accepting and lets every worker finish its requests (SERVER_GRACEFUL_TIMEOUT)
+    """
+    config = uvicorn.Config(
+        app,
+        host=app_config.SERVER_HOST,
+        port=app_config.SERVER_PORT,
+        workers=max(app_config.SERVER_WORKERS, 1),
+        loop="uvloop",
+        http="httptools",
+        backlog=app_config.SERVER_BACKLOG,
+        timeout_keep_alive=app_config.SERVER_KEEP_ALIVE,
+        limit_max_requests=app_config.SERVER_MAX_REQUESTS or None,
+        timeout_graceful_shutdown=app_config.SERVER_GRACEFUL_TIMEOUT,
+        log_level=app_config.LOGGING_LEVEL
+    )
+    server = WorkerServer(config, app_config.SERVER_MAX_REQUESTS_JITTER)
+    sock = bind_socket(config.host, config.port, app_config.SERVER_REUSE_PORT)
+    try:
+        # supervisor even for one worker: it restarts a recycled one
+        Multiprocess(config, target=server.run, sockets=[sock]).run()
+    finally:
+        sock.close()
@@ -0,0 +1,142 @@
+import os
+import gzip
+import uuid
+import hashlib
+import mimetypes
+from pathlib import Path
+from typing import Dict, NamedTuple
+
+import brotli
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Scope
+
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+# compressed siblings by preference, skipped if not smaller than the asset
+ENCODINGS = {
+    "br": (".br", lambda data: brotli.compress(data, quality=11)),
+    "gzip": (".gz", lambda data: gzip.compress(data, 9, mtime=0)),
+}
+COMPRESSIBLE = (".css", ".js", ".svg", ".html", ".json", ".txt", ".map")
+
+
+def accepted_encodings(header: str) -> set[str]:
+    """ Codings of Accept-Encoding header without q=0 ones """
+    accepted = set()
+    for value in header.split(","):
+        coding, _, params = value.partition(";")
+        quality = params.replace(" ", "").partition("q=")[2]
+        try:
+            if quality and float(quality) <= 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+class Asset(NamedTuple):
+    path: str
+    media_type: str
+    encodings: tuple[str, ...]
+
+
+class AssetManifest:
+    """
+    Static files copied to `target` under content-hashed names (js/api.js ->
+    js/api.1a2b3c4d5e.js) with precompressed .br/.gz siblings. Fingerprinted
+    names never change content, so they are cached forever
+    """
+
+    def __init__(self, source: str, target: str, prefix: str = "/static") -> None:
+        self.source = Path(source)
+        self.target = Path(target)
+        self.prefix = prefix
+        self.urls: Dict[str, str] = {}
+        self.assets: Dict[str, Asset] = {}
+
+    def _replace(self, path: Path, data: bytes) -> None:
+        if path.exists():
+            return
+        
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+
+    def build(self) -> int:
+        """
+        Write fingerprinted files (older builds are kept: cached pages may refer to them)
+        
+        :return: count of assets
+        """
+        urls, assets = {}, {}
+        for file in sorted(self.source.rglob("*")):
+            if not file.is_file() or file.name.startswith("."):
+                continue
+            
+            data = file.read_bytes()
+            name = file.relative_to(self.source).as_posix()
+            stem, ext = os.path.splitext(name)
+            hashed = f"{stem}.{hashlib.sha256(data).hexdigest()[:10]}{ext}"
+            
+            self._replace(self.target / hashed, data)
+            encodings = []
+            if ext in COMPRESSIBLE:
+                for encoding, (suffix, compress) in ENCODINGS.items():
+                    compressed = compress(data)
+                    if len(compressed) < len(data):
+                        self._replace(self.target / (hashed + suffix), compressed)
+                        encodings.append(encoding)
+            
+            media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+            urls[name] = f"{self.prefix}/{hashed}"
+            assets[hashed] = Asset(str(self.target / hashed), media_type, tuple(encodings))
+        
+        self.urls, self.assets = urls, assets
+        return len(assets)
+
+    def url(self, name: str) -> str:
+        """ Fingerprinted URL of the static file (plain URL before build) """
+        return self.urls.get(name) or f"{self.prefix}/{name}"
+
+
+class AssetFiles(StaticFiles):
+    """
+    Fingerprinted assets of the manifest: immutable, br/gzip sibling chosen by
+    Accept-Encoding. Other paths are served from `directory` and revalidated
+    """
+
+    def __init__(self, manifest: AssetManifest, directory: str) -> None:
+        super().__init__(directory=directory)
+        self.manifest = manifest
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        asset = self.manifest.assets.get(path.replace(os.sep, "/"))
+        if asset is None:
+            response = await super().get_response(path, scope)
+            response.headers.setdefault("Cache-Control", "no-cache")
+            return response
+        
+        if scope["method"] not in ("GET", "HEAD"):
+            # 405 from StaticFiles
+            return await super().get_response(path, scope)
+        
+        headers = {"Cache-Control": IMMUTABLE}
+        file_path = asset.path
+        if asset.encodings:
+            headers["Vary"] = "Accept-Encoding"
+            accepted = accepted_encodings(Headers(scope=scope).get("accept-encoding", ""))
+            for encoding in asset.encodings:
+                if encoding in accepted:
+                    headers["Content-Encoding"] = encoding
+                    file_path += ENCODINGS[encoding][0]
+                    break
+        
+        return FileResponse(file_path, headers=headers, media_type=asset.media_type)
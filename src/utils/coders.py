@@ -1,9 +1,9 @@
 import datetime
-from json import dumps
+from json import dumps, loads
 from uuid import uuid4
 from base64 import urlsafe_b64encode
 from hashlib import sha256
-from ipaddress import IPv4Address
+from ipaddress import IPv4Address, IPv6Address, ip_address
 from string import ascii_letters
 from random import randint
 
@@ -42,6 +42,26 @@ def calc_sha256(*text: str, sep: str = " ", b64: bool = False) -> str:
     return ( hex256 if not b64 else hex_to_b64(hex256) )
 
 
+def calc_digest(*text: str, sep: str = " ", size: int = 16) -> bytes:
+    """ Truncated binary SHA-256 (prefix of `calc_sha256`) """
+    return sha256(sep.join(text).encode()).digest()[:size]
+
+
+def pack_ip(ip: str) -> bytes:
+    """
+    IP address as 16 bytes (IPv4 is mapped to IPv6),
+    hosts which are not an IP address are hashed
+    """
+    try:
+        address = ip_address(ip)
+    except ValueError:
+        return calc_digest(ip)
+    
+    if isinstance(address, IPv4Address):
+        address = IPv6Address(f"::ffff:{address}")
+    return address.packed
+
+
 def json_dumps(data) -> str:
     return dumps(
         data,
@@ -50,6 +70,23 @@ def json_dumps(data) -> str:
     )
 
 
+def json_splice(data: dict, key: str, raw: str) -> str:
+    """ JSON of `data` with `raw` (encoded JSON, not checked) as the last `key` """
+    head = json_dumps(data)[:-1]
+    return head + ("," if len(head) > 1 else "") + json_dumps(key) + ":" + raw + "}"
+
+
+def content_hash(content: str) -> bytes:
+    """ SHA-256 of JSON `content` normalized (compact, sorted keys) """
+    normalized = dumps(
+        loads(content),
+        ensure_ascii=False,
+        separators=(",", ":"),
+        sort_keys=True
+    )
+    return sha256(normalized.encode()).digest()
+
+
 def text_to_translit(text: str) -> str:
     result = []
     for char in text:
@@ -0,0 +1,90 @@
+import json
+import zlib
+from difflib import SequenceMatcher
+from typing import List
+
+from . import coders
+
+
+def _split_nodes(content: str) -> List[str]:
+    return [coders.json_dumps(node) for node in json.loads(content)]
+
+
+def make_delta(
+    old_content: str,
+    new_content: str,
+    max_nodes: int
+) -> List[list | dict | str] | None:
+    """
+    Delta between two stored contents over top-level nodes.
+    Items are either `[start, end]` (copy old nodes[start:end]) or a new node.
+    Matching is quadratic in the worst case: None (store a snapshot)
+    when the changed part has more than `max_nodes` nodes. Popular nodes
+    (repeated empty paragraphs, ...) are not matched, they make it cubic
+
+    :param old_content:
+    :param new_content:
+    :param max_nodes: max count of changed nodes of old or new content
+    :return:
+    """
+    old_nodes = _split_nodes(old_content)
+    new_nodes = _split_nodes(new_content)
+    
+    # common prefix / suffix first, usual edits touch a few nodes
+    prefix = 0
+    limit = min(len(old_nodes), len(new_nodes))
+    while prefix < limit and old_nodes[prefix] == new_nodes[prefix]:
+        prefix += 1
+    
+    suffix = 0
+    limit -= prefix
+    while suffix < limit and old_nodes[-1 - suffix] == new_nodes[-1 - suffix]:
+        suffix += 1
+    
+    delta = []
+    if prefix:
+        delta.append([0, prefix])
+    
+    old_mid = old_nodes[prefix:len(old_nodes) - suffix]
+    new_mid = new_nodes[prefix:len(new_nodes) - suffix]
+    if max(len(old_mid), len(new_mid)) > max_nodes:
+        return None
+    
+    matcher = SequenceMatcher(None, old_mid, new_mid)
+    
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            delta.append([prefix + i1, prefix + i2])
+        else:
+            delta.extend(json.loads(node) for node in new_mid[j1:j2])
+    
+    if suffix:
+        delta.append([len(old_nodes) - suffix, len(old_nodes)])
+    
+    return delta
+
+
+def apply_delta(old_nodes: List[dict | str], delta: List[list | dict | str]) -> List[dict | str]:
+    """
+    Rebuild nodes from previous nodes and delta (see `make_delta`)
+
+    :param old_nodes:
+    :param delta:
+    :return:
+    """
+    new_nodes = []
+    for item in delta:
+        if isinstance(item, list):
+            new_nodes.extend(old_nodes[item[0]:item[1]])
+        else:
+            new_nodes.append(item)
+    
+    return new_nodes
+
+
+def compress(text: str) -> bytes:
+    return zlib.compress(text.encode(), 6)
+
+
+def decompress(data: bytes) -> str:
+    return zlib.decompress(data).decode()
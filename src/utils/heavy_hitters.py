@@ -0,0 +1,57 @@
+import heapq
+from typing import Dict, Hashable, List, Tuple
+
+
+class SpaceSaving:
+    """
+    Space-Saving top-k: counts of at most `capacity` keys, a new key replaces
+    the least counted one (and inherits its count as error).
+    Every key seen more than total/capacity times is kept.
+    """
+    __slots__ = ("capacity", "counts", "errors", "heap", "total")
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = max(1, capacity)
+        self.counts: Dict[Hashable, int] = {}
+        self.errors: Dict[Hashable, int] = {}
+        # (count, key), entries may be stale; checked on eviction
+        self.heap: List[Tuple[int, Hashable]] = []
+        self.total = 0
+
+    def add(self, key: Hashable, count: int = 1) -> None:
+        self.total += count
+        counts = self.counts
+        
+        if key in counts:
+            counts[key] += count
+            return
+        
+        if len(counts) < self.capacity:
+            counts[key] = count
+            self.errors[key] = 0
+            heapq.heappush(self.heap, (count, key))
+            return
+        
+        while True:
+            min_count, min_key = heapq.heappop(self.heap)
+            current = counts.get(min_key)
+            if current == min_count:
+                break
+            if current is not None:
+                heapq.heappush(self.heap, (current, min_key))
+        
+        del counts[min_key]
+        del self.errors[min_key]
+        counts[key] = min_count + count
+        self.errors[key] = min_count
+        heapq.heappush(self.heap, (min_count + count, key))
+
+    def top(self, n: int) -> List[Tuple[Hashable, int]]:
+        """ [(key, count)] by count desc, count may be overestimated by error """
+        return heapq.nlargest(n, self.counts.items(), key=lambda item: item[1])
+
+    def clear(self) -> None:
+        self.counts.clear()
+        self.errors.clear()
+        self.heap.clear()
+        self.total = 0
@@ -0,0 +1,92 @@
+import math
+import zlib
+from hashlib import blake2b
+
+
+_INVERSE_POWERS = [2.0 ** -rank for rank in range(65)]
+
+
+class HyperLogLog:
+    """
+    HyperLogLog sketch for approximate unique counting.
+    Standard error is about 1.04 / sqrt(2 ** precision).
+    """
+    __slots__ = ("precision", "registers")
+
+    def __init__(self, precision: int = 12, registers: bytearray | None = None) -> None:
+        if not 4 <= precision <= 18:
+            raise ValueError(f"precision must be in 4..18, not {precision}")
+        
+        self.precision = precision
+        self.registers = registers if registers is not None else bytearray(1 << precision)
+
+    def add(self, value: str | bytes) -> bool:
+        """
+        Add value to sketch
+
+        :return: sketch was changed
+        """
+        if isinstance(value, str):
+            value = value.encode()
+        
+        hashed = int.from_bytes(blake2b(value, digest_size=8).digest(), "big")
+        bits = 64 - self.precision
+        index = hashed >> bits
+        rank = bits - (hashed & ((1 << bits) - 1)).bit_length() + 1
+        
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+            return True
+        return False
+
+    def fold(self, precision: int) -> "HyperLogLog":
+        """
+        Same sketch with lower precision
+        """
+        if precision >= self.precision:
+            return self
+        
+        shift = self.precision - precision
+        low_mask = (1 << shift) - 1
+        registers = bytearray(1 << precision)
+        
+        for index, rank in enumerate(self.registers):
+            if not rank:
+                continue
+            low = index & low_mask
+            rank = (shift - low.bit_length() + 1) if low else rank + shift
+            new_index = index >> shift
+            if rank > registers[new_index]:
+                registers[new_index] = rank
+        
+        return HyperLogLog(precision, registers)
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        """
+        Merge other sketch into this one (in place if precisions are equal)
+        """
+        precision = min(self.precision, other.precision)
+        result, other = self.fold(precision), other.fold(precision)
+        
+        result.registers = bytearray(map(max, result.registers, other.registers))
+        return result
+
+    def count(self) -> int:
+        size = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / size)
+        estimate = alpha * size * size / sum(_INVERSE_POWERS[rank] for rank in self.registers)
+        
+        if estimate <= 2.5 * size:
+            zeros = self.registers.count(0)
+            if zeros:
+                estimate = size * math.log(size / zeros)
+        
+        return round(estimate)
+
+    def to_bytes(self) -> bytes:
+        return zlib.compress(bytes([self.precision]) + self.registers)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "HyperLogLog":
+        data = zlib.decompress(data)
+        return cls(data[0], bytearray(data[1:]))
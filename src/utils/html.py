@@ -4,109 +4,134 @@ import json
 from html import escape
 from html.entities import name2codepoint
 from html.parser import HTMLParser
-from typing import List, Union
+from types import MappingProxyType
+from typing import Dict, List, Union
 
-import attr
-from fastapi import HTTPException
-from pydantic import ValidationError
-
-from ..models.schemas import NodeElement
 from . import coders
 
 
-ALLOWED_TAGS = [
+ALLOWED_TAGS = frozenset({
     'a', 'aside', 'b', 'blockquote', 'br', 'code', 'em', 'figcaption', 'figure',
     'h1', 'h3', 'h4', 'hr', 'i', 'iframe', 'img', 'li', 'ol', 'p', 'pre', 's',
     'strong', 'u', 'ul', 'video'
-]
-VOID_ELEMENTS = {
+})
+VOID_ELEMENTS = frozenset({
     'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'keygen',
     'link', 'menuitem', 'meta', 'param', 'source', 'track', 'wbr'
-}
-ALLOWED_ATTRS = ['href', 'src']
-
-
-def parse_nodes_from_str(text: str) -> List[NodeElement | str]:
-    text = text[:1048576 * 8]
-    try:
-        nodes: List[NodeElement] = [
-            n if isinstance(n, str) else NodeElement(**n)
-            for n in json.loads(text)
-        ]
-    except ValidationError as e:
-        raise HTTPException(400, json.loads(e.json()))
-    
-    except json.JSONDecodeError:
-        raise HTTPException(400, "Content is bad JSON format")
-    
-    except Exception as e:
-        raise HTTPException(422, "Server Validation Error")
-    
-    return nodes
-
-
-def formatting_nodes(nodes: List[NodeElement | str]) -> List[dict | str]:
-    content_list = []
-    for node in nodes:
-        if isinstance(node, str):
-            content_list.append(node)
-        elif isinstance(node, NodeElement):
-            content_list.append(node.model_dump(
-                mode="json", exclude_defaults=True
-            ))
-    return content_list
+})
+ALLOWED_ATTRS = frozenset({'href', 'src'})
 
 
-def get_preview_from_nodes(nodes: List[NodeElement | str]) -> str | None:
-    for node in nodes:
-        if isinstance(node, NodeElement):
-            if node.tag == "img":
-                return node.attrs.get("src", "")
-            else:
-                img = get_preview_from_nodes(node.children)
-                if img:
-                    return img
-    return None
+class Element:
+    """
+    Element node for rendering: a slotted object instead of a validated
+    NodeElement model (pages have tens of thousands of nodes).
+    Empty attrs/children are shared empty containers, don't modify them
+    """
+    __slots__ = ("tag", "attrs", "children")
+
+    def __init__(
+        self,
+        tag: str,
+        attrs: Dict[str, str] | None = None,
+        children: List[Union["Element", str]] | None = None
+    ) -> None:
+        self.tag = tag
+        self.attrs = attrs if attrs is not None else {}
+        self.children = children if children is not None else []
+
+    def to_dict(self) -> dict:
+        """ JSON form (as `NodeElement.model_dump(exclude_defaults=True)`) """
+        result = {"tag": self.tag}
+        if self.attrs:
+            result["attrs"] = dict(self.attrs)
+        if self.children:
+            result["children"] = [
+                child if isinstance(child, str) else child.to_dict()
+                for child in self.children
+            ]
+        return result
 
 
-def node_to_html(node: Union[str, NodeElement, list]) -> str:
-    """
-    Convert Nodes to HTML
+_NO_ATTRS: Dict[str, str] = MappingProxyType({})
+_NO_CHILDREN: tuple = ()
 
-    :param node:
-    :return:
+
+def _to_element(node: dict) -> Element:
+    children = node.get("children") or _NO_CHILDREN
+    return Element(node["tag"], node.get("attrs") or _NO_ATTRS, [
+        child if isinstance(child, str) else _to_element(child)
+        for child in children
+    ] if children else _NO_CHILDREN)
+
+
+def parse_nodes_from_str(text: str) -> List[Element | str]:
     """
-    if isinstance(node, str):  # Text
-        return escape(node)
+    Elements of stored content. Content is validated once on write
+    (`src.utils.validation.parse_content`), it is not validated here
+    """
+    return [n if isinstance(n, str) else _to_element(n) for n in json.loads(text)]
+
+
+def formatting_nodes(nodes: List[Element | str]) -> List[dict | str]:
+    return [node if isinstance(node, str) else node.to_dict() for node in nodes]
 
-    elif isinstance(node, list):  # List of nodes
-        result = ''
-        for child_node in node:
-            result += node_to_html(child_node)
-        return result
 
-    elif not isinstance(node, NodeElement):
-        raise TypeError(f"Node must be instance of str or NodeElement, not {type(node)}")
+def get_preview_from_nodes(nodes: List[Element | dict | str]) -> str | None:
+    """ Preview image of parsed nodes or of their JSON form (the same result for both) """
+    for node in nodes:
+        if isinstance(node, str):
+            continue
+        if isinstance(node, Element):
+            tag, attrs, children = node.tag, node.attrs, node.children
+        else:
+            tag, attrs, children = node["tag"], node.get("attrs", {}), node.get("children", ())
+
+        if tag == "img":
+            return attrs.get("src", "")
+        else:
+            img = get_preview_from_nodes(children)
+            if img:
+                return img
+    return None
+
 
-    # NodeElement
+def _write_html(node: Union[str, Element], parts: List[str]) -> None:
+    if isinstance(node, str):  # Text
+        parts.append(escape(node))
+        return
 
     # Open
-    result = "<" + node.tag
+    parts.append("<" + node.tag)
     if node.attrs:
-        result += ' ' + ' '.join(f"{k}=\"{v}\"" for k, v in node.attrs.items())
+        parts.append(' ' + ' '.join(f"{k}=\"{v}\"" for k, v in node.attrs.items()))
 
     if node.tag in VOID_ELEMENTS:  # Close void element
-        result += '/>'
+        parts.append('/>')
     else:
-        result += '>'
+        parts.append('>')
         for child_node in node.children:  # Container body
-            result += node_to_html(child_node)
-        result += '</' + node.tag + '>'  # Close tag
+            _write_html(child_node, parts)
+        parts.append('</' + node.tag + '>')  # Close tag
+
+
+def node_to_html(node: Union[str, Element, list]) -> str:
+    """
+    Convert Nodes to HTML
 
-    return result
+    :param node:
+    :return:
+    """
+    nodes = node if isinstance(node, list) else [node]
+    parts: List[str] = []
+    for child_node in nodes:
+        if not isinstance(child_node, (str, Element)):
+            raise TypeError(f"Node must be instance of str or Element, not {type(child_node)}")
+        _write_html(child_node, parts)
+    return "".join(parts)
 
 
-def html_to_nodes(html_content: str) -> List[Union[str, NodeElement]]:
+def html_to_nodes(html_content: str) -> List[Union[str, Element]]:
     """
     Convert HTML code to Nodes
 
@@ -119,24 +144,14 @@ def html_to_nodes(html_content: str) -> List[Union[str, NodeElement]]:
     return parser.get_nodes()
 
 
-def _node_converter_filter(attribute, value) -> bool:
-    return bool(value)
-
-
-def nodes_to_json(nodes: List[Union[str, NodeElement]]) -> List[Union[str, dict]]:
+def nodes_to_json(nodes: List[Union[str, Element]]) -> List[Union[str, dict]]:
     """
     Convert Nodes to JSON
 
     :param nodes:
     :return:
     """
-    result = []
-    for node in nodes:
-        if isinstance(node, str):
-            result.append(node)
-        elif isinstance(node, NodeElement):
-            result.append(attr.asdict(node, filter=_node_converter_filter))
-    return result
+    return formatting_nodes(nodes)
 
 
 def html_to_json(content: str) -> List[Union[str, dict]]:
@@ -169,11 +184,7 @@ class HtmlToNodesParser(HTMLParser):
         if tag not in ALLOWED_TAGS:
             self.error(f"{tag} tag is not allowed")
 
-        node = NodeElement(tag=tag)
-
-        if attrs_list:
-            for attr, value in attrs_list:
-                node.attrs[attr] = value
+        node = Element(tag, dict(attrs_list))
 
         self.current_nodes.append(node)
 
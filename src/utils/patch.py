@@ -0,0 +1,114 @@
+from typing import List
+
+from fastapi import HTTPException
+
+from src.config import app_config
+from src.models.schemas import PagePatchOperation
+from src.utils.html import VOID_ELEMENTS
+from src.utils.validation import count_nodes, validate_nodes
+
+
+def _bad_path(path: str) -> HTTPException:
+    return HTTPException(400, f"Bad patch path: {path}")
+
+
+def _resolve(
+    content: List[dict | str],
+    path: str
+) -> tuple[List[dict | str], dict | None, str, int]:
+    """
+    Resolve node path to (parent list, parent element, last token, depth of parent element)
+
+    :param content:
+    :param path:
+    :return:
+    """
+    tokens = path.split("/")
+    if tokens[0] != "" or len(tokens) % 2:
+        raise _bad_path(path)
+    tokens = tokens[1:]
+    
+    nodes, element, depth = content, None, 0
+    for i in range(0, len(tokens) - 1, 2):
+        if tokens[i + 1] != "children" or not tokens[i].isdigit():
+            raise _bad_path(path)
+        
+        index = int(tokens[i])
+        if index >= len(nodes) or not isinstance(nodes[index], dict):
+            raise _bad_path(path)
+        
+        element, depth = nodes[index], depth + 1
+        nodes = element.get("children", [])
+    
+    return nodes, element, tokens[-1], depth
+
+
+def apply_patch(
+    content: List[dict | str],
+    operations: List[PagePatchOperation]
+) -> List[dict | str]:
+    """
+    Apply patch operations to stored (already normalized) content in place.
+    Only inserted values are validated: depth is limited by the depth
+    of their parent, the node count is kept by removed/inserted subtrees.
+
+    :param content: decoded stored content
+    :param operations:
+    :return:
+    """
+    max_nodes = app_config.CONTENT_MAX_NODES
+    count = count_nodes(content)
+    
+    for operation in operations:
+        nodes, element, token, depth = _resolve(content, operation.path)
+        
+        if operation.op == "add" and token == "-":
+            index = len(nodes)
+        elif token.isdigit():
+            index = int(token)
+        else:
+            raise _bad_path(operation.path)
+        
+        if index > len(nodes) or (operation.op != "add" and index == len(nodes)):
+            raise _bad_path(operation.path)
+        
+        if operation.op == "remove":
+            count -= count_nodes([nodes[index]])
+            del nodes[index]
+            if element is not None and not nodes:
+                element.pop("children", None)
+            continue
+        
+        if operation.value is None:
+            raise HTTPException(400, f"Patch value is required: {operation.op} {operation.path}")
+        
+        if element is not None and element["tag"] in VOID_ELEMENTS:
+            raise HTTPException(400, [{
+                "type": "value_error",
+                "loc": [],
+                "msg": f"Value error, NOT_ALLOWED_CHILDREN_{element['tag']}",
+                "input": element,
+                "ctx": {"error": f"NOT_ALLOWED_CHILDREN_{element['tag']}"}
+            }])
+        
+        value, = validate_nodes(
+            [operation.value],
+            max_depth=app_config.CONTENT_MAX_DEPTH - depth
+        )
+        
+        count += count_nodes([value])
+        if operation.op == "add":
+            nodes.insert(index, value)
+            if element is not None and "children" not in element:
+                element["children"] = nodes
+        else:
+            count -= count_nodes([nodes[index]])
+            nodes[index] = value
+    
+    if not content:
+        raise HTTPException(400, "Content can not be empty")
+    
+    if count > max_nodes:
+        raise HTTPException(400, f"Content has too many nodes (max {max_nodes})")
+    
+    return content
@@ -0,0 +1,25 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: while a call is in flight,
+    other callers await its result (or exception) instead of running it again
+    """
+    def __init__(self) -> None:
+        self.calls: Dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        task = self.calls.get(key)
+        if task is None:
+            task = self.calls[key] = asyncio.create_task(func())
+            task.add_done_callback(lambda _: self.forget(key, task))
+        
+        # shield: a cancelled caller must not cancel the shared call
+        return await asyncio.shield(task)
+
+    def forget(self, key: Hashable, task: asyncio.Task | None = None) -> None:
+        """ Next callers start a new call (`task`: only if it's still the current one) """
+        if task is None or self.calls.get(key) is task:
+            self.calls.pop(key, None)
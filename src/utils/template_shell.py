@@ -0,0 +1,102 @@
+import re
+from typing import Any, Dict, Hashable, List, Mapping, Tuple
+
+from jinja2 import Template
+from markupsafe import escape
+
+
+# "\x00<slot index>&\x00": "&" turns into "&amp;" where the value is autoescaped
+_MARKER = re.compile("\x00(\\d+)(&amp;|&)\x00")
+
+Field = Tuple[str, tuple, bool]
+
+
+class _Slot:
+    """ Placeholder of a context value, records attribute access and calls on it """
+    __slots__ = ("_fields", "_key", "_path")
+
+    def __init__(self, fields: List[Tuple[str, tuple]], key: str, path: tuple = ()) -> None:
+        self._fields = fields
+        self._key = key
+        self._path = path
+
+    def __getattr__(self, name: str) -> "_Slot":
+        if name.startswith(("_", "jinja_")):
+            raise AttributeError(name)
+        return _Slot(self._fields, self._key, self._path + ((name, None),))
+
+    def __call__(self, *args: Any, **kwargs: Any) -> "_Slot":
+        return _Slot(self._fields, self._key, self._path + ((None, (args, kwargs)),))
+
+    def __str__(self) -> str:
+        self._fields.append((self._key, self._path))
+        return f"\x00{len(self._fields) - 1}&\x00"
+
+
+class TemplateShell:
+    """
+    Template rendered once into static chunks with slots for context values,
+    filled per call by string assembly (escaped where the template escapes).
+    A shell is compiled per context "shape" (keys, types, falsy values), checked
+    against a full render and used only if equal; otherwise the template renders
+    """
+
+    def __init__(self, template: Template, max_shapes: int = 64) -> None:
+        self.template = template
+        self.max_shapes = max_shapes
+        self.shells: Dict[Hashable, Tuple[List[str], List[Field]] | None] = {}
+
+    def _shape(self, context: Mapping[str, Any]) -> Hashable:
+        return tuple(
+            (key, type(value), bool(value) or value)
+            for key, value in sorted(context.items())
+        )
+
+    def _compile(self, context: Mapping[str, Any]) -> Tuple[List[str], List[Field]] | None:
+        slots: List[Tuple[str, tuple]] = []
+        try:
+            text = self.template.render({
+                key: _Slot(slots, key) if value else value
+                for key, value in context.items()
+            })
+        except Exception:
+            return None
+        
+        parts = _MARKER.split(text)
+        chunks = parts[0::3]
+        fields = [
+            (*slots[int(index)], mark == "&amp;")
+            for index, mark in zip(parts[1::3], parts[2::3])
+        ]
+        shell = chunks, fields
+        if self._fill(shell, context) != self.template.render(context):
+            # value used in a filter or comparison: not a plain slot
+            return None
+        return shell
+
+    def _fill(self, shell: Tuple[List[str], List[Field]], context: Mapping[str, Any]) -> str:
+        chunks, fields = shell
+        result = [chunks[0]]
+        for (key, path, escaped), chunk in zip(fields, chunks[1:]):
+            value = context[key]
+            for name, call in path:
+                value = getattr(value, name) if name else value(*call[0], **call[1])
+            result.append(escape(value) if escaped else str(value))
+            result.append(chunk)
+        return "".join(result)
+
+    def render(self, context: Mapping[str, Any]) -> str:
+        try:
+            shape = self._shape(context)
+            shell = self.shells[shape]
+        except TypeError:
+            # unhashable falsy value
+            return self.template.render(context)
+        except KeyError:
+            shell = self._compile(context)
+            if len(self.shells) < self.max_shapes:
+                self.shells[shape] = shell
+        
+        if shell is None:
+            return self.template.render(context)
+        return self._fill(shell, context)
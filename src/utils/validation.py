@@ -1,4 +1,20 @@
+import json
+from typing import Any, List
+
+from fastapi import HTTPException
+from pydantic import ValidationError
+
+from src.config import app_config
 from src.models import Account, Page
+from src.models.schemas import NodeElement
+from src.utils import coders
+from src.utils.html import (
+    ALLOWED_TAGS, ALLOWED_ATTRS, VOID_ELEMENTS
+)
+
+
+# length of the stored content (PageContent.content)
+CONTENT_MAX_SIZE = 1048576
 
 
 def is_can_edit(account: Account, page: Page) -> bool:
@@ -7,3 +23,153 @@ def is_can_edit(account: Account, page: Page) -> bool:
         (page is not None) and
         (account.id == page.account_id or account.is_admin)
     )
+
+
+class _InvalidNode(Exception):
+    pass
+
+
+def _schema_errors(data: list) -> HTTPException:
+    """
+    Errors of invalid content as reported by the `NodeElement` schema:
+    all errors of the first invalid top-level node (pydantic format)
+    """
+    for node in data:
+        if isinstance(node, str):
+            continue
+        try:
+            NodeElement(**node)
+        except ValidationError as e:
+            return HTTPException(400, json.loads(e.json()))
+        except Exception:
+            break
+    return HTTPException(422, "Server Validation Error")
+
+
+def validate_nodes(
+    data: Any,
+    max_depth: int | None = None,
+    max_nodes: int | None = None
+) -> List[dict | str]:
+    """
+    Validate raw JSON nodes in a single pass and normalize them
+    into the stored form (same as `NodeElement.model_dump(exclude_defaults=True)`).
+    Invalid content is validated again by the schema for the error details
+
+    :param data: decoded JSON content
+    :param max_depth: max nesting level of elements
+    :param max_nodes: max count of nodes (elements and strings)
+    :return:
+    """
+    max_depth = app_config.CONTENT_MAX_DEPTH if max_depth is None else max_depth
+    max_nodes = app_config.CONTENT_MAX_NODES if max_nodes is None else max_nodes
+    
+    if not isinstance(data, list):
+        raise HTTPException(422, "Server Validation Error")
+    
+    try:
+        return _validate(data, max_depth, max_nodes)
+    except _InvalidNode:
+        raise _schema_errors(data)
+
+
+def _validate(data: list, max_depth: int, max_nodes: int) -> List[dict | str]:
+    """ Raises _InvalidNode (details: `_schema_errors`) or HTTPException on limits """
+    result: List[dict | str] = []
+    # (node, output list, depth)
+    stack = [(node, result, 1) for node in reversed(data)]
+    count = 0
+    
+    while stack:
+        node, out, depth = stack.pop()
+        
+        count += 1
+        if count > max_nodes:
+            raise HTTPException(400, f"Content has too many nodes (max {max_nodes})")
+        
+        if isinstance(node, str):
+            out.append(node)
+            continue
+        
+        if not isinstance(node, dict):
+            raise _InvalidNode()
+        
+        if depth > max_depth:
+            raise HTTPException(400, f"Content is too deep (max {max_depth})")
+        
+        tag = node.get("tag")
+        attrs = node.get("attrs", {})
+        children = node.get("children", [])
+        if (
+            not isinstance(tag, str)
+            or not isinstance(attrs, dict)
+            or not isinstance(children, list)
+            or tag not in ALLOWED_TAGS
+            or (children and tag in VOID_ELEMENTS)
+        ):
+            raise _InvalidNode()
+        
+        element = {"tag": tag}
+        
+        if attrs:
+            for key, value in attrs.items():
+                if not isinstance(value, str) or key not in ALLOWED_ATTRS:
+                    raise _InvalidNode()
+            element["attrs"] = dict(attrs)
+        
+        if children:
+            element_children = element["children"] = []
+            for index in range(len(children) - 1, -1, -1):
+                stack.append((children[index], element_children, depth + 1))
+        
+        out.append(element)
+    
+    return result
+
+
+def count_nodes(nodes: List[dict | str]) -> int:
+    """
+    Count of nodes (elements and strings) of validated content
+
+    :param nodes:
+    :return:
+    """
+    count = 0
+    stack = list(nodes)
+    while stack:
+        node = stack.pop()
+        count += 1
+        if isinstance(node, dict):
+            stack.extend(node.get("children", ()))
+    return count
+
+
+def parse_content(content: str | list) -> List[dict | str]:
+    """
+    Decode JSON content (if it is string) and validate it with `validate_nodes`
+
+    :param content: JSON string or already decoded list of nodes
+    :return:
+    """
+    if isinstance(content, str):
+        content = content[:CONTENT_MAX_SIZE * 8]
+        try:
+            content = json.loads(content)
+        except json.JSONDecodeError:
+            raise HTTPException(400, "Content is bad JSON format")
+    
+    return validate_nodes(content)
+
+
+def dump_content(nodes: List[dict | str]) -> str:
+    """
+    Stored JSON form of validated content, limited by the size
+    of the content column (the same for created and edited pages)
+
+    :param nodes: content from `parse_content` or a patched one
+    :return:
+    """
+    content = coders.json_dumps(nodes)
+    if len(content) > CONTENT_MAX_SIZE:
+        raise HTTPException(400, "Content is too large")
+    return content
@@ -0,0 +1,24 @@
+import os
+import tempfile
+
+import pytest
+
+
+# settings are read on import of `src`
+os.environ.setdefault(
+    "DB_URL",
+    f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}"
+)
+os.environ.setdefault("JOBS_WORKERS", "0")
+
+
+@pytest.fixture(scope="session")
+def database():
+    from src.cli import upgrade_database
+    
+    upgrade_database()
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
@@ -0,0 +1,68 @@
+import math
+
+import pytest
+
+from src.utils.hll import HyperLogLog
+
+
+def _sketch(keys: range, precision: int = 12) -> HyperLogLog:
+    sketch = HyperLogLog(precision)
+    for key in keys:
+        sketch.add(f"visitor-{key}")
+    return sketch
+
+
+def _max_error(precision: int) -> float:
+    # 3 standard errors
+    return 3 * 1.04 / math.sqrt(1 << precision)
+
+
+@pytest.mark.parametrize("count", [100, 1000, 10000, 100000])
+def test_count_error(count):
+    sketch = _sketch(range(count))
+    
+    assert abs(sketch.count() - count) / count <= _max_error(12)
+
+
+def test_count_duplicates():
+    sketch = _sketch(range(5000))
+    
+    assert not any(sketch.add(f"visitor-{key}") for key in range(5000))
+    assert abs(sketch.count() - 5000) / 5000 <= _max_error(12)
+
+
+def test_merge():
+    first, second = _sketch(range(0, 60000)), _sketch(range(40000, 100000))
+    
+    merged = first.merge(second)
+    
+    assert merged.registers == _sketch(range(100000)).registers
+    assert abs(merged.count() - 100000) / 100000 <= _max_error(12)
+
+
+def test_fold():
+    sketch = _sketch(range(50000), precision=14)
+    
+    folded = sketch.fold(10)
+    
+    assert folded.precision == 10
+    assert folded.registers == _sketch(range(50000), precision=10).registers
+    assert sketch.fold(14) is sketch
+
+
+def test_merge_precisions():
+    first = _sketch(range(0, 30000), precision=14)
+    second = _sketch(range(20000, 50000), precision=12)
+    
+    merged = first.merge(second)
+    
+    assert merged.precision == 12
+    assert merged.registers == _sketch(range(50000)).registers
+
+
+def test_bytes():
+    sketch = _sketch(range(1000))
+    
+    restored = HyperLogLog.from_bytes(sketch.to_bytes())
+    
+    assert (restored.precision, restored.registers) == (sketch.precision, sketch.registers)
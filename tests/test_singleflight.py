@@ -0,0 +1,89 @@
+import asyncio
+
+import httpx
+import pytest
+from sqlalchemy import event
+
+import main
+from src.repository import crud, reader
+from src.repository.database import async_db
+from src.repository.sharding import shards
+
+
+@pytest.fixture
+async def page_uri(database):
+    async with async_db.async_session() as db:
+        account = await crud.create_account(db, "test", "Test", "")
+    
+    async with _client() as client:
+        response = await client.post("/api/createPage", json={
+            "token": account.token,
+            "title": "Singleflight",
+            "content": ["Hello ", {"tag": "b", "children": ["World"]}]
+        })
+    assert response.status_code == 200
+    return response.json()["path"]
+
+
+def _client() -> httpx.AsyncClient:
+    transport = httpx.ASGITransport(app=main.telegraphy_app)
+    return httpx.AsyncClient(transport=transport, base_url="http://test")
+
+
+async def _count_queries(page_uri: str, requests: int) -> int:
+    """ Queries of `requests` concurrent uncached getPage requests """
+    database = shards.get(page_uri)
+    engines = [
+        engine.sync_engine
+        for engine in (database.async_engine, database.reader_engine, *database.replica_engines)
+        if engine is not None
+    ]
+    statements = []
+    
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    
+    reader.invalidate(page_uri)
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", count)
+    try:
+        async with _client() as client:
+            responses = await asyncio.gather(*(
+                client.get(f"/api/getPage/{page_uri}")
+                for _ in range(requests)
+            ))
+    finally:
+        for engine in engines:
+            event.remove(engine, "before_cursor_execute", count)
+    
+    assert all(response.status_code == 200 for response in responses)
+    assert len({response.content for response in responses}) == 1
+    return len(statements)
+
+
+@pytest.mark.anyio
+async def test_concurrent_get_page_single_fetch(page_uri):
+    single = await _count_queries(page_uri, 1)
+    
+    assert single > 0
+    assert await _count_queries(page_uri, 50) == single
+
+
+@pytest.mark.anyio
+async def test_invalidate_during_fetch_not_cached():
+    key = ("page", "invalidated-page")
+    started, written = asyncio.Event(), asyncio.Event()
+    
+    async def fetch():
+        started.set()
+        await written.wait()
+        return "old"
+    
+    load = asyncio.create_task(reader._load(key, fetch))
+    await started.wait()
+    reader.invalidate("invalidated-page")
+    written.set()
+    
+    assert await load == "old"
+    assert reader.page_cache.get(key) is None
+    assert key not in reader._loads